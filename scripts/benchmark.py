@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+"""Benchmark the tap against a local stand-in of the Bitly API.
+
+Each stream is synced in its own process, against its own mock API, and the
+throughput, number of requests per record and peak memory use are reported. The
+startup time of the tap is measured as well, by timing repeated runs of discovery
+and of a sync of a single small stream.
+
+Run it from the repository root:
+
+    uv run python -m scripts.benchmark --bitlinks 500 --latency 0.02
+
+Copyright (c) 2025 Edgar Ramírez-Mondragón
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from tap_bitly.tap import TapBitly
+from tests.mock_api import MockBitlyAPI, MockSettings
+
+DEFAULT_STREAMS = (
+    "groups",
+    "bitlinks",
+    "daily_bitlink_clicks",
+    "monthly_bitlink_clicks",
+)
+
+TAP_COMMAND = (
+    sys.executable,
+    "-c",
+    "from tap_bitly.tap import TapBitly; TapBitly.cli()",
+)
+
+logging.basicConfig(format="%(levelname)s - %(message)s", level=logging.INFO)
+logger = logging.getLogger()
+
+
+@dataclass
+class Result:
+    """Benchmark result of a stream."""
+
+    stream: str
+    records: int
+    requests: int
+    seconds: float
+    peak_rss_mb: float
+
+    @property
+    def records_per_second(self) -> float:
+        """Number of records synced per second."""
+        return self.records / self.seconds if self.seconds else 0.0
+
+    @property
+    def requests_per_record(self) -> float:
+        """Number of requests made per record synced."""
+        return self.requests / self.records if self.records else 0.0
+
+
+@dataclass
+class StartupResult:
+    """Startup benchmark result of a tap invocation."""
+
+    command: str
+    median_seconds: float
+    min_seconds: float
+
+
+def _select(catalog: dict[str, Any], stream_name: str) -> dict[str, Any]:
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if not metadata["breadcrumb"]:
+                metadata["metadata"]["selected"] = entry["tap_stream_id"] == stream_name
+    return catalog
+
+
+def run_stream(
+    stream_name: str,
+    settings: MockSettings,
+    config: dict[str, Any],
+    workdir: Path,
+) -> Result:
+    """Sync a stream in a new process and measure it.
+
+    Args:
+        stream_name: The stream to sync.
+        settings: The scale and behaviour of the mock API.
+        config: Extra tap config.
+        workdir: Directory to write the tap config and catalog to.
+
+    Returns:
+        The benchmark result.
+
+    Raises:
+        RuntimeError: If the sync fails.
+    """
+    with MockBitlyAPI(settings) as api:
+        tap_config = {"token": "benchmark", "api_url": api.url, **config}
+        catalog = _select(TapBitly(config=tap_config).catalog_dict, stream_name)
+
+        config_path = workdir / "config.json"
+        catalog_path = workdir / "catalog.json"
+        config_path.write_text(json.dumps(tap_config), encoding="utf-8")
+        catalog_path.write_text(json.dumps(catalog), encoding="utf-8")
+
+        records = 0
+        start = time.perf_counter()
+        with subprocess.Popen(  # noqa: S603
+            [*TAP_COMMAND, "--config", config_path, "--catalog", catalog_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        ) as process:
+            assert process.stdout is not None  # noqa: S101
+            for line in process.stdout:
+                message = json.loads(line)
+                records += message["type"] == "RECORD"
+
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+
+        seconds = time.perf_counter() - start
+        if process.returncode:
+            msg = f"Sync of '{stream_name}' failed with code {process.returncode}"
+            raise RuntimeError(msg)
+
+        return Result(
+            stream=stream_name,
+            records=records,
+            requests=api.total_requests,
+            seconds=seconds,
+            peak_rss_mb=usage.ru_maxrss / 1024,
+        )
+
+
+def _time_command(args: list[str | Path], runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(  # noqa: S603
+            [*TAP_COMMAND, *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_startup(
+    settings: MockSettings,
+    config: dict[str, Any],
+    workdir: Path,
+    runs: int,
+) -> list[StartupResult]:
+    """Time the startup of the tap, for discovery and a sync of the groups stream.
+
+    Args:
+        settings: The scale and behaviour of the mock API.
+        config: Extra tap config.
+        workdir: Directory to write the tap config and catalog to.
+        runs: Number of times to run each command.
+
+    Returns:
+        The benchmark results.
+    """
+    with MockBitlyAPI(settings) as api:
+        tap_config = {"token": "benchmark", "api_url": api.url, **config}
+        catalog = _select(TapBitly(config=tap_config).catalog_dict, "groups")
+
+        config_path = workdir / "config.json"
+        catalog_path = workdir / "catalog.json"
+        config_path.write_text(json.dumps(tap_config), encoding="utf-8")
+        catalog_path.write_text(json.dumps(catalog), encoding="utf-8")
+
+        commands: dict[str, list[str | Path]] = {
+            "--discover": ["--config", config_path, "--discover"],
+            "sync groups": ["--config", config_path, "--catalog", catalog_path],
+        }
+        results = []
+        for name, args in commands.items():
+            timings = _time_command(args, runs)
+            results.append(
+                StartupResult(
+                    command=name,
+                    median_seconds=statistics.median(timings),
+                    min_seconds=min(timings),
+                )
+            )
+        return results
+
+
+def _format_startup_table(results: list[StartupResult]) -> str:
+    lines = [
+        "| Command | Median seconds | Min seconds |",
+        "| :------ | -------------: | ----------: |",
+    ]
+    lines.extend(
+        f"| {result.command} | {result.median_seconds:.3f} | {result.min_seconds:.3f} |"
+        for result in results
+    )
+    return "\n".join(lines) + "\n"
+
+
+def _format_table(results: list[Result]) -> str:
+    lines = [
+        "| Stream | Records | Requests | Seconds | Records/s | Requests/record | Peak RSS (MB) |",  # noqa: E501
+        "| :----- | ------: | -------: | ------: | --------: | --------------: | ------------: |",  # noqa: E501
+    ]
+    lines.extend(
+        f"| {result.stream} | {result.records} | {result.requests} "
+        f"| {result.seconds:.2f} | {result.records_per_second:.1f} "
+        f"| {result.requests_per_record:.3f} | {result.peak_rss_mb:.1f} |"
+        for result in results
+    )
+    return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    """Benchmark the tap against a local stand-in of the Bitly API."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", nargs="+", default=DEFAULT_STREAMS)
+    parser.add_argument("--groups", type=int, default=2)
+    parser.add_argument("--bitlinks", type=int, default=200, help="Per group")
+    parser.add_argument("--days", type=int, default=90, help="Of clicks per bitlink")
+    parser.add_argument("--latency", type=float, default=0.0, help="In seconds")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--config", type=json.loads, default={}, help="Tap config")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Zero to skip")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        groups=args.groups,
+        bitlinks_per_group=args.bitlinks,
+        days=args.days,
+        latency=args.latency,
+        page_size=args.page_size,
+        throttle_every=args.throttle_every,
+    )
+
+    results = []
+    startup_results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for stream_name in args.streams:
+            logger.info("Benchmarking %s", stream_name)
+            results.append(
+                run_stream(stream_name, settings, args.config, Path(workdir))
+            )
+
+        if args.startup_runs:
+            logger.info("Benchmarking startup")
+            startup_results = run_startup(
+                settings,
+                args.config,
+                Path(workdir),
+                args.startup_runs,
+            )
+
+    sys.stdout.write(_format_table(results))
+    if startup_results:
+        sys.stdout.write("\n" + _format_startup_table(startup_results))
+    if args.output:
+        report = {
+            "settings": asdict(settings),
+            "config": args.config,
+            "results": [
+                {
+                    **asdict(result),
+                    "records_per_second": result.records_per_second,
+                    "requests_per_record": result.requests_per_record,
+                }
+                for result in results
+            ],
+            "startup": [asdict(result) for result in startup_results],
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
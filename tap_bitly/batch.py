@@ -0,0 +1,332 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Rotating batch files of records, announced with Singer BATCH messages.
+
+The SDK writes the batch files of each stream partition separately, so a stream
+with one partition per bitlink would write a file per bitlink. Here records of
+every partition of a stream go to the same file, until it is rotated.
+"""
+
+from __future__ import annotations
+
+import gzip
+import importlib.util
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, override
+from urllib.parse import urlparse
+
+from singer_sdk.exceptions import ConfigValidationError
+
+# The SDK does not export its batch config and messages publicly
+from singer_sdk.helpers._batch import (  # noqa: PLC2701
+    BatchConfig,
+    BatchFileFormat,
+    SDKBatchMessage,
+)
+
+from tap_bitly.output import encode_json
+
+if TYPE_CHECKING:
+    import io
+    from collections.abc import Callable, Iterable, Mapping
+
+    import pyarrow as pa
+    from singer_sdk.singerlib import RecordMessage
+
+#: Number of records converted to an Arrow table at once, in Parquet files.
+PARQUET_CHUNK_RECORDS = 1000
+
+
+class BatchFile:
+    """A batch file of records being written."""
+
+    def __init__(self, path: Path, opened_at: float) -> None:
+        """Initialize the file.
+
+        Args:
+            path: Path of the file.
+            opened_at: Time the file was opened at.
+        """
+        self.path = path
+        self.opened_at = opened_at
+        #: Number of records in the file.
+        self.records = 0
+        #: Number of bytes of the records written so far, uncompressed.
+        self.size = 0
+
+    def write(self, record: Mapping[str, Any]) -> None:  # noqa: ARG002
+        """Write a record.
+
+        Args:
+            record: The record.
+        """
+        self.records += 1
+
+    def close(self) -> None:
+        """Finish writing the file."""
+
+
+class JSONLinesFile(BatchFile):
+    """A JSON Lines batch file, optionally compressed with gzip."""
+
+    def __init__(self, path: Path, opened_at: float, *, compress: bool) -> None:
+        """Open the file.
+
+        Args:
+            path: Path of the file.
+            opened_at: Time the file was opened at.
+            compress: Whether to compress the file with gzip.
+        """
+        super().__init__(path, opened_at)
+        self._raw = path.open("wb")
+        self._file: io.BufferedIOBase = (
+            gzip.GzipFile(fileobj=self._raw, mode="wb") if compress else self._raw
+        )
+
+    @override
+    def write(self, record: Mapping[str, Any]) -> None:
+        super().write(record)
+        line = encode_json(record) + b"\n"
+        self.size += len(line)
+        self._file.write(line)
+
+    @override
+    def close(self) -> None:
+        self._file.close()
+        self._raw.close()
+
+
+class ParquetFile(BatchFile):
+    """A Parquet batch file, written when closed.
+
+    Records are converted to Arrow tables in chunks, and the size of the file is
+    the size of the Arrow data of the converted chunks.
+    """
+
+    def __init__(self, path: Path, opened_at: float, *, compress: bool) -> None:
+        """Initialize the file.
+
+        Args:
+            path: Path of the file.
+            opened_at: Time the file was opened at.
+            compress: Whether to compress the file with gzip.
+        """
+        super().__init__(path, opened_at)
+        self.compress = compress
+        self._records: list[Mapping[str, Any]] = []
+        self._tables: list[pa.Table] = []
+
+    @override
+    def write(self, record: Mapping[str, Any]) -> None:
+        super().write(record)
+        self._records.append(record)
+        if len(self._records) >= PARQUET_CHUNK_RECORDS:
+            self._convert()
+
+    def _convert(self) -> None:
+        import pyarrow as pa  # noqa: PLC0415
+
+        table = pa.Table.from_pylist(self._records)
+        self._tables.append(table)
+        self.size += table.nbytes
+        self._records.clear()
+
+    @override
+    def close(self) -> None:
+        import pyarrow as pa  # noqa: PLC0415
+        import pyarrow.parquet as pq  # noqa: PLC0415
+
+        if self._records:
+            self._convert()
+        # Columns that are null in some chunks take the type of the other chunks
+        table = pa.concat_tables(self._tables, promote_options="default")
+        with self.path.open("wb") as file:
+            pq.write_table(table, file, compression="gzip" if self.compress else None)
+        self._tables.clear()
+
+
+class BatchWriter:
+    """Write the records of several streams to rotating batch files.
+
+    Files are stored in a local directory, and each stream has at most one open
+    file. :meth:`write` tells when a file reaches the batch size, the maximum number
+    of bytes or the maximum age, and :meth:`flush` closes every open file and
+    returns the BATCH messages of them.
+    """
+
+    def __init__(
+        self,
+        config: BatchConfig,
+        *,
+        tap_name: str,
+        max_bytes: int,
+        max_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the writer.
+
+        Args:
+            config: The SDK batch config, i.e. the encoding, storage and batch size.
+            tap_name: The name of the tap, used in file names.
+            max_bytes: Maximum number of bytes of records in a file.
+            max_seconds: Maximum number of seconds a file is written to.
+            clock: Monotonic clock function.
+
+        Raises:
+            ConfigValidationError: If the encoding or storage is not supported.
+        """
+        encoding = config.encoding
+        root = urlparse(config.storage.root)
+        if root.scheme not in {"", "file"}:
+            msg = "Invalid batch config"
+            raise ConfigValidationError(
+                msg,
+                errors=[f"Batch files can only be stored locally, got {root.scheme}"],
+            )
+        if encoding.format not in {BatchFileFormat.JSONL, BatchFileFormat.PARQUET}:
+            msg = "Invalid batch config"
+            raise ConfigValidationError(
+                msg,
+                errors=[f"Unsupported batch format: {encoding.format}"],
+            )
+        if (
+            encoding.format == BatchFileFormat.PARQUET
+            and importlib.util.find_spec("pyarrow") is None
+        ):
+            msg = "Invalid batch config"
+            raise ConfigValidationError(
+                msg,
+                errors=["Parquet batches require pyarrow, e.g. tap-bitly[parquet]"],
+            )
+
+        self.config = config
+        self.tap_name = tap_name
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self._clock = clock
+        self._root = Path(root.path)
+        self._sync_id = uuid.uuid4().hex
+        self._counts: dict[str, int] = {}
+        self._files: dict[tuple[str, int | None], BatchFile] = {}
+
+    @classmethod
+    def from_config(
+        cls,
+        batch_config: Mapping[str, Any],
+        *,
+        tap_name: str,
+        max_bytes: int,
+        max_seconds: float,
+    ) -> BatchWriter:
+        """Create a writer from the ``batch_config`` setting.
+
+        Args:
+            batch_config: The ``batch_config`` setting of the tap.
+            tap_name: The name of the tap, used in file names.
+            max_bytes: Maximum number of bytes of records in a file.
+            max_seconds: Maximum number of seconds a file is written to.
+
+        Returns:
+            The writer.
+        """
+        return cls(
+            BatchConfig.from_dict(dict(batch_config)),
+            tap_name=tap_name,
+            max_bytes=max_bytes,
+            max_seconds=max_seconds,
+        )
+
+    @property
+    def pending(self) -> bool:
+        """Whether records were written to files that are not flushed yet."""
+        return bool(self._files)
+
+    def _open(self, stream_name: str) -> BatchFile:
+        encoding = self.config.encoding
+        compress = encoding.compression == "gzip"
+        index = self._counts[stream_name] = self._counts.get(stream_name, 0) + 1
+        prefix = self.config.storage.prefix or ""
+        suffix = ".parquet" if encoding.format == BatchFileFormat.PARQUET else ".json"
+        if compress:
+            suffix += ".gz"
+
+        filename = f"{prefix}{self.tap_name}--{stream_name}-{self._sync_id}-{index}"
+        self._root.mkdir(parents=True, exist_ok=True)
+        path = self._root / f"{filename}{suffix}"
+        if encoding.format == BatchFileFormat.PARQUET:
+            return ParquetFile(path, self._clock(), compress=compress)
+        return JSONLinesFile(path, self._clock(), compress=compress)
+
+    def write(
+        self,
+        stream_name: str,
+        record: Mapping[str, Any],
+        version: int | None = None,
+    ) -> bool:
+        """Write a record to the open file of its stream.
+
+        Args:
+            stream_name: The stream name.
+            record: The conformed record.
+            version: The version of the stream, if any.
+
+        Returns:
+            Whether the files should be flushed.
+        """
+        key = (stream_name, version)
+        if (batch_file := self._files.get(key)) is None:
+            batch_file = self._files[key] = self._open(stream_name)
+
+        batch_file.write(record)
+        return (
+            batch_file.records >= self.config.batch_size
+            or batch_file.size >= self.max_bytes
+            or self._clock() - batch_file.opened_at >= self.max_seconds
+        )
+
+    def write_messages(self, messages: Iterable[RecordMessage]) -> bool:
+        """Write the records of RECORD messages to the open files of their streams.
+
+        Args:
+            messages: The messages, with conformed records.
+
+        Returns:
+            Whether the files should be flushed.
+        """
+        flush = False
+        for message in messages:
+            flush |= self.write(message.stream, message.record, message.version)
+        return flush
+
+    def flush(self) -> list[SDKBatchMessage]:
+        """Close every open file.
+
+        Returns:
+            The BATCH messages of the closed files.
+        """
+        messages = []
+        for (stream_name, version), batch_file in self._files.items():
+            batch_file.close()
+            messages.append(
+                SDKBatchMessage(
+                    stream=stream_name,
+                    encoding=self.config.encoding,
+                    manifest=[batch_file.path.as_uri()],
+                    version=version,
+                )
+            )
+        self._files.clear()
+        return messages
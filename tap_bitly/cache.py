@@ -0,0 +1,282 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""On-disk cache of API responses, revalidated with conditional requests."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from http import HTTPStatus
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+#: Suffix of cache entry files.
+ENTRY_SUFFIX = ".entry"
+
+#: Response headers kept in cache entries.
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """A cached response."""
+
+    url: str
+    stored_at: float
+    headers: dict[str, str]
+    content: bytes
+
+    def is_fresh(self, ttl: float, now: float) -> bool:
+        """Check whether the entry can be used without revalidating it.
+
+        Args:
+            ttl: Number of seconds entries are fresh for.
+            now: The current time.
+
+        Returns:
+            Whether the entry is younger than the TTL.
+        """
+        return now - self.stored_at < ttl
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Get the headers to revalidate the entry with.
+
+        Returns:
+            ``If-None-Match`` and ``If-Modified-Since`` headers, when the
+            response had validators.
+        """
+        headers = {}
+        if etag := self.headers.get("ETag"):
+            headers["If-None-Match"] = etag
+        if last_modified := self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def to_response(self, request: requests.PreparedRequest) -> requests.Response:
+        """Build a response from the entry.
+
+        Args:
+            request: The request the response answers.
+
+        Returns:
+            A ``200 OK`` response with the cached body.
+        """
+        response = requests.Response()
+        response.status_code = HTTPStatus.OK
+        response.url = self.url
+        response.request = request
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content  # noqa: SLF001
+        return response
+
+    def dumps(self) -> bytes:
+        """Serialize the entry.
+
+        Returns:
+            A JSON line with the metadata, followed by the body.
+        """
+        metadata = asdict(self)
+        del metadata["content"]
+        return json.dumps(metadata).encode() + b"\n" + self.content
+
+    @classmethod
+    def loads(cls, data: bytes) -> CacheEntry:
+        """Deserialize an entry.
+
+        Args:
+            data: The serialized entry.
+
+        Returns:
+            The entry.
+        """
+        metadata, _, content = data.partition(b"\n")
+        return cls(**json.loads(metadata), content=content)
+
+
+class ResponseCache:
+    """Cache of ``GET`` responses in a directory, one file per request.
+
+    Entries are served as-is while younger than the TTL. Older entries are
+    revalidated with ``If-None-Match``/``If-Modified-Since`` when the response had
+    an ``ETag`` or ``Last-Modified`` header, and fetched again otherwise. The least
+    recently used entries are evicted when the directory grows over its maximum
+    size.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        ttl: float,
+        max_bytes: int,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            directory: Directory to store entries in. Created if missing.
+            ttl: Number of seconds entries are fresh for.
+            max_bytes: Maximum total size of the entries.
+            clock: Wall clock function.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        # Running total of the entry sizes, so the directory is only scanned when
+        # entries must be evicted
+        self._sizes: dict[Path, int] = {}
+        self._total = 0
+        self._evict()
+
+    def _path(self, request: requests.PreparedRequest) -> Path:
+        # The credentials are part of the key, so different accounts never share
+        # entries
+        key = hashlib.sha256()
+        # Header values may be bytes, and every part may be missing
+        for part in (request.method, request.url, request.headers.get("Authorization")):
+            encoded = part.encode() if isinstance(part, str) else part or b""
+            key.update(encoded + b"\0")
+        return self.directory / f"{key.hexdigest()}{ENTRY_SUFFIX}"
+
+    def get(self, request: requests.PreparedRequest) -> CacheEntry | None:
+        """Get the entry of a request.
+
+        Args:
+            request: The request, including authentication headers.
+
+        Returns:
+            The entry, or None if the request is not cached.
+        """
+        path = self._path(request)
+        try:
+            entry = CacheEntry.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError):
+            logger.warning("Ignoring corrupt cache entry %s", path)
+            return None
+
+        # Mark the entry as recently used
+        now = self._clock()
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path, (now, now))
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Check whether an entry can be used without revalidating it.
+
+        Args:
+            entry: The cache entry.
+
+        Returns:
+            Whether the entry is younger than the TTL.
+        """
+        return entry.is_fresh(self.ttl, self._clock())
+
+    def update(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        entry: CacheEntry | None,
+    ) -> requests.Response:
+        """Update the cache from a response.
+
+        Args:
+            request: The request, including authentication headers.
+            response: The response to the request.
+            entry: The entry the request was revalidating, if any.
+
+        Returns:
+            The cached response if the entry was not modified, otherwise the
+            response itself.
+        """
+        if response.status_code == HTTPStatus.NOT_MODIFIED and entry is not None:
+            self._put(request, replace(entry, stored_at=self._clock()))
+            return entry.to_response(request)
+
+        if response.status_code == HTTPStatus.OK:
+            headers = {
+                name: response.headers[name]
+                for name in CACHED_HEADERS
+                if name in response.headers
+            }
+            new_entry = CacheEntry(
+                url=response.url,
+                stored_at=self._clock(),
+                headers=headers,
+                content=response.content,
+            )
+            self._put(request, new_entry)
+
+        return response
+
+    def _put(self, request: requests.PreparedRequest, entry: CacheEntry) -> None:
+        path = self._path(request)
+        data = entry.dumps()
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory,
+            suffix=".tmp",
+            delete=False,
+        ) as file:
+            file.write(data)
+        Path(file.name).replace(path)
+        now = self._clock()
+        os.utime(path, (now, now))
+
+        with self._lock:
+            self._total += len(data) - self._sizes.get(path, 0)
+            self._sizes[path] = len(data)
+            full = self._total > self.max_bytes
+        if full:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries until the cache fits.
+
+        The directory is scanned for the last use of every entry, which also
+        resets the running total.
+        """
+        with self._lock:
+            entries = []
+            for path in self.directory.glob(f"*{ENTRY_SUFFIX}"):
+                with contextlib.suppress(FileNotFoundError):
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            self._sizes = {path: size for _, size, path in entries}
+            self._total = sum(self._sizes.values())
+            for _, size, path in sorted(entries):
+                if self._total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                del self._sizes[path]
+                self._total -= size
@@ -15,20 +15,871 @@
 
 from __future__ import annotations
 
-from typing import override
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, cast, override
 
-from singer_sdk import RESTStream
+import requests
+from singer_sdk import RESTStream, metrics
 from singer_sdk.authenticators import BearerTokenAuthenticator
+from singer_sdk.exceptions import RetriableAPIError
+from singer_sdk.helpers.conform import TypeConformanceLevel
+from singer_sdk.helpers.jsonpath import extract_jsonpath
+
+from tap_bitly.digests import DIGEST_RUN_KEY, ChangeTracker
+from tap_bitly.output import RecordMessageFactory
+from tap_bitly.pagination import get_page_size
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Iterable, Mapping
+    from concurrent.futures import Executor, Future
+
+    from singer_sdk.helpers.types import Context
+    from singer_sdk.singerlib import RecordMessage
+
+    from tap_bitly.digests import DigestStore
+    from tap_bitly.tap import TapBitly
+
+#: Base URL of the Bitly API.
+DEFAULT_API_URL = "https://api-ssl.bitly.com"
+
+#: Property of tombstones with the time a record was found deleted.
+DELETED_AT_PROPERTY = "_sdc_deleted_at"
+
+#: Format of the ``unit_reference`` parameter accepted by Bitly metrics endpoints.
+UNIT_REFERENCE_FORMAT = "%Y-%m-%dT%H:%M:%S+0000"
+
+#: Child partitions to prefetch per worker before syncing them.
+PREFETCH_BATCH_FACTOR = 4
+
+# Attribute of a response that holds its parsed body.
+_PARSED_BODY_ATTR = "_tap_bitly_parsed_body"
+
+
+def _get_json_decoder() -> Callable[[bytes], Any]:
+    try:
+        import orjson  # noqa: PLC0415
+    except ImportError:
+        return partial(json.loads, parse_float=Decimal)
+    return orjson.loads
+
+
+_decode_json = _get_json_decoder()
+
+
+def parse_json(response: requests.Response) -> Any:  # noqa: ANN401
+    """Parse a response body, decoding it only once.
+
+    Both the paginator and the record parser read the body of a page, so the parsed
+    body is kept on the response. ``orjson`` is used to decode it if installed.
+
+    Args:
+        response: The HTTP response.
+
+    Returns:
+        The parsed response body.
+    """
+    try:
+        return getattr(response, _PARSED_BODY_ATTR)
+    except AttributeError:
+        body = _decode_json(response.content)
+        setattr(response, _PARSED_BODY_ATTR, body)
+        return body
+
+
+class ChangeCaptureSchema:
+    """Schema of a stream that only emits new and changed records.
+
+    Assign it to the ``schema`` of a stream class, like the SDK's ``StreamSchema``.
+    When ``emit_tombstones`` is enabled, the schema has the ``_sdc_deleted_at``
+    property of tombstones.
+    """
+
+    def __init__(self, schema: dict[str, Any]) -> None:
+        """Initialize the schema.
+
+        Args:
+            schema: The schema of the records of the stream.
+        """
+        self.schema = schema
+        self.tombstone_schema = {
+            **schema,
+            "properties": {
+                **schema["properties"],
+                DELETED_AT_PROPERTY: {
+                    "type": ["string", "null"],
+                    "format": "date-time",
+                },
+            },
+        }
+
+    def __get__(
+        self,
+        stream: BitlyStream[Any] | None,
+        owner: type[BitlyStream[Any]],
+    ) -> dict[str, Any]:
+        """Get the schema of a stream.
+
+        Args:
+            stream: The stream, or None when read from the stream class.
+            owner: The stream class.
+
+        Returns:
+            The schema, with the tombstone property if tombstones are emitted.
+        """
+        if stream is not None and stream.config.get("emit_tombstones"):
+            return self.tombstone_schema
+        return self.schema
 
 
 class BitlyStream[T](RESTStream[T]):
     """Bitly stream class."""
 
-    url_base = "https://api-ssl.bitly.com"
     records_jsonpath = "$[*]"
     _page_size = 100
 
+    #: Key of the records in a response body, read instead of ``records_jsonpath``.
+    records_key: str | None = None
+
+    #: Whether partitions of this stream can be fetched concurrently by the parent.
+    concurrent_partitions = False
+
+    #: Whether responses can be served from the on-disk cache, if enabled.
+    cache_responses = False
+
+    #: Whether records are written to batch files, when BATCH messages are enabled.
+    batch_records = False
+
+    #: Whether the page size of this stream adapts to the responses to its requests.
+    adaptive_page_size = False
+
+    #: Properties read by child contexts and post-processing. When set, records are
+    #: projected to these and the selected properties as responses are parsed.
+    required_properties: tuple[str, ...] | None = None
+
+    #: Whether only new and changed records are emitted, when the record index is
+    #: enabled. Records missing from a full scan are marked deleted.
+    change_capture = False
+
+    #: Record properties with the partition of a record, i.e. its parent's keys.
+    #: Records missing from a full scan are looked up within their partition.
+    change_partition_keys: tuple[str, ...] = ()
+
+    #: Whether partitions of this stream can be deferred to a later sync, to keep a
+    #: sync within ``max_requests``.
+    deferrable = False
+
+    def __init__(self, tap: TapBitly) -> None:
+        """Initialize the stream.
+
+        Args:
+            tap: The tap instance.
+        """
+        super().__init__(tap)
+        self._prefetched: dict[tuple[Any, ...], Future[list[dict[str, Any]]]] = {}
+        self._pending_child_contexts: list[Context] = []
+        self._change_tracker: ChangeTracker | None = None
+        #: Builder of the RECORD messages of this stream.
+        self.record_messages = RecordMessageFactory(self)
+
+    @property
+    def tap(self) -> TapBitly:
+        """The tap this stream belongs to."""
+        return cast("TapBitly", self._tap)
+
+    @override
+    @property
+    def url_base(self) -> str:
+        api_url: str = self.config.get("api_url", DEFAULT_API_URL)
+        return api_url.rstrip("/")
+
     @override
     @property
     def authenticator(self) -> BearerTokenAuthenticator:
         return BearerTokenAuthenticator(token=self.config["token"])
+
+    @override
+    @property
+    def requests_session(self) -> requests.Session:
+        return self.tap.requests_session
+
+    @override
+    def _request(
+        self,
+        prepared_request: requests.PreparedRequest,
+        context: Context | None = None,
+    ) -> requests.Response:
+        # The SDK sends the requests of the stream here, and has no public hook to
+        # rate limit or cache them
+        return self._send_request(prepared_request, self.path)
+
+    def _observe_page_size(
+        self,
+        endpoint: str,
+        page_size: int,
+        seconds: float,
+        response: requests.Response,
+    ) -> None:
+        # Only successful responses tell the cost of a page
+        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            self.tap.page_sizes.observe_throttled(endpoint, size=page_size)
+        elif response.ok:
+            self.tap.page_sizes.observe(
+                endpoint,
+                size=page_size,
+                seconds=seconds,
+                response_bytes=len(response.content),
+            )
+
+    def _send_request(
+        self,
+        prepared_request: requests.PreparedRequest,
+        endpoint: str,
+    ) -> requests.Response:
+        prepared_request = self.authenticator(prepared_request)
+        cache = self.tap.response_cache if self.cache_responses else None
+        entry = None
+        if cache is not None and (entry := cache.get(prepared_request)):
+            if cache.is_fresh(entry):
+                return entry.to_response(prepared_request)
+            prepared_request.headers.update(entry.conditional_headers())
+
+        limiter = self.tap.rate_limiter
+        limiter.acquire(endpoint)
+        page_size = None
+        if self.adaptive_page_size and prepared_request.url:
+            page_size = get_page_size(prepared_request.url)
+        started = time.perf_counter()
+        try:
+            response = self.requests_session.send(
+                prepared_request,
+                timeout=self.timeout,
+                allow_redirects=self.allow_redirects,
+            )
+        except requests.Timeout:
+            if page_size is not None:
+                self.tap.page_sizes.observe_timeout(endpoint, size=page_size)
+            raise
+        seconds = time.perf_counter() - started
+        if (budget := self.tap.request_budget) is not None:
+            budget.spend()
+        self.tap.telemetry.record_request(
+            self.name,
+            endpoint,
+            seconds=seconds,
+            response_bytes=len(response.content),
+        )
+        if page_size is not None:
+            self._observe_page_size(endpoint, page_size, seconds, response)
+        self._write_request_duration_log(endpoint=endpoint, response=response)
+        limiter.update(endpoint, response)
+        if cache is not None:
+            response = cache.update(prepared_request, response, entry)
+        try:
+            self.validate_response(response)
+        except RetriableAPIError:
+            self.tap.telemetry.record_retry(self.name, endpoint)
+            raise
+        return response
+
+    def request_json(
+        self,
+        endpoint: str,
+        params: dict[str, Any],
+        *,
+        count_records: bool = False,
+        **path_params: str,
+    ) -> dict[str, Any]:
+        """Request a document from an endpoint other than the stream's own.
+
+        The request is rate limited and retried like the stream's own requests.
+
+        Args:
+            endpoint: The endpoint path template, e.g. ``/v4/groups/{group_guid}``.
+            params: The query parameters.
+            count_records: Whether the document holds records of this stream, which
+                are counted in the telemetry.
+            path_params: Values for the endpoint path template.
+
+        Returns:
+            The parsed response body.
+        """
+        path = endpoint.format_map({
+            key: self._url_encode(value) for key, value in path_params.items()
+        })
+        prepared_request = self.build_prepared_request(
+            method="GET",
+            url=f"{self.url_base}{path}",
+            params=params,
+            headers=self.http_headers,
+        )
+
+        def send(
+            prepared_request: requests.PreparedRequest,
+            context: Context | None,  # noqa: ARG001
+        ) -> requests.Response:
+            return self._send_request(prepared_request, endpoint)
+
+        response = self.request_decorator(send)(prepared_request, None)
+        started = time.perf_counter()
+        body = parse_json(response)
+        records = len(self.extract_records(body)) if count_records else 0
+        self.tap.telemetry.record_parse(
+            self.name,
+            endpoint,
+            seconds=time.perf_counter() - started,
+            records=records,
+        )
+        self.tap.telemetry.log_due(metrics.get_metrics_logger())
+        return body  # type: ignore[no-any-return]
+
+    @override
+    def parse_response(self, response: requests.Response) -> Iterable[dict[str, Any]]:
+        started = time.perf_counter()
+        records = self.extract_records(parse_json(response))
+        if (projection := self._get_projection()) is not None:
+            records = [
+                {key: value for key, value in record.items() if key in projection}
+                for record in records
+            ]
+        self.tap.telemetry.record_parse(
+            self.name,
+            self.path,
+            seconds=time.perf_counter() - started,
+            records=len(records),
+        )
+        self.tap.telemetry.log_due(metrics.get_metrics_logger())
+        yield from records
+
+    def _get_projection(self) -> frozenset[str] | None:
+        """Get the properties to keep in parsed records.
+
+        Records of an unselected stream are only used to sync its children, so
+        they are projected to the required properties.
+
+        Returns:
+            The property names, or None to keep every property.
+        """
+        if self.required_properties is None:
+            return None
+
+        keep = {*self.required_properties, *self.primary_keys}
+        if self.replication_key:
+            keep.add(self.replication_key)
+        if self.selected:
+            keep.update(
+                name
+                for name in self.schema["properties"]
+                if self.mask.get(("properties", name), True)
+            )
+        return frozenset(keep)
+
+    def extract_records(self, body: Any) -> list[dict[str, Any]]:  # noqa: ANN401
+        """Extract the records from a parsed response body.
+
+        Args:
+            body: The parsed response body.
+
+        Returns:
+            The records in the response.
+        """
+        if self.records_key is None:
+            return list(extract_jsonpath(self.records_jsonpath, body))
+        return body.get(self.records_key) or []
+
+    @override
+    def log_sync_costs(self) -> None:
+        super().log_sync_costs()
+        self.tap.telemetry.log_stream(metrics.get_metrics_logger(), self.name)
+        if (budget := self.tap.request_budget) is not None:
+            budget.log_deferred(self.logger, self.name)
+
+    @override
+    def _generate_record_messages(
+        self,
+        record: dict[str, Any],
+    ) -> Generator[RecordMessage, None, None]:
+        # The SDK has no public hook to build RECORD messages. They are built by a
+        # factory that conforms records with a plan made once per schema
+        if self.TYPE_CONFORMANCE_LEVEL != TypeConformanceLevel.RECURSIVE:
+            yield from super()._generate_record_messages(record)
+            return
+
+        yield from self.record_messages(record, self._stream_version)
+
+    @override
+    def get_batch_config(self, config: Mapping[str, Any]) -> None:
+        # Records are batched across partitions, see _write_record_message
+        return None
+
+    @property
+    def digests(self) -> DigestStore | None:
+        """The store of emitted records, if only changed records are emitted."""
+        return self.tap.record_index if self.change_capture else None
+
+    def _get_change_tracker(self) -> ChangeTracker | None:
+        # The tracker accepts the digests of the sync the state comes from, so it is
+        # created when the first record is checked, and again if the store is
+        # opened again
+        if (digests := self.digests) is None:
+            return None
+
+        tracker = self._change_tracker
+        if tracker is None or tracker.digests is not digests:
+            tracker = self._create_change_tracker(
+                digests,
+                self.stream_state.get(DIGEST_RUN_KEY),
+            )
+            self._change_tracker = tracker
+        return tracker
+
+    def _create_change_tracker(
+        self,
+        digests: DigestStore,
+        confirmed_run: str | None,
+    ) -> ChangeTracker:
+        """Start tracking the records of this stream in a store.
+
+        Args:
+            digests: The store of emitted records.
+            confirmed_run: The ``digest_run`` in the state of the stream, if any.
+
+        Returns:
+            The tracker, storing records by partition and primary key.
+        """
+        return ChangeTracker(
+            digests,
+            self.name,
+            confirmed_run,
+            primary_keys=self.primary_keys or (),
+            partition_keys=self.change_partition_keys,
+        )
+
+    def is_full_scan(self, context: Context | None) -> bool:  # noqa: ARG002, PLR6301
+        """Whether a sync of a partition lists every one of its records.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            True if records missing from the sync were deleted.
+        """
+        return True
+
+    def _write_tombstones(self, deleted: Iterable[dict[str, Any]]) -> None:
+        """Emit a tombstone for each deleted record, if ``emit_tombstones`` is set.
+
+        Tombstones are records with the primary key and ``_sdc_deleted_at``.
+
+        Args:
+            deleted: The partition and primary key values of the deleted records.
+        """
+        if not self.config.get("emit_tombstones"):
+            return
+
+        deleted_at = datetime.now(tz=UTC).isoformat()
+        for record in deleted:
+            self._emit_record_message({**record, DELETED_AT_PROPERTY: deleted_at})
+
+    @override
+    def _sync_records(
+        self,
+        context: Context | None = None,
+        *,
+        write_messages: bool = True,
+    ) -> Generator[dict[str, Any], Any, Any]:
+        # The SDK syncs a partition, and its child partitions, here and has no
+        # public hook around it, to start the sync and to stop it when it fails
+        if self.parent_stream_type is None:
+            self.tap.prepare_sync()
+        try:
+            yield from super()._sync_records(context, write_messages=write_messages)
+        except Exception:
+            # Child streams sync within their top-level stream, so this closes the
+            # tap whichever stream failed
+            if self.parent_stream_type is None:
+                self.tap.close()
+            raise
+        tracker = self._get_change_tracker()
+        if tracker is not None and self.is_full_scan(context):
+            tracker.add_scan(context or {})
+
+    @override
+    def _write_record_message(self, record: dict[str, Any]) -> None:
+        # The SDK has no public hook to skip a record once it is post-processed and
+        # counted in the state, so unchanged records are skipped here
+        tracker = self._get_change_tracker()
+        if tracker is None or tracker.is_changed(record):
+            self._emit_record_message(record)
+
+    def _emit_record_message(self, record: dict[str, Any]) -> None:
+        batch_writer = self.tap.batch_writer
+        if batch_writer is None or not self.batch_records:
+            super()._write_record_message(record)
+            return
+
+        flush = batch_writer.write_messages(self._generate_record_messages(record))
+        self.state_manager.is_flushed = False
+        if flush:
+            self.tap.flush_batches()
+
+    @override
+    def _write_state_message(self) -> None:
+        # Every STATE message of the SDK is written here, which has no public hook
+        batch_writer = self.tap.batch_writer
+        if batch_writer is not None and batch_writer.pending:
+            # The state is written once the records are in announced batch files
+            return
+
+        if not self.state_manager.is_flushed:
+            self.tap.pack_state()
+        super()._write_state_message()
+
+    @override
+    def finalize_state_progress_markers(
+        self,
+        state: dict[str, Any] | None = None,
+    ) -> None:
+        if not state:
+            # The SDK only finalizes selected child streams, so the selected
+            # descendants of an unselected one are finalized through it
+            for child in self.child_streams:
+                if not child.selected and child.has_selected_descendents:
+                    child.finalize_state_progress_markers()
+        if (
+            state is None
+            and self.selected
+            and (tracker := self._get_change_tracker()) is not None
+        ):
+            self._write_tombstones(tracker.finish())
+            tracker.digests.commit()
+            # Digests of this sync are accepted once a sync starts from this state
+            self.stream_state[DIGEST_RUN_KEY] = tracker.digests.run_id
+        self.tap.flush_batches()
+        super().finalize_state_progress_markers(state)
+        if state is None and self is self.tap.last_stream:
+            self.tap.close()
+
+    @override
+    def backoff_wait_generator(
+        self,
+    ) -> Generator[float, BaseException | None, None]:
+        """Wait exponentially longer after errors, but not after throttling.
+
+        Throttled requests already pause the shared rate limiter, which is waited
+        on before the request is retried.
+
+        Yields:
+            The number of seconds to wait before retrying.
+        """
+        # backoff primes the generator and discards this first value
+        exception = yield 0.0
+        attempt = 0
+        while True:
+            if (
+                isinstance(exception, RetriableAPIError)
+                and exception.response is not None
+                and exception.response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+            ):
+                exception = yield 0
+            else:
+                exception = yield 2 * 2**attempt
+                attempt += 1
+
+    @property
+    def prefetch_enabled(self) -> bool:
+        """Whether the parent stream should fetch partitions of this stream early."""
+        return self.concurrent_partitions and self.selected
+
+    def prefetch_records(self, context: Context | None, executor: Executor) -> None:
+        """Start requesting the records of a partition in the background.
+
+        The starting replication value is written to the partition state first, so
+        worker threads only read the state.
+
+        Args:
+            context: The stream partition context, or None for a top-level stream.
+            executor: The executor to request records in.
+        """
+        self._write_starting_replication_value(context)
+        if self._is_deferred(context):
+            return
+
+        self._prefetched[_context_key(context)] = executor.submit(
+            self._fetch_records,
+            context,
+        )
+
+    def _fetch_records(self, context: Context | None) -> list[dict[str, Any]]:
+        return list(self.fetch_records(context))
+
+    def fetch_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        """Request the records of a partition from the API.
+
+        Args:
+            context: The stream partition context.
+
+        Yields:
+            The records of the partition.
+        """
+        yield from super().request_records(context)
+
+    @override
+    def request_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        # Prefetches are cancelled when the tap is closed after a stream failed
+        future = self._prefetched.pop(_context_key(context), None)
+        if future is not None and not future.cancelled():
+            yield from future.result()
+            return
+
+        budget = self.tap.request_budget
+        if budget is not None and self._is_deferred(context):
+            budget.defer(self.name)
+            return
+
+        yield from self.fetch_records(context)
+
+    def _is_deferred(self, context: Context | None) -> bool:
+        """Check whether a partition is deferred to a later sync, to save requests.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            Whether the stream is deferrable and the request budget defers the
+            partition, from its starting time.
+        """
+        budget = self.tap.request_budget
+        if budget is None or not self.deferrable or context is None:
+            return False
+        return budget.defers(self.name, self.get_starting_timestamp(context))
+
+    def estimate_requests(self, start: datetime | None) -> int:  # noqa: ARG002, PLR6301
+        """Estimate the number of requests to sync a partition, to plan a sync.
+
+        Args:
+            start: The starting time of the partition, from its bookmark or
+                ``start_date``, if any.
+
+        Returns:
+            The number of requests.
+        """
+        return 1
+
+    @override
+    def get_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        yield from super().get_records(context)
+        self._flush_child_contexts()
+
+    @override
+    def _sync_children(self, child_context: Context | None) -> None:
+        # The SDK syncs the children of each record here, and has no public hook to
+        # sync them in batches
+        if child_context is None or self.config.get("max_workers", 1) <= 1:
+            super()._sync_children(child_context)
+            return
+
+        self._pending_child_contexts.append(child_context)
+        batch_size = self.config["max_workers"] * PREFETCH_BATCH_FACTOR
+        if len(self._pending_child_contexts) >= batch_size:
+            self._flush_child_contexts()
+
+    def _flush_child_contexts(self) -> None:
+        """Sync pending child partitions, fetching their records concurrently.
+
+        Records are fetched by a pool of ``max_workers`` threads, then child streams
+        are synced one partition at a time in the order the parent records were
+        read, so messages and state are emitted deterministically.
+        """
+        contexts, self._pending_child_contexts = self._pending_child_contexts, []
+        if not contexts:
+            return
+
+        children = [
+            child
+            for child in self.child_streams
+            if isinstance(child, BitlyStream) and child.prefetch_enabled
+        ]
+        with ThreadPoolExecutor(max_workers=self.config["max_workers"]) as executor:
+            for context in contexts:
+                for child in children:
+                    child.prefetch_records(context, executor)
+
+            for context in contexts:
+                super()._sync_children(context)
+
+
+def _context_key(context: Context | None) -> tuple[Any, ...]:
+    return tuple(sorted(context.items())) if context else ()
+
+
+class BitlyMetricsStream[T](BitlyStream[T]):
+    """Base class for windowed metrics endpoints.
+
+    Metrics endpoints accept ``unit``, ``units`` and ``unit_reference`` query
+    parameters. Each partition asks only for the units between its bookmark, minus
+    a lookback window, and the time the sync started.
+    """
+
+    #: The time unit of the metrics.
+    unit = "day"
+
+    #: Config setting with the number of days to re-fetch before the bookmark.
+    lookback_setting = "clicks_lookback_days"
+
+    concurrent_partitions = True
+
+    @property
+    def request_unit(self) -> str:
+        """The time unit to request metrics in."""
+        return self.unit
+
+    @property
+    def unit_reference(self) -> datetime:
+        """The most recent time to request metrics for."""
+        return datetime.fromtimestamp(self._initialized_at / 1000, tz=UTC)
+
+    def get_window_start(self, context: Context | None) -> datetime | None:
+        """Get the earliest time to request metrics for.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            The bookmark or ``start_date`` minus the lookback window, or None to
+            request all available units.
+        """
+        return self.get_window_start_at(self.get_starting_timestamp(context))
+
+    def get_window_start_at(self, start: datetime | None) -> datetime | None:
+        """Get the earliest time to request metrics for, from a starting time.
+
+        Args:
+            start: The starting time of a partition, if any.
+
+        Returns:
+            The starting time minus the lookback window, or None to request all
+            available units.
+        """
+        if start is None:
+            return None
+
+        return start - timedelta(days=self.config.get(self.lookback_setting, 0))
+
+    def get_units(self, context: Context | None) -> int:
+        """Get the number of units to request, counting both window edges.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            The number of units, or -1 to request all available units.
+        """
+        start = self.get_window_start(context)
+        if start is None:
+            return -1
+
+        return self.count_units(start, self.request_unit)
+
+    def count_units(self, start: datetime, unit: str) -> int:
+        """Count the units from a start time up to the unit reference, inclusive.
+
+        Args:
+            start: The earliest time to count units from.
+            unit: The time unit, ``day`` or ``month``.
+
+        Returns:
+            The number of units.
+        """
+        end = self.unit_reference
+        if unit == "month":
+            units = (end.year - start.year) * 12 + end.month - start.month
+        else:
+            units = (end.date() - start.date()).days
+
+        return max(units, 0) + 1
+
+    @override
+    def get_url_params(
+        self,
+        context: Context | None,
+        next_page_token: T | None,
+    ) -> dict[str, Any]:
+        return {
+            "unit": self.request_unit,
+            "units": self.get_units(context),
+            "unit_reference": self.unit_reference.strftime(UNIT_REFERENCE_FORMAT),
+        }
+
+
+class BitlyFacetStream[T](BitlyMetricsStream[T]):
+    """Base class for metrics endpoints that break clicks down by a facet.
+
+    Facet endpoints, like countries or referrers, total the clicks of the whole
+    requested window. To keep the records incremental, each day of the window is
+    requested separately and its records are dated with the start of the day.
+
+    Every day of the window costs one request per partition, so partitions without
+    a bookmark or a start date only sync the lookback window, and partitions that
+    don't fit the request budget are deferred.
+    """
+
+    records_key = "metrics"
+    is_sorted = True
+
+    deferrable = True
+
+    @override
+    def get_window_start(self, context: Context | None) -> datetime:
+        return self.get_window_start_at(self.get_starting_timestamp(context))
+
+    @override
+    def get_window_start_at(self, start: datetime | None) -> datetime:
+        lookback = timedelta(days=self.config.get(self.lookback_setting, 0))
+        return (start or self.unit_reference) - lookback
+
+    @override
+    def estimate_requests(self, start: datetime | None) -> int:
+        # One request per day of the window
+        return self.count_units(self.get_window_start_at(start), "day")
+
+    def get_days(self, context: Context | None) -> list[datetime]:
+        """Get the start of each day to request metrics for, oldest first.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            The days from the window start up to the unit reference.
+        """
+        start = self.get_window_start(context)
+        first = start.astimezone(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+        return [
+            first + timedelta(days=offset)
+            for offset in range(self.count_units(first, "day"))
+        ]
+
+    @override
+    def fetch_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        path_params = {key: str(value) for key, value in (context or {}).items()}
+        for day in self.get_days(context):
+            reference = min(day + timedelta(days=1, seconds=-1), self.unit_reference)
+            body = self.request_json(
+                self.path,
+                {
+                    "unit": "day",
+                    "units": 1,
+                    "unit_reference": reference.strftime(UNIT_REFERENCE_FORMAT),
+                    "size": self._page_size,
+                },
+                count_records=True,
+                **path_params,
+            )
+            date = day.strftime(UNIT_REFERENCE_FORMAT)
+            for record in self.extract_records(body):
+                yield {**record, "date": date}
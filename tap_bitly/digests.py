@@ -0,0 +1,381 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local store of the digests of emitted records, to only emit records that changed.
+
+Click counts of recent days are re-fetched on every sync, and full scans of
+bitlinks, groups and other streams list every record again, while most of them are
+unchanged. The store keeps a 64-bit digest of the last emitted values of each
+record, so unchanged records can be skipped, and records missing from a full scan
+can be marked deleted.
+
+A record must not be skipped unless the target loaded its last emitted values, so
+the digests written by a sync stay pending until a later sync starts from the state
+it emitted::
+
+    {"bookmarks": {"daily_bitlink_clicks": {"digest_run": "...", ...}}}
+
+Pending digests of a sync whose final state was not used are discarded, and the
+digests of a stream are cleared when it starts without a ``digest_run``, e.g.
+after its state was reset.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import uuid
+from typing import TYPE_CHECKING, Any, override
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from pathlib import Path
+
+#: Key of the ID of the sync that wrote the digests, in the state of a stream.
+DIGEST_RUN_KEY = "digest_run"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    stream TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    key TEXT NOT NULL,
+    digest INTEGER,
+    pending_digest INTEGER,
+    pending_run TEXT,
+    seen_run TEXT,
+    PRIMARY KEY (stream, partition, key)
+) WITHOUT ROWID
+"""
+
+
+def get_digest(record: Mapping[str, Any], keys: Iterable[str]) -> int:
+    """Get the digest of the values of a record.
+
+    Args:
+        record: The record.
+        keys: The primary key properties, left out of the digest.
+
+    Returns:
+        A signed 64-bit digest of the other properties.
+    """
+    skip = set(keys)
+    values = {key: value for key, value in record.items() if key not in skip}
+    data = json.dumps(values, sort_keys=True, default=str).encode()
+    return int.from_bytes(
+        hashlib.blake2b(data, digest_size=8).digest(),
+        signed=True,
+    )
+
+
+class DigestStore:
+    """SQLite store of record digests, by stream, partition and key.
+
+    Call :meth:`start` before checking the records of a stream, and :meth:`commit`
+    once they were all emitted. A pending digest without a value marks a record
+    deleted by the sync.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Open the store, creating it if needed.
+
+        Args:
+            path: Path of the SQLite database.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        #: ID of this sync, written to the state of the streams it emits records of.
+        self.run_id = uuid.uuid4().hex
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_SCHEMA)
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def start(self, stream_name: str, confirmed_run: str | None) -> None:
+        """Accept the pending digests of the sync the state of a stream comes from.
+
+        Args:
+            stream_name: The stream name.
+            confirmed_run: The ``digest_run`` in the state of the stream, if any.
+        """
+        with self._lock, self._connection as connection:
+            if confirmed_run is None:
+                connection.execute(
+                    "DELETE FROM digests WHERE stream = ?",
+                    (stream_name,),
+                )
+                return
+
+            connection.execute(
+                """
+                UPDATE digests
+                SET digest = CASE
+                        WHEN pending_run = ? THEN pending_digest ELSE digest
+                    END,
+                    pending_digest = NULL,
+                    pending_run = NULL
+                WHERE stream = ? AND pending_run IS NOT NULL
+                """,
+                (confirmed_run, stream_name),
+            )
+            connection.execute(
+                "DELETE FROM digests WHERE stream = ? AND digest IS NULL",
+                (stream_name,),
+            )
+
+    def changed(
+        self,
+        stream_name: str,
+        partition: str,
+        key: str,
+        digest: int,
+    ) -> bool:
+        """Check whether a record changed since it was last loaded, and record it.
+
+        Args:
+            stream_name: The stream name.
+            partition: The partition of the record, e.g. its group.
+            key: The primary key of the record within its partition.
+            digest: The digest of the record values.
+
+        Returns:
+            Whether the record is new or its values changed.
+        """
+        with self._lock:
+            params = (stream_name, partition, key)
+            row = self._connection.execute(
+                """
+                SELECT digest FROM digests
+                WHERE stream = ? AND partition = ? AND key = ?
+                """,
+                params,
+            ).fetchone()
+            if row is not None and row[0] == digest:
+                self._connection.execute(
+                    """
+                    UPDATE digests SET seen_run = ?
+                    WHERE stream = ? AND partition = ? AND key = ?
+                    """,
+                    (self.run_id, *params),
+                )
+                return False
+
+            self._connection.execute(
+                """
+                INSERT INTO digests (
+                    stream, partition, key, pending_digest, pending_run, seen_run
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (stream, partition, key) DO UPDATE
+                SET pending_digest = excluded.pending_digest,
+                    pending_run = excluded.pending_run,
+                    seen_run = excluded.seen_run
+                """,
+                (*params, digest, self.run_id, self.run_id),
+            )
+            return True
+
+    def delete_unseen(self, stream_name: str, partition: str) -> list[str]:
+        """Mark the loaded records of a partition that this sync did not see deleted.
+
+        Args:
+            stream_name: The stream name.
+            partition: The partition, fully scanned by this sync.
+
+        Returns:
+            The keys of the deleted records.
+        """
+        with self._lock:
+            params = (stream_name, partition, self.run_id)
+            keys = [
+                key
+                for (key,) in self._connection.execute(
+                    """
+                    SELECT key FROM digests
+                    WHERE stream = ? AND partition = ? AND digest IS NOT NULL
+                        AND seen_run IS NOT ?
+                    """,
+                    params,
+                )
+            ]
+            self._connection.execute(
+                """
+                UPDATE digests
+                SET pending_digest = NULL, pending_run = ?, seen_run = ?
+                WHERE stream = ? AND partition = ? AND digest IS NOT NULL
+                    AND seen_run IS NOT ?
+                """,
+                (self.run_id, self.run_id, *params),
+            )
+            return keys
+
+    def prune(self, stream_name: str, expired_before: str) -> None:
+        """Drop the digests of records whose key sorts before a value.
+
+        Args:
+            stream_name: The stream name.
+            expired_before: Records with keys before this are dropped, e.g. the
+                earliest date that is still re-fetched.
+        """
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM digests WHERE stream = ? AND key < ?",
+                (stream_name, expired_before),
+            )
+
+    def commit(self) -> None:
+        """Commit the digests written so far."""
+        with self._lock:
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Close the store, dropping uncommitted digests."""
+        with self._lock:
+            self._connection.close()
+
+
+class ChangeTracker:
+    """Tell which records of a stream changed since they were last emitted.
+
+    Records are stored by partition, e.g. their group, and primary key. Partitions
+    that a sync scanned fully are remembered, so the records missing from them can
+    be marked deleted once the stream is synced.
+    """
+
+    def __init__(
+        self,
+        digests: DigestStore,
+        stream_name: str,
+        confirmed_run: str | None,
+        *,
+        primary_keys: Sequence[str],
+        partition_keys: Sequence[str],
+    ) -> None:
+        """Start tracking the records of a stream.
+
+        Args:
+            digests: The store of emitted records.
+            stream_name: The stream name.
+            confirmed_run: The ``digest_run`` in the state of the stream, if any.
+            primary_keys: The primary key properties of the records.
+            partition_keys: The properties with the partition of a record.
+        """
+        digests.start(stream_name, confirmed_run)
+        self.digests = digests
+        self.stream_name = stream_name
+        self.primary_keys = tuple(primary_keys)
+        self.partition_keys = tuple(partition_keys)
+        self._scanned: set[str] = set()
+
+    def get_partition(self, values: Mapping[str, Any]) -> str:
+        """Get the partition of a record or context.
+
+        Args:
+            values: The record or the stream partition context.
+
+        Returns:
+            The JSON-encoded values of the partition keys.
+        """
+        return json.dumps([values.get(key) for key in self.partition_keys])
+
+    def is_changed(self, record: Mapping[str, Any]) -> bool:
+        """Check whether a record changed since it was last emitted, and record it.
+
+        Args:
+            record: The record.
+
+        Returns:
+            Whether the record should be emitted.
+        """
+        key = json.dumps([record.get(name) for name in self.primary_keys])
+        return self.digests.changed(
+            self.stream_name,
+            self.get_partition(record),
+            key,
+            get_digest(record, ()),
+        )
+
+    def add_scan(self, context: Mapping[str, Any]) -> None:
+        """Remember a partition the sync listed every record of.
+
+        Args:
+            context: The stream partition context.
+        """
+        self._scanned.add(self.get_partition(context))
+
+    def finish(self) -> list[dict[str, Any]]:
+        """Mark the records missing from the scanned partitions deleted.
+
+        Returns:
+            The partition and primary key values of the deleted records.
+        """
+        deleted: list[dict[str, Any]] = []
+        for partition in sorted(self._scanned):
+            values = dict(zip(self.partition_keys, json.loads(partition), strict=True))
+            deleted.extend(
+                {**values, **dict(zip(self.primary_keys, json.loads(key), strict=True))}
+                for key in self.digests.delete_unseen(self.stream_name, partition)
+            )
+        self._scanned.clear()
+        return deleted
+
+
+class ClickChangeTracker(ChangeTracker):
+    """Tell which rows of clicks by bitlink and date changed since they were emitted.
+
+    Rows are stored by bitlink and date. Rows older than the lookback window of the
+    next sync are always emitted, and not stored.
+    """
+
+    def __init__(
+        self,
+        digests: DigestStore,
+        stream_name: str,
+        confirmed_run: str | None,
+        *,
+        cutoff: str,
+    ) -> None:
+        """Start tracking the rows of a stream.
+
+        Args:
+            digests: The store of emitted rows.
+            stream_name: The stream name.
+            confirmed_run: The ``digest_run`` in the state of the stream, if any.
+            cutoff: The earliest date the next sync re-fetches clicks for.
+        """
+        super().__init__(
+            digests,
+            stream_name,
+            confirmed_run,
+            primary_keys=("date",),
+            partition_keys=("bitlink",),
+        )
+        self.cutoff = cutoff
+
+    @override
+    def is_changed(self, record: Mapping[str, Any]) -> bool:
+        date = record["date"]
+        if date < self.cutoff:
+            return True
+
+        # Rows are stored by bitlink and date, so only their other values are digested
+        digest = get_digest(record, ("bitlink", "date"))
+        return self.digests.changed(self.stream_name, record["bitlink"], date, digest)
+
+    @override
+    def finish(self) -> list[dict[str, Any]]:
+        # Rows are never deleted, only the digests of days the next sync does not
+        # re-fetch are dropped
+        self.digests.prune(self.stream_name, self.cutoff)
+        return []
@@ -0,0 +1,353 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Fast path of Singer messages, from record conformance to stdout.
+
+The SDK conforms every record by walking its schema and selection mask property by
+property, serializes messages with ``simplejson`` and flushes stdout after each
+line. Here the conformance of each stream is planned once from its schema, messages
+are serialized with ``orjson`` if installed, and lines are written through a large
+buffer.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from datetime import UTC, datetime
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, override
+
+# Values are conformed by the same helpers the SDK's streams use, which it does not
+# export publicly, so records are conformed exactly as the SDK does
+from singer_sdk.helpers._catalog import (  # noqa: PLC2701
+    pop_deselected_record_properties,
+)
+from singer_sdk.helpers._typing import conform_record_data_types  # noqa: PLC2701
+from singer_sdk.helpers.conform import TypeConformanceLevel
+from singer_sdk.singerlib import RecordMessage
+from singer_sdk.singerlib.encoding import GenericSingerWriter, SingerMessageType
+from singer_sdk.singerlib.json import serialize_json
+
+if TYPE_CHECKING:
+    import logging
+    from collections.abc import Callable, Iterator, Mapping
+
+    from singer_sdk import Stream
+    from singer_sdk.singerlib import Message, SelectionMask
+
+#: Types of values that never need to be conformed.
+PLAIN_TYPES = frozenset({str, int, bool, type(None)})
+
+#: JSON schema types whose plain values are left unchanged by the SDK.
+PRIMITIVE_TYPES = frozenset({"string", "integer", "number", "null"})
+
+
+def _get_json_encoder() -> Callable[[Mapping[str, Any]], bytes]:
+    try:
+        import orjson  # noqa: PLC0415
+    except ImportError:
+        return lambda obj: serialize_json(obj).encode()
+
+    def default(obj: Any) -> Any:  # noqa: ANN401
+        # Decimals are written as numbers, like simplejson does
+        if isinstance(obj, Decimal):
+            return orjson.Fragment(str(obj))
+        return str(obj)
+
+    def encode(obj: Mapping[str, Any]) -> bytes:
+        try:
+            return orjson.dumps(obj, default=default)
+        except TypeError:
+            # e.g. integers over 64 bits
+            return serialize_json(obj).encode()
+
+    return encode
+
+
+_encode_json = _get_json_encoder()
+
+
+def encode_json(obj: Mapping[str, Any]) -> bytes:
+    """Encode a message or record as JSON, like the SDK does.
+
+    ``orjson`` is used if installed.
+
+    Args:
+        obj: The message or record.
+
+    Returns:
+        The JSON document.
+    """
+    return _encode_json(obj)
+
+
+class BufferedSingerWriter(GenericSingerWriter[bytes, "Message"]):
+    """Write Singer messages to stdout through a buffer.
+
+    Only RECORD messages are buffered: lines are flushed after any other message,
+    e.g. SCHEMA and STATE messages, when the buffer is full, and when the oldest
+    buffered line is older than the flush interval. Messages keep their order, so
+    a STATE message never reaches stdout before the records it follows, and every
+    sync ends with a STATE message, which leaves nothing buffered. The tap flushes
+    the writer itself when a sync fails.
+    """
+
+    #: Number of bytes to buffer before writing to stdout.
+    buffer_size = 1024 * 1024
+
+    #: Maximum number of seconds a line is buffered for.
+    flush_interval = 1.0
+
+    def __init__(self) -> None:
+        """Initialize the writer."""
+        self._buffer = bytearray()
+        self._buffered_at = 0.0
+
+    @override
+    def serialize_message(self, message: Message) -> bytes:
+        return encode_json(message.to_dict())
+
+    @override
+    def write_message(self, message: Message) -> None:
+        if not self._buffer:
+            self._buffered_at = time.monotonic()
+        self._buffer += self.format_message(message)
+        self._buffer += b"\n"
+        if (
+            message.type != SingerMessageType.RECORD
+            or len(self._buffer) >= self.buffer_size
+            or time.monotonic() - self._buffered_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered lines to stdout."""
+        if not self._buffer:
+            return
+
+        # stdout is looked up on every flush, since it may be replaced, e.g. when
+        # captured in tests
+        stdout = sys.stdout
+        stdout.flush()
+        stdout.buffer.write(self._buffer)
+        stdout.buffer.flush()
+        self._buffer.clear()
+
+
+class RecordConformer:
+    """Conform records to a stream schema, like the SDK, with a precomputed plan.
+
+    A check is compiled for each selected property, from its schema and selection,
+    telling whether a value is left unchanged by the SDK. Values that pass it are
+    copied as-is, and every other value is conformed by the SDK, so the result is
+    the same as that of ``conform_record_data_types``.
+    """
+
+    def __init__(
+        self,
+        stream_name: str,
+        schema: dict[str, Any],
+        mask: SelectionMask,
+        logger: logging.Logger | logging.LoggerAdapter[Any],
+    ) -> None:
+        """Plan the conformance of the records of a stream.
+
+        Args:
+            stream_name: The stream name.
+            schema: The effective schema of the stream.
+            mask: The selection mask of the stream.
+            logger: Logger of unmapped properties.
+        """
+        self.stream_name = stream_name
+        self.schema = schema
+        self.mask = mask
+        self.logger = logger
+
+        properties: Mapping[str, Any] = schema.get("properties", {})
+        #: Checks of the selected properties.
+        self.checks = {
+            name: _compile_check(property_schema, mask, ("properties", name))
+            for name, property_schema in properties.items()
+            if mask["properties", name]
+        }
+        #: Properties dropped from records, i.e. deselected and unmapped ones.
+        self.dropped = set(properties) - set(self.checks)
+
+    def __call__(self, record: dict[str, Any]) -> dict[str, Any]:
+        """Conform a record.
+
+        Args:
+            record: The record.
+
+        Returns:
+            The conformed record.
+        """
+        checks = self.checks
+        result: dict[str, Any] = {}
+        for name, value in record.items():
+            if (check := checks.get(name)) is not None and check(value):
+                result[name] = value
+            elif name not in self.dropped:
+                result.update(self._conform(name, value))
+        return result
+
+    def _conform(self, name: str, value: Any) -> dict[str, Any]:  # noqa: ANN401
+        record = {name: value}
+        pop_deselected_record_properties(record, self.schema, self.mask)
+        conformed = conform_record_data_types(
+            stream_name=self.stream_name,
+            record=record,
+            schema=self.schema,
+            level=TypeConformanceLevel.RECURSIVE,
+            logger=self.logger,
+        )
+        if name not in self.checks and not conformed:
+            # The SDK warned about the unmapped property, drop it from now on
+            self.dropped.add(name)
+        return conformed
+
+
+class RecordMessageFactory:
+    """Build the RECORD messages of a stream, through its stream maps.
+
+    Records are conformed by a :class:`RecordConformer`, planned again when the
+    schema or the selection of the stream change.
+    """
+
+    def __init__(self, stream: Stream) -> None:
+        """Initialize the factory.
+
+        Args:
+            stream: The stream the records belong to.
+        """
+        self.stream = stream
+        self._conformer: RecordConformer | None = None
+
+    @property
+    def conformer(self) -> RecordConformer:
+        """Conformer of the records, for the current schema and selection."""
+        stream = self.stream
+        schema, mask = stream.effective_schema, stream.mask
+        conformer = self._conformer
+        if (
+            conformer is None
+            or conformer.schema is not schema
+            or conformer.mask is not mask
+        ):
+            conformer = RecordConformer(stream.name, schema, mask, stream.logger)
+            self._conformer = conformer
+        return conformer
+
+    def __call__(
+        self,
+        record: dict[str, Any],
+        version: int | None,
+    ) -> Iterator[RecordMessage]:
+        """Build the messages of a record.
+
+        Args:
+            record: The record.
+            version: The version of the stream, if any.
+
+        Yields:
+            One message per stream map that does not filter the record out.
+        """
+        record = self.conformer(record)
+        time_extracted = datetime.now(tz=UTC)
+        for stream_map in self.stream.stream_maps:
+            if (mapped_record := stream_map.transform(record)) is not None:
+                yield RecordMessage(
+                    stream=stream_map.stream_alias,
+                    record=mapped_record,
+                    version=version,
+                    time_extracted=time_extracted,
+                )
+
+
+type _Check = Callable[[Any], bool]
+
+
+def _always(value: Any) -> bool:  # noqa: ANN401, ARG001
+    return True
+
+
+def _never(value: Any) -> bool:  # noqa: ANN401, ARG001
+    return False
+
+
+def _is_plain(value: Any) -> bool:  # noqa: ANN401
+    return type(value) in PLAIN_TYPES
+
+
+def _is_boolean(value: Any) -> bool:  # noqa: ANN401
+    return value is None or type(value) is bool
+
+
+def _compile_check(  # noqa: PLR0911
+    schema: Mapping[str, Any],
+    mask: SelectionMask | None,
+    breadcrumb: tuple[str, ...],
+) -> _Check:
+    """Compile a check of the values the SDK leaves unchanged.
+
+    Args:
+        schema: The schema of the values.
+        mask: The selection mask of the stream, or None if everything is selected.
+        breadcrumb: The breadcrumb of the values in the mask.
+
+    Returns:
+        A function telling whether a value is left unchanged.
+    """
+    types = schema.get("type")
+    if isinstance(types, str):
+        types = {types}
+    if not types or "anyOf" in schema:
+        return _never
+
+    types = set(types)
+    if types <= {"boolean", "null"}:
+        # The SDK turns integer values of boolean-only properties into booleans
+        return _is_boolean
+    if types <= PRIMITIVE_TYPES | {"boolean"}:
+        return _is_plain
+
+    if types <= {"array", "null"} and "items" in schema:
+        # Deselected properties are not removed from array items
+        item_check = _compile_check(schema["items"], None, ())
+        return lambda value: (
+            value is None
+            or (type(value) is list and all(item_check(item) for item in value))
+        )
+
+    if types <= {"object", "null"}:
+        if "properties" not in schema:
+            return _always
+
+        checks = {
+            name: _compile_check(subschema, mask, (*breadcrumb, "properties", name))
+            for name, subschema in schema["properties"].items()
+            if mask is None or mask[*breadcrumb, "properties", name]
+        }
+        return lambda value: (
+            value is None
+            or (
+                type(value) is dict
+                and all(
+                    (check := checks.get(key)) is not None and check(item)
+                    for key, item in value.items()
+                )
+            )
+        )
+
+    return _never
@@ -0,0 +1,199 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Adaptive page sizes of paginated endpoints."""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+#: Name of the page size query parameter.
+SIZE_PARAM = "size"
+
+#: Page size of the first request to each endpoint.
+DEFAULT_PAGE_SIZE = 100
+
+#: Maximum body size of a page, in bytes.
+MAX_PAGE_BYTES = 8 * 1024 * 1024
+
+
+def get_page_size(url: str) -> int | None:
+    """Get the page size requested by a URL.
+
+    Args:
+        url: The request URL.
+
+    Returns:
+        The value of the ``size`` query parameter, if any.
+    """
+    for key, value in parse_qsl(urlsplit(url).query):
+        if key == SIZE_PARAM and value.isdigit():
+            return int(value)
+    return None
+
+
+def set_page_size(url: str, size: int) -> str:
+    """Set the page size requested by a URL, e.g. the next page URL of a response.
+
+    Args:
+        url: The request URL.
+        size: The page size.
+
+    Returns:
+        The URL with its ``size`` query parameter replaced.
+    """
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != SIZE_PARAM]
+    query.append((SIZE_PARAM, str(size)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+@dataclass
+class _EndpointState:
+    size: int
+    throttle_rate: float = 0.0
+
+
+class PageSizeController:
+    """Pick the page size of each endpoint from the responses to previous pages.
+
+    Page sizes grow while responses are fast, small and not throttled, and shrink
+    in proportion to how much a response exceeds the target latency or body size.
+    Throttled responses and timeouts shrink the page size of their endpoint, and
+    page sizes stop growing while the recent rate of throttled responses is high.
+    Other failed responses say nothing about the cost of a page, and are ignored.
+    """
+
+    #: Maximum factor a page size changes by after a response.
+    max_factor = 2.0
+
+    #: Factor a page size shrinks by after a throttled response.
+    throttle_factor = 0.75
+
+    #: Weight of the last response in the rate of throttled responses.
+    smoothing = 0.2
+
+    #: Rate of throttled responses above which page sizes stop growing.
+    max_throttle_rate = 0.05
+
+    def __init__(
+        self,
+        *,
+        initial_size: int,
+        min_size: int,
+        max_size: int,
+        target_seconds: float,
+        max_bytes: int,
+    ) -> None:
+        """Initialize the controller.
+
+        Args:
+            initial_size: Page size of the first request to each endpoint.
+            min_size: Minimum page size.
+            max_size: Maximum page size.
+            target_seconds: Target response time of a page.
+            max_bytes: Maximum body size of a page.
+        """
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.initial_size = self._clamp(initial_size)
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self._endpoints: dict[str, _EndpointState] = {}
+        self._lock = threading.Lock()
+
+    def _clamp(self, size: float) -> int:
+        return min(max(round(size), self.min_size), self.max_size)
+
+    def _state(self, endpoint: str) -> _EndpointState:
+        if endpoint not in self._endpoints:
+            self._endpoints[endpoint] = _EndpointState(self.initial_size)
+        return self._endpoints[endpoint]
+
+    def size(self, endpoint: str) -> int:
+        """Get the page size of the next request to an endpoint.
+
+        Args:
+            endpoint: The endpoint path template, e.g. ``/v4/groups``.
+
+        Returns:
+            The page size.
+        """
+        with self._lock:
+            return self._state(endpoint).size
+
+    def observe(
+        self,
+        endpoint: str,
+        *,
+        size: int,
+        seconds: float,
+        response_bytes: int,
+    ) -> int:
+        """Adjust the page size of an endpoint from a successful response.
+
+        Args:
+            endpoint: The endpoint path template.
+            size: The page size of the request.
+            seconds: The response time.
+            response_bytes: The size of the response body.
+
+        Returns:
+            The new page size of the endpoint.
+        """
+        with self._lock:
+            state = self._state(endpoint)
+            state.throttle_rate -= self.smoothing * state.throttle_rate
+            factor = min(
+                self.max_factor,
+                self.target_seconds / max(seconds, 1e-3),
+                self.max_bytes / max(response_bytes, 1),
+            )
+            if factor > 1 and state.throttle_rate > self.max_throttle_rate:
+                factor = 1
+            factor = max(factor, 1 / self.max_factor)
+            state.size = self._clamp(size * factor)
+            return state.size
+
+    def observe_throttled(self, endpoint: str, *, size: int) -> int:
+        """Shrink the page size of an endpoint after a request was throttled.
+
+        Args:
+            endpoint: The endpoint path template.
+            size: The page size of the request.
+
+        Returns:
+            The new page size of the endpoint.
+        """
+        with self._lock:
+            state = self._state(endpoint)
+            state.throttle_rate += self.smoothing * (1 - state.throttle_rate)
+            state.size = self._clamp(size * self.throttle_factor)
+            return state.size
+
+    def observe_timeout(self, endpoint: str, *, size: int) -> int:
+        """Shrink the page size of an endpoint after a request timed out.
+
+        Args:
+            endpoint: The endpoint path template.
+            size: The page size of the request.
+
+        Returns:
+            The new page size of the endpoint.
+        """
+        with self._lock:
+            state = self._state(endpoint)
+            state.size = self._clamp(size / self.max_factor)
+            return state.size
@@ -0,0 +1,505 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Estimates of the requests, bytes and duration of a sync, before it runs.
+
+Streams are split into partitions like a sync splits them, i.e. one per group,
+organization, bitlink or QR code, and each partition starts from its bookmark in the
+state or ``start_date``. The bitlinks of a group are estimated from the daily
+shorten counts of its organization, spread evenly across the groups of the
+organization, and QR codes from the partitions already in the state.
+
+Estimates are upper bounds: bitlinks filters, inactive bitlinks and cached
+responses are not taken into account. Response sizes and times come from the
+telemetry summary of a previous sync, when ``telemetry_path`` has one, and a stream
+takes at least the time its rate limit allows its requests in.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlencode
+
+from tap_bitly import streams
+from tap_bitly.client import UNIT_REFERENCE_FORMAT, BitlyStream
+from tap_bitly.state import COMPACT_KEY, decode_bookmarks
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
+    from singer_sdk import Stream
+
+    from tap_bitly.sharding import Sharding
+    from tap_bitly.tap import TapBitly
+
+#: Size of a response, for endpoints without telemetry, in bytes.
+DEFAULT_RESPONSE_BYTES = 2048
+
+#: Time to get a response, for endpoints without telemetry, in seconds.
+DEFAULT_RESPONSE_SECONDS = 0.25
+
+# Context key of the partitions of the child streams of each parent stream
+_PARTITION_KEYS: dict[type[Stream], str] = {
+    streams.Groups: "group_guid",
+    streams.Organizations: "organization_guid",
+    streams.Bitlinks: "bitlink",
+    streams.QRCodes: "qrcode_id",
+}
+
+type _Partitions = Counter[tuple[str | None, datetime | None]]
+
+#: Deferrable partitions, by stream name and starting time.
+type PartitionKey = tuple[str, datetime | None]
+
+
+@dataclass
+class StreamPlan:
+    """Estimated cost of syncing a stream."""
+
+    stream: str
+
+    #: Number of partitions, e.g. one per group or bitlink.
+    partitions: int = 0
+
+    #: Number of requests.
+    requests: int = 0
+
+    #: Size of the responses, in bytes.
+    response_bytes: int = 0
+
+    #: Time to send the requests and get the responses, in seconds.
+    seconds: float = 0.0
+
+    #: Number of partitions deferred to a later sync, to stay within the budget.
+    deferred_partitions: int = 0
+
+    #: Number of requests of the deferred partitions.
+    deferred_requests: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the estimate.
+
+        Returns:
+            A JSON-serializable summary.
+        """
+        return {
+            "stream": self.stream,
+            "partitions": self.partitions,
+            "requests": self.requests,
+            "response_bytes": self.response_bytes,
+            "seconds": round(self.seconds, 1),
+            "deferred_partitions": self.deferred_partitions,
+            "deferred_requests": self.deferred_requests,
+        }
+
+
+@dataclass
+class SyncPlan:
+    """Estimated cost of a sync."""
+
+    streams: list[StreamPlan]
+
+    #: Number of partitions of deferrable streams that fit the budget, if any.
+    admitted: Counter[PartitionKey] | None = None
+
+    #: Plan limits of each organization, i.e. monthly quotas and their usage.
+    plan_limits: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the estimate.
+
+        Returns:
+            A JSON-serializable summary, with the totals of every stream.
+        """
+        return {
+            "streams": [plan.to_dict() for plan in self.streams],
+            "total": {
+                "requests": sum(plan.requests for plan in self.streams),
+                "response_bytes": sum(plan.response_bytes for plan in self.streams),
+                "seconds": round(sum(plan.seconds for plan in self.streams), 1),
+                "deferred_partitions": sum(
+                    plan.deferred_partitions for plan in self.streams
+                ),
+                "deferred_requests": sum(
+                    plan.deferred_requests for plan in self.streams
+                ),
+            },
+            "plan_limits": self.plan_limits,
+        }
+
+
+@dataclass
+class AccountCounts:
+    """Counts of the objects a sync walks, read from the API before it runs."""
+
+    #: Organization of each synced group.
+    groups: dict[str, str]
+
+    #: Number of groups of each organization, synced or not.
+    organization_groups: Counter[str]
+
+    #: Number of bitlinks each organization created, by day.
+    shorten_counts: dict[str, Counter[date]] = field(default_factory=dict)
+
+    @classmethod
+    def read(
+        cls,
+        get_json: Callable[[str], dict[str, Any]],
+        sharding: Sharding,
+        now: datetime,
+    ) -> AccountCounts:
+        """Read the counts from the API.
+
+        Args:
+            get_json: Function getting the parsed body of an API path.
+            sharding: The groups this process syncs.
+            now: The unit reference of the shorten counts.
+
+        Returns:
+            The counts.
+        """
+        groups = get_json("/v4/groups").get("groups", [])
+        counts = cls(
+            groups={
+                group["guid"]: group.get("organization_guid") or ""
+                for group in groups
+                if sharding.includes_group(group["guid"])
+            },
+            organization_groups=Counter(
+                group.get("organization_guid") or "" for group in groups
+            ),
+        )
+
+        query = urlencode({
+            "unit": "day",
+            "units": -1,
+            "unit_reference": now.strftime(UNIT_REFERENCE_FORMAT),
+        })
+        for organization in counts.organization_groups:
+            if not organization:
+                continue
+            path = f"/v4/organizations/{organization}"
+            body = get_json(f"{path}/shorten_counts?{query}")
+            created = counts.shorten_counts[organization] = Counter()
+            for metric in body.get("metrics") or []:
+                day = datetime.fromisoformat(metric["key"]).date()
+                created[day] += metric.get("value") or 0
+
+        return counts
+
+    @property
+    def organizations(self) -> list[str]:
+        """GUIDs of the organizations of every group."""
+        return [guid for guid in self.organization_groups if guid]
+
+    def count_bitlinks(self, group_guid: str, since: datetime | None = None) -> float:
+        """Estimate the number of bitlinks of a group.
+
+        Args:
+            group_guid: The group GUID.
+            since: Only count bitlinks created on or after the day of this time.
+
+        Returns:
+            The bitlinks created by the organization of the group, divided by its
+            number of groups.
+        """
+        organization = self.groups[group_guid]
+        created = self.shorten_counts.get(organization, Counter())
+        total = sum(
+            count
+            for day, count in created.items()
+            if since is None or day >= since.date()
+        )
+        return total / max(self.organization_groups[organization], 1)
+
+
+def read_bookmarks(stream_state: Mapping[str, Any], key: str) -> dict[str, Any]:
+    """Read the bookmarks of the partitions of a stream, in either state layout.
+
+    Args:
+        stream_state: The state of the stream.
+        key: The context key of the partitions, e.g. ``bitlink``.
+
+    Returns:
+        Mapping of partition key values to bookmarks.
+    """
+    bookmarks: dict[str, Any] = {}
+    if compact := stream_state.get(COMPACT_KEY):
+        bookmarks.update(decode_bookmarks(compact))
+
+    for partition in stream_state.get("partitions", []):
+        value = partition.get("context", {}).get(key)
+        bookmark = partition.get("replication_key_value")
+        if value is not None and bookmark is not None:
+            bookmarks[str(value)] = bookmark
+    return bookmarks
+
+
+def admit_partitions(
+    costs: Mapping[PartitionKey, tuple[int, int]],
+    available: int,
+) -> Counter[PartitionKey]:
+    """Pick the partitions of deferrable streams that fit a budget.
+
+    Partitions are admitted one at a time with a running count of their requests,
+    those that start first, i.e. that were never synced or synced least recently,
+    first, until one does not fit. At least one partition is admitted, so every
+    sync makes progress.
+
+    Args:
+        costs: Number of partitions and their requests, by stream and starting time.
+        available: Number of requests left for them.
+
+    Returns:
+        Number of partitions admitted, by stream and starting time.
+    """
+    admitted: Counter[PartitionKey] = Counter()
+    for key in sorted(costs, key=_stale_first):
+        partitions, requests = costs[key]
+        each = requests // max(partitions, 1)
+        fit = min(partitions, max(available, 0) // each) if each else partitions
+        available -= fit * each
+        if fit:
+            admitted[key] = fit
+        if fit < partitions:
+            break
+
+    if not admitted and costs:
+        admitted[min(costs, key=_stale_first)] = 1
+    return admitted
+
+
+def _stale_first(key: PartitionKey) -> tuple[bool, datetime]:
+    _, start = key
+    return start is not None, start or datetime.min.replace(tzinfo=UTC)
+
+
+def _parse_datetime(value: Any) -> datetime | None:  # noqa: ANN401
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+class SyncPlanner:
+    """Estimate the requests, bytes and duration of syncing the selected streams."""
+
+    def __init__(
+        self,
+        tap: TapBitly,
+        counts: AccountCounts,
+        telemetry: Mapping[str, Any] | None = None,
+    ) -> None:
+        """Initialize the planner.
+
+        Args:
+            tap: The tap, with its catalog selection and state.
+            counts: The counts of groups and bitlinks.
+            telemetry: The telemetry summary of a previous sync, if any.
+        """
+        self.tap = tap
+        self.counts = counts
+        self.telemetry = telemetry or {}
+        self.start_date = _parse_datetime(tap.config.get("start_date"))
+
+    def plan(self, max_requests: int | None = None) -> SyncPlan:
+        """Estimate every stream a sync runs.
+
+        Args:
+            max_requests: The requests left in the budget of the sync, if any.
+                Partitions of deferrable streams that don't fit are deferred.
+
+        Returns:
+            The estimates.
+        """
+        plans: list[StreamPlan] = []
+        costs: dict[PartitionKey, tuple[int, int]] = {}
+        for stream in self.tap.streams.values():
+            if not isinstance(stream, BitlyStream) or not (
+                stream.selected or stream.has_selected_descendents
+            ):
+                continue
+
+            plan = StreamPlan(stream.name)
+            for (key, start), partitions in self.get_partitions(stream).items():
+                requests = partitions * self.count_requests(stream, key, start)
+                plan.partitions += partitions
+                plan.requests += requests
+                if stream.deferrable:
+                    counted, counted_requests = costs.get((stream.name, start), (0, 0))
+                    costs[stream.name, start] = (
+                        counted + partitions,
+                        counted_requests + requests,
+                    )
+
+            self.estimate_transfer(stream, plan)
+            plans.append(plan)
+
+        sync_plan = SyncPlan(plans)
+        if max_requests is None:
+            return sync_plan
+
+        deferrable = sum(requests for _, requests in costs.values())
+        fixed = sum(plan.requests for plan in plans) - deferrable
+        sync_plan.admitted = admit_partitions(costs, max_requests - fixed)
+        stream_plans = {plan.stream: plan for plan in plans}
+        for (name, start), (partitions, requests) in costs.items():
+            if deferred := partitions - sync_plan.admitted[name, start]:
+                plan = stream_plans[name]
+                plan.deferred_partitions += deferred
+                plan.deferred_requests += requests // partitions * deferred
+        return sync_plan
+
+    def get_start(self, stream: BitlyStream[Any], bookmark: Any) -> datetime | None:  # noqa: ANN401
+        """Get the starting time of a partition, like the SDK does.
+
+        Args:
+            stream: The stream.
+            bookmark: The bookmark of the partition, if any.
+
+        Returns:
+            The later of the bookmark and ``start_date``, or None if the stream is
+            not incremental or there is neither.
+        """
+        if stream.replication_key is None or stream.replication_method != "INCREMENTAL":
+            return None
+
+        values = [_parse_datetime(bookmark), self.start_date]
+        return max((value for value in values if value is not None), default=None)
+
+    def get_partitions(self, stream: BitlyStream[Any]) -> _Partitions:
+        """Count the partitions of a stream, by group and starting time.
+
+        Args:
+            stream: The stream.
+
+        Returns:
+            Number of partitions by group GUID, if they are group partitions, and
+            starting time.
+        """
+        stream_state = self.tap.state.get("bookmarks", {}).get(stream.name, {})
+        if (parent := stream.parent_stream_type) is None:
+            bookmark = stream_state.get("replication_key_value")
+            return Counter({(None, self.get_start(stream, bookmark)): 1})
+
+        bookmarks = read_bookmarks(stream_state, _PARTITION_KEYS[parent])
+        if parent is streams.Groups:
+            return Counter(
+                (group, self.get_start(stream, bookmarks.get(group)))
+                for group in self.counts.groups
+            )
+
+        if parent is streams.Organizations:
+            known = [bookmarks.get(guid) for guid in self.counts.organizations]
+            new = 0
+        else:
+            # Items without bookmarks are new, and start from start_date
+            known = list(bookmarks.values())
+            new = max(round(self.count_items(parent)) - len(known), 0)
+
+        partitions: _Partitions = Counter(
+            (None, self.get_start(stream, value)) for value in known
+        )
+        if new:
+            partitions[None, self.get_start(stream, None)] += new
+        return partitions
+
+    def count_items(self, stream_type: type[Stream]) -> float:
+        """Estimate the bitlinks or QR codes whose metrics are synced.
+
+        Args:
+            stream_type: The stream of the items, i.e. bitlinks or QR codes.
+
+        Returns:
+            The number of items of the synced groups, in this shard.
+        """
+        if stream_type is streams.Bitlinks:
+            bitlinks = sum(map(self.counts.count_bitlinks, self.counts.groups))
+            sharding = self.tap.sharding
+            if sharding.selects_all_bitlinks:
+                return bitlinks
+            return bitlinks / sharding.shard_count
+
+        # QR codes are only known from the partitions of their metrics streams
+        qr_codes: set[str] = set()
+        for stream in self.tap.streams.values():
+            if stream.parent_stream_type is stream_type:
+                stream_state = self.tap.state.get("bookmarks", {}).get(stream.name, {})
+                qr_codes.update(read_bookmarks(stream_state, "qrcode_id"))
+        return len(qr_codes)
+
+    def count_requests(
+        self,
+        stream: BitlyStream[Any],
+        group_guid: str | None,
+        start: datetime | None,
+    ) -> int:
+        """Estimate the requests of a partition.
+
+        Args:
+            stream: The stream.
+            group_guid: The group of the partition, if it is a group partition.
+            start: The starting time of the partition.
+
+        Returns:
+            The number of requests.
+        """
+        if not isinstance(stream, streams.GroupItemsStream) or group_guid is None:
+            return stream.estimate_requests(start)
+
+        if isinstance(stream, streams.Bitlinks):
+            since = None
+            # Every bitlink is listed for the metrics of child streams
+            if start is not None and not stream.has_selected_descendents:
+                lookback = self.tap.config.get(stream.lookback_setting, 0)
+                since = start - timedelta(days=lookback)
+            return stream.estimate_pages(self.counts.count_bitlinks(group_guid, since))
+
+        items = self.count_items(type(stream)) / max(len(self.counts.groups), 1)
+        return stream.estimate_pages(items)
+
+    def estimate_transfer(self, stream: BitlyStream[Any], plan: StreamPlan) -> None:
+        """Estimate the response bytes and time of the requests of a stream.
+
+        Args:
+            stream: The stream.
+            plan: The estimate of the stream, with its number of requests.
+        """
+        endpoints = self.telemetry.get(stream.name, {}).get("endpoints", {})
+        measured = sum(stats["requests"] for stats in endpoints.values())
+        if measured:
+            response_bytes = (
+                sum(stats["response_bytes"] for stats in endpoints.values()) / measured
+            )
+            latency = (
+                sum(
+                    stats["latency_seconds"]["p50"] * stats["requests"]
+                    for stats in endpoints.values()
+                )
+                / measured
+            )
+        else:
+            response_bytes = DEFAULT_RESPONSE_BYTES
+            latency = DEFAULT_RESPONSE_SECONDS
+
+        workers = self.tap.config.get("max_workers", 1)
+        concurrency = workers if stream.concurrent_partitions else 1
+        rate = self.tap.rate_limiter.bucket(stream.path).max_rate
+        plan.response_bytes = round(plan.requests * response_bytes)
+        plan.seconds = max(plan.requests * latency / concurrency, plan.requests / rate)
@@ -0,0 +1,444 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Adaptive rate limiting shared by all streams and worker threads."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping, Sequence
+    from datetime import datetime
+
+    import requests
+
+logger = logging.getLogger(__name__)
+
+#: Length of the window Bitly platform limits apply to, in seconds.
+PLATFORM_LIMIT_WINDOW = 3600
+
+#: Lowest rate a bucket slows down to, in requests per second.
+MIN_RATE = 0.1
+
+#: Share of the maximum rate recovered after each successful request.
+RECOVERY_STEP = 0.02
+
+#: Share of a plan limit that can be used before warning about it.
+PLAN_LIMIT_WARNING_RATIO = 0.9
+
+# Reset headers larger than this are epoch timestamps, not seconds.
+_EPOCH_THRESHOLD = 1_000_000_000
+
+
+class TokenBucket:
+    """Thread-safe token bucket with multiplicative slow-down.
+
+    Each request takes a token. Tokens are refilled at ``rate`` per second up to
+    ``capacity``. The rate is halved when the API throttles a request and slowly
+    recovers towards ``max_rate`` after successful requests.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        capacity: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the bucket.
+
+        Args:
+            max_rate: Maximum number of requests per second.
+            capacity: Maximum burst size. Defaults to one second worth of requests.
+            clock: Monotonic clock function.
+            sleep: Sleep function.
+        """
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.capacity = capacity or max(max_rate, 1.0)
+        self._tokens = self.capacity
+        self._paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._updated_at, 0.0)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def acquire(self) -> float:
+        """Take a token, waiting for one to become available.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(
+                    self._paused_until - now,
+                    (1 - self._tokens) / self.rate,
+                )
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for a while.
+
+        Args:
+            seconds: Number of seconds to pause for.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self._tokens = 0
+
+    def set_rate(self, rate: float, *, capacity: float | None = None) -> None:
+        """Change the maximum rate, e.g. after reading the account limits.
+
+        Args:
+            rate: Maximum number of requests per second.
+            capacity: Maximum burst size.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self.max_rate = max(rate, MIN_RATE)
+            self.rate = min(self.rate, self.max_rate)
+            if capacity is not None:
+                self.capacity = max(capacity, 1.0)
+                self._tokens = min(self._tokens, self.capacity)
+
+    def limit_rate(self, rate: float) -> None:
+        """Lower the current rate without changing the maximum rate.
+
+        Args:
+            rate: Number of requests per second to slow down to, at most.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self.rate = min(self.rate, max(rate, MIN_RATE))
+
+    def throttle(self) -> None:
+        """Halve the current rate after the API throttled a request."""
+        with self._lock:
+            self._refill(self._clock())
+            self.rate = max(self.rate / 2, MIN_RATE)
+
+    def recover(self) -> None:
+        """Increase the current rate after a successful request."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(self._clock())
+                self.rate = min(
+                    self.rate + self.max_rate * RECOVERY_STEP, self.max_rate
+                )
+
+
+class RateLimiter:
+    """Per-endpoint token buckets, throttled by Bitly limits and responses.
+
+    Limits of the account are only requested before the first request is made,
+    so runs that make no requests, e.g. discovery, don't spend any on them.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        *,
+        seed: Callable[[RateLimiter], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the rate limiter.
+
+        Args:
+            max_rate: Default maximum number of requests per second per endpoint.
+            seed: Function seeding the limiter from the account limits, called once
+                before the first request.
+            clock: Monotonic clock function.
+            sleep: Sleep function.
+        """
+        self.max_rate = max_rate
+        self._seed = seed
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._seed_lock = threading.Lock()
+
+    def seed(self) -> None:
+        """Seed the limiter from the account limits, if not done yet.
+
+        Other threads wait until the limiter is seeded.
+        """
+        if self._seed is None:
+            return
+
+        with self._seed_lock:
+            seed, self._seed = self._seed, None
+            if seed is not None:
+                seed(self)
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        """Get the token bucket for an endpoint.
+
+        Args:
+            endpoint: The endpoint path template, e.g. ``/v4/groups``.
+
+        Returns:
+            The token bucket of the endpoint.
+        """
+        with self._lock:
+            if endpoint not in self._buckets:
+                self._buckets[endpoint] = TokenBucket(
+                    self.max_rate,
+                    clock=self._clock,
+                    sleep=self._sleep,
+                )
+            return self._buckets[endpoint]
+
+    def acquire(self, endpoint: str) -> float:
+        """Wait until a request can be made to an endpoint.
+
+        Args:
+            endpoint: The endpoint path template.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        self.seed()
+        return self.bucket(endpoint).acquire()
+
+    def seed_platform_limits(self, payload: Mapping[str, Any]) -> None:
+        """Seed endpoint rates from ``/v4/user/platform_limits``.
+
+        Each limit is spread evenly over its hourly window, with at most a minute
+        worth of requests sent in a burst.
+
+        Args:
+            payload: The parsed response body.
+        """
+        for platform_limit in payload.get("platform_limits", []):
+            for method in platform_limit.get("methods", []):
+                if method.get("name") != "GET" or not method.get("limit"):
+                    continue
+
+                limit = method["limit"]
+                bucket = self.bucket(platform_limit["endpoint"])
+                rate = min(limit / PLATFORM_LIMIT_WINDOW, self.max_rate)
+                bucket.set_rate(rate, capacity=limit / 60)
+                if method.get("count", 0) >= limit:
+                    bucket.limit_rate(MIN_RATE)
+
+    def update(self, endpoint: str, response: requests.Response) -> None:
+        """Adjust the rate of an endpoint from a response.
+
+        Throttled responses halve the rate and honour ``Retry-After``. Rate limit
+        headers spread the remaining requests until the limit resets, so the tap
+        slows down gradually instead of running into the limit.
+
+        Args:
+            endpoint: The endpoint path template.
+            response: The response to the last request.
+        """
+        bucket = self.bucket(endpoint)
+        headers = response.headers
+
+        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            bucket.throttle()
+            bucket.pause(
+                parse_retry_after(headers.get("Retry-After")) or 1 / bucket.rate
+            )
+            return
+
+        remaining = _parse_number(headers.get("X-RateLimit-Remaining"))
+        reset = _parse_number(headers.get("X-RateLimit-Reset"))
+        if remaining is not None and reset is not None:
+            if reset > _EPOCH_THRESHOLD:
+                reset -= time.time()
+            if remaining <= 0:
+                bucket.pause(reset)
+                return
+            bucket.limit_rate(remaining / max(reset, 1))
+
+        bucket.recover()
+
+
+class RequestBudget:
+    """Thread-safe count of the requests of a sync, against a maximum.
+
+    Partitions of low-priority streams, e.g. bitlink metrics, are deferred to a
+    later sync unless the sync planner admitted them, and every one of them is
+    deferred once the budget is spent. The planner admits at least one partition,
+    and the first partition synced is never deferred, so every sync makes
+    progress. Deferred partitions keep their bookmarks, so the next sync starts
+    from them.
+    """
+
+    def __init__(self, max_requests: int) -> None:
+        """Initialize the budget.
+
+        Args:
+            max_requests: Maximum number of requests of the sync.
+        """
+        self.max_requests = max_requests
+        #: Number of requests sent so far.
+        self.spent = 0
+        #: Number of partitions synced so far.
+        self.synced = 0
+        #: Number of deferred partitions, by stream.
+        self.deferred: Counter[str] = Counter()
+        self._admitted: Counter[tuple[str, datetime | None]] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether every request of the budget was sent."""
+        return self.spent >= self.max_requests
+
+    def spend(self) -> None:
+        """Count a request."""
+        with self._lock:
+            self.spent += 1
+
+    def admit(self, admitted: Mapping[tuple[str, datetime | None], int]) -> None:
+        """Only sync the partitions the sync planner admitted.
+
+        Args:
+            admitted: Number of partitions admitted, by stream and starting time.
+        """
+        with self._lock:
+            self._admitted = Counter(admitted)
+
+    def defers(self, stream: str, start: datetime | None) -> bool:
+        """Check whether a partition should be deferred to a later sync.
+
+        Partitions that are not deferred use up the admission of their stream and
+        starting time.
+
+        Args:
+            stream: The stream name.
+            start: The starting time of the partition, if any.
+
+        Returns:
+            Whether the partition was not admitted, or the budget is spent and
+            another partition was synced already.
+        """
+        key = (stream, start)
+        with self._lock:
+            if self._admitted is not None and self._admitted[key] <= 0:
+                return True
+            if self.exhausted and self.synced:
+                return True
+
+            if self._admitted is not None:
+                self._admitted[key] -= 1
+            self.synced += 1
+            return False
+
+    def defer(self, stream: str) -> None:
+        """Count a deferred partition.
+
+        Args:
+            stream: The stream name.
+        """
+        with self._lock:
+            self.deferred[stream] += 1
+
+    def log_deferred(
+        self,
+        stream_logger: logging.Logger | logging.LoggerAdapter[Any],
+        stream: str,
+    ) -> None:
+        """Warn about the partitions of a stream deferred to a later sync, if any.
+
+        Args:
+            stream_logger: The logger of the stream.
+            stream: The stream name.
+        """
+        if deferred := self.deferred[stream]:
+            stream_logger.warning(
+                "Deferred %d partitions of '%s' to a later sync, to stay within "
+                "max_requests",
+                deferred,
+                stream,
+            )
+
+
+def check_plan_limits(
+    organization: str,
+    plan_limits: Sequence[Mapping[str, Any]],
+) -> None:
+    """Warn about organization quotas from ``.../plan_limits`` that are almost used.
+
+    Plan limits are monthly quotas rather than rates, so they are only logged.
+
+    Args:
+        organization: The organization GUID.
+        plan_limits: The plan limits of the organization.
+    """
+    for plan_limit in plan_limits:
+        limit, count = plan_limit.get("limit"), plan_limit.get("count", 0)
+        if limit and count >= limit * PLAN_LIMIT_WARNING_RATIO:
+            logger.warning(
+                "Organization %s has used %d of %d '%s'",
+                organization,
+                count,
+                limit,
+                plan_limit.get("name"),
+            )
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a ``Retry-After`` header.
+
+    Args:
+        value: The header value, either a number of seconds or an HTTP date.
+
+    Returns:
+        The number of seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+
+    if (seconds := _parse_number(value)) is not None:
+        return max(seconds, 0.0)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def _parse_number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
@@ -0,0 +1,284 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Split a sync of groups and bitlinks across tap processes.
+
+The state of every shard can be merged into one with::
+
+    python -m tap_bitly.sharding shard-0.json shard-1.json > state.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import enum
+import json
+import sys
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from singer_sdk.exceptions import ConfigValidationError
+
+from tap_bitly.state import COMPACT_KEY, decode_bookmarks, encode_bookmarks
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+
+
+class ShardKey(enum.StrEnum):
+    """What to hash-partition a sync by."""
+
+    BITLINK = "bitlink"
+    GROUP = "group"
+
+
+def get_shard(key: str, shard_count: int) -> int:
+    """Get the shard a key belongs to.
+
+    The hash is stable across processes, unlike :func:`hash`.
+
+    Args:
+        key: A group GUID or bitlink ID.
+        shard_count: The number of shards.
+
+    Returns:
+        The shard index.
+    """
+    return zlib.crc32(key.encode()) % shard_count
+
+
+@dataclass(frozen=True)
+class Sharding:
+    """The groups and bitlinks a tap process syncs."""
+
+    #: Groups to sync. All groups if None.
+    group_guids: frozenset[str] | None = None
+
+    #: Groups to never sync.
+    excluded_group_guids: frozenset[str] = frozenset()
+
+    #: Shard of this process, between 0 and ``shard_count - 1``.
+    shard_index: int = 0
+
+    #: Number of processes the sync is split across.
+    shard_count: int = 1
+
+    #: Whether bitlinks or whole groups are split across shards.
+    shard_by: ShardKey = ShardKey.BITLINK
+
+    def __post_init__(self) -> None:
+        """Validate the shard index.
+
+        Raises:
+            ConfigValidationError: If the shard index is out of range.
+        """
+        if not 0 <= self.shard_index < self.shard_count:
+            msg = "Invalid sharding config"
+            error = (
+                f"shard_index must be between 0 and {self.shard_count - 1}, "
+                f"got {self.shard_index}"
+            )
+            raise ConfigValidationError(msg, errors=[error])
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> Sharding:
+        """Read the sharding settings from the tap config.
+
+        Args:
+            config: The tap config.
+
+        Returns:
+            The sharding settings.
+        """
+        group_guids = config.get("group_guids")
+        return cls(
+            group_guids=frozenset(group_guids) if group_guids is not None else None,
+            excluded_group_guids=frozenset(config.get("excluded_group_guids", [])),
+            shard_index=config.get("shard_index", 0),
+            shard_count=config.get("shard_count", 1),
+            shard_by=ShardKey(config.get("shard_by", ShardKey.BITLINK)),
+        )
+
+    @property
+    def selects_all_groups(self) -> bool:
+        """Whether every group is synced by this process."""
+        return (
+            self.group_guids is None
+            and not self.excluded_group_guids
+            and (self.shard_by != ShardKey.GROUP or self.shard_count == 1)
+        )
+
+    @property
+    def selects_all_bitlinks(self) -> bool:
+        """Whether every bitlink of the synced groups is synced by this process."""
+        return self.shard_by != ShardKey.BITLINK or self.shard_count == 1
+
+    @property
+    def includes_group_metrics(self) -> bool:
+        """Whether the metrics of whole groups are synced by this process.
+
+        When sharding by bitlink, every shard syncs every group, so only the first
+        shard syncs their metrics.
+        """
+        return self.shard_by != ShardKey.BITLINK or self.shard_index == 0
+
+    def _in_shard(self, key: str) -> bool:
+        return get_shard(key, self.shard_count) == self.shard_index
+
+    def includes_group(self, group_guid: str) -> bool:
+        """Check whether a group is synced by this process.
+
+        Args:
+            group_guid: The group GUID.
+
+        Returns:
+            Whether the group is allowed and, when sharding by group, in this shard.
+        """
+        if self.group_guids is not None and group_guid not in self.group_guids:
+            return False
+        if group_guid in self.excluded_group_guids:
+            return False
+        return self.shard_by != ShardKey.GROUP or self._in_shard(group_guid)
+
+    def includes_bitlink(self, bitlink: str) -> bool:
+        """Check whether a bitlink is synced by this process.
+
+        Args:
+            bitlink: The bitlink ID.
+
+        Returns:
+            Whether the bitlink is in this shard, when sharding by bitlink.
+        """
+        return self.shard_by != ShardKey.BITLINK or self._in_shard(bitlink)
+
+    def includes_qr_code(self, qrcode_id: str) -> bool:
+        """Check whether a QR code is synced by this process.
+
+        QR codes are split across shards like bitlinks.
+
+        Args:
+            qrcode_id: The QR code ID.
+
+        Returns:
+            Whether the QR code is in this shard, when sharding by bitlink.
+        """
+        return self.includes_bitlink(qrcode_id)
+
+
+def merge_states(states: Iterable[Mapping[str, Any]]) -> dict[str, Any]:
+    """Merge the states of every shard of a sync.
+
+    Partitions only found in one state, like those of bitlinks, are kept as-is.
+    Compact bookmarks of bitlinks are merged the same way.
+    Partitions and stream bookmarks found in several states, like the group
+    partitions of bitlinks when sharding by bitlink, keep the earliest bookmark so
+    nothing is skipped when the merged state is used.
+
+    Args:
+        states: The state of each shard.
+
+    Returns:
+        The merged state.
+    """
+    bookmarks: dict[str, dict[str, Any]] = {}
+    for state in states:
+        for stream_name, bookmark in state.get("bookmarks", {}).items():
+            _merge_bookmark(bookmarks.setdefault(stream_name, {}), bookmark)
+    return {"bookmarks": bookmarks}
+
+
+def _merge_bookmark(target: dict[str, Any], source: Mapping[str, Any]) -> None:
+    partitions: list[dict[str, Any]] = target.setdefault("partitions", [])
+    indexed = {_partition_key(partition): partition for partition in partitions}
+    for partition in source.get("partitions", []):
+        key = _partition_key(partition)
+        if key not in indexed:
+            indexed[key] = copy.deepcopy(dict(partition))
+            partitions.append(indexed[key])
+        elif _is_earlier(partition, indexed[key]):
+            indexed[key].clear()
+            indexed[key].update(copy.deepcopy(dict(partition)))
+
+    if (compact := source.get(COMPACT_KEY)) is not None:
+        _merge_compact(target, source, compact)
+
+    if "replication_key_value" in source and (
+        "replication_key_value" not in target or _is_earlier(source, target)
+    ):
+        for key, value in source.items():
+            if key not in {"partitions", "progress_markers", COMPACT_KEY}:
+                target[key] = copy.deepcopy(value)
+
+
+def _merge_compact(
+    target: dict[str, Any],
+    source: Mapping[str, Any],
+    compact: Mapping[str, Any],
+) -> None:
+    bookmarks = decode_bookmarks(target[COMPACT_KEY]) if COMPACT_KEY in target else {}
+    for partition, value in decode_bookmarks(compact).items():
+        if partition not in bookmarks or _is_earlier_value(value, bookmarks[partition]):
+            bookmarks[partition] = value
+
+    target.setdefault("replication_key", source.get("replication_key"))
+    target[COMPACT_KEY] = encode_bookmarks(
+        bookmarks,
+        key=compact["key"],
+        compress="encoding" in compact,
+    )
+
+
+def _partition_key(partition: Mapping[str, Any]) -> str:
+    return json.dumps(partition.get("context", {}), sort_keys=True)
+
+
+def _is_earlier(bookmark: Mapping[str, Any], other: Mapping[str, Any]) -> bool:
+    return _is_earlier_value(
+        bookmark.get("replication_key_value"),
+        other.get("replication_key_value"),
+    )
+
+
+def _is_earlier_value(value: Any, other_value: Any) -> bool:  # noqa: ANN401
+    if value is None or other_value is None:
+        # A missing bookmark means a full sync, which is the earliest one
+        return value is None and other_value is not None
+
+    if isinstance(value, str) and isinstance(other_value, str):
+        try:
+            return datetime.fromisoformat(value) < datetime.fromisoformat(other_value)
+        except ValueError:
+            pass
+    return bool(value < other_value)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Merge the state files of every shard of a sync and print the result.
+
+    Args:
+        argv: The command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Merge tap-bitly shard states.")
+    parser.add_argument("states", nargs="+", type=Path, help="State files")
+    args = parser.parse_args(argv)
+
+    states = [json.loads(path.read_text(encoding="utf-8")) for path in args.states]
+    sys.stdout.write(json.dumps(merge_states(states), indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
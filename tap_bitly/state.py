@@ -0,0 +1,269 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compact state of streams with one partition per bitlink.
+
+The SDK keeps a ``{"context": ..., "replication_key_value": ...}`` entry per
+partition, and looks partitions up by scanning that list. With hundreds of
+thousands of bitlinks the state grows to tens of megabytes, and every STATE message
+copies and compares all of it.
+
+Bitlinks synced together share their bookmark, so the compact layout groups the
+partition keys by bookmark value::
+
+    {
+        "replication_key": "date",
+        "compact_partitions": {
+            "key": "bitlink",
+            "bookmarks": [["2024-03-05T00:00:00+0000", ["bit.ly/a", "bit.ly/b"]]]
+        }
+    }
+
+The bookmarks can also be stored compressed, as ``{"key": ..., "encoding": "zlib",
+"data": ...}`` with the base64-encoded, zlib-compressed JSON of the bookmarks.
+"""
+
+from __future__ import annotations
+
+import base64
+import enum
+import json
+import zlib
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, override
+
+# Custom state managers subclass the SDK's, which it does not export publicly
+from singer_sdk.streams._state import StreamStateManager  # noqa: PLC2701
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from singer_sdk.helpers.types import Context
+
+#: Key of the compact partitions in the state of a stream.
+COMPACT_KEY = "compact_partitions"
+
+#: Encoding of compressed bookmarks.
+ZLIB_ENCODING = "zlib"
+
+
+class StateFormat(enum.StrEnum):
+    """Layout of the state of streams with one partition per bitlink."""
+
+    PARTITIONS = "partitions"
+    COMPACT = "compact"
+    COMPRESSED = "compressed"
+
+
+def encode_bookmarks(
+    bookmarks: Mapping[str, Any],
+    *,
+    key: str,
+    compress: bool,
+) -> dict[str, Any]:
+    """Encode partition bookmarks in the compact layout.
+
+    Args:
+        bookmarks: Mapping of partition key values to bookmarks.
+        key: The name of the partition key.
+        compress: Whether to compress the bookmarks.
+
+    Returns:
+        The compact partitions.
+    """
+    groups: defaultdict[Any, list[str]] = defaultdict(list)
+    for partition, value in bookmarks.items():
+        groups[value].append(partition)
+    grouped = [[value, partitions] for value, partitions in groups.items()]
+
+    if not compress:
+        return {"key": key, "bookmarks": grouped}
+
+    data = zlib.compress(json.dumps(grouped, separators=(",", ":")).encode())
+    return {
+        "key": key,
+        "encoding": ZLIB_ENCODING,
+        "data": base64.b64encode(data).decode(),
+    }
+
+
+def decode_bookmarks(compact: Mapping[str, Any]) -> dict[str, Any]:
+    """Decode partition bookmarks from the compact layout.
+
+    Args:
+        compact: The compact partitions.
+
+    Returns:
+        Mapping of partition key values to bookmarks. Equal bookmarks are shared.
+
+    Raises:
+        ValueError: If the encoding is not supported.
+    """
+    encoding = compact.get("encoding")
+    if encoding is None:
+        grouped = compact.get("bookmarks", [])
+    elif encoding == ZLIB_ENCODING:
+        grouped = json.loads(zlib.decompress(base64.b64decode(compact["data"])))
+    else:
+        msg = f"Unsupported compact state encoding: {encoding}"
+        raise ValueError(msg)
+
+    return {
+        partition: value for value, partitions in grouped for partition in partitions
+    }
+
+
+def expand_compact_state(stream_state: dict[str, Any]) -> None:
+    """Convert the compact partitions of a stream state to the SDK layout, in place.
+
+    Args:
+        stream_state: The state of a stream.
+    """
+    compact = stream_state.pop(COMPACT_KEY, None)
+    if compact is None:
+        return
+
+    replication_key = stream_state.get("replication_key")
+    partitions: list[dict[str, Any]] = stream_state.setdefault("partitions", [])
+    known = {json.dumps(partition["context"]) for partition in partitions}
+    for partition, value in decode_bookmarks(compact).items():
+        context = {compact["key"]: partition}
+        if json.dumps(context) not in known:
+            partitions.append({
+                "context": context,
+                "replication_key": replication_key,
+                "replication_key_value": value,
+            })
+
+
+class CompactStateManager(StreamStateManager):
+    """State manager of a stream with one partition per value of a single key.
+
+    Bookmarks are kept in a dictionary, and partition states are only materialized
+    while their partition is synced. Bookmarks in the SDK layout are migrated when
+    the manager is created. :meth:`pack` writes the bookmarks to the tap state in
+    the compact layout, and must be called before the state is written.
+    """
+
+    def __init__(
+        self,
+        *,
+        partition_key: str,
+        replication_key: str,
+        compress: bool = False,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Initialize the manager.
+
+        Args:
+            partition_key: The context key of the partitions, e.g. ``bitlink``.
+            replication_key: The replication key of the stream.
+            compress: Whether to compress the packed bookmarks.
+            kwargs: Arguments of the SDK's state manager.
+        """
+        super().__init__(**kwargs)
+        self.partition_key = partition_key
+        self.replication_key = replication_key
+        self.compress = compress
+        self._partitions: dict[str, dict[str, Any]] = {}
+        self._values: dict[Any, Any] = {}
+        self._bookmarks: dict[str, Any] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        stream_state = self.stream_state
+        if compact := stream_state.get(COMPACT_KEY):
+            for partition, value in decode_bookmarks(compact).items():
+                self._set_bookmark(partition, value)
+
+        # Migrate partitions in the SDK layout
+        if legacy := stream_state.pop("partitions", None):
+            for partition_state in legacy:
+                partition = partition_state["context"].get(self.partition_key)
+                value = partition_state.get("replication_key_value")
+                if partition is not None and value is not None:
+                    self._set_bookmark(partition, value)
+            self._dirty = True
+
+    def _set_bookmark(self, partition: str, value: Any) -> None:  # noqa: ANN401
+        # Most partitions share a handful of bookmarks, so keep one copy of each
+        self._bookmarks[partition] = self._values.setdefault(value, value)
+
+    @property
+    def bookmarks(self) -> dict[str, Any]:
+        """Bookmarks of the finalized partitions, by partition key value."""
+        return self._bookmarks
+
+    @override
+    def get_context_state(self, context: Context | None) -> dict[str, Any]:
+        partition_context = self.get_state_partition_context(context)
+        if not partition_context or self.partition_key not in partition_context:
+            return self.stream_state
+
+        partition = partition_context[self.partition_key]
+        state = self._partitions.get(partition)
+        if state is None:
+            state = {"context": partition_context}
+            if (value := self._bookmarks.get(partition)) is not None:
+                state["replication_key"] = self.replication_key
+                state["replication_key_value"] = value
+            self._partitions[partition] = state
+        return state
+
+    @override
+    def get_state_partitions(self) -> list[dict[str, Any]] | None:
+        # Partitions are finalized as they are synced, see finalize_partition
+        return None
+
+    def finalize_partition(self, context: Context) -> None:
+        """Promote the progress of a synced partition to its bookmark.
+
+        Args:
+            context: The stream partition context.
+        """
+        partition = self.get_state_partition_context(context).get(self.partition_key)
+        if (
+            partition is None
+            or (state := self._partitions.pop(partition, None)) is None
+        ):
+            return
+
+        self.finalize_state(state)
+        if (value := state.get("replication_key_value")) is not None:
+            self._set_bookmark(partition, value)
+        self._dirty = True
+
+    @override
+    def finalize_progress_markers(
+        self,
+        state: dict[str, Any] | None = None,
+        partitions: list[dict[str, Any]] | None = None,
+    ) -> None:
+        for partition_state in list(self._partitions.values()):
+            self.finalize_partition(partition_state["context"])
+        super().finalize_progress_markers(state, partitions)
+
+    def pack(self) -> None:
+        """Write the bookmarks to the tap state in the compact layout."""
+        stream_state = self.stream_state
+        if not self._dirty and COMPACT_KEY in stream_state:
+            return
+
+        stream_state["replication_key"] = self.replication_key
+        stream_state[COMPACT_KEY] = encode_bookmarks(
+            self._bookmarks,
+            key=self.partition_key,
+            compress=self.compress,
+        )
+        self._dirty = False
@@ -15,28 +15,63 @@
 
 from __future__ import annotations
 
+import enum
+import math
+from collections import defaultdict
+from datetime import UTC, datetime, time, timedelta
+from time import monotonic
 from typing import TYPE_CHECKING, Any, override
 from urllib.parse import ParseResult
 
 from singer_sdk import typing as th
+from singer_sdk.exceptions import FatalAPIError
 from singer_sdk.pagination import BaseHATEOASPaginator
 
-from tap_bitly.client import BitlyStream
+from tap_bitly.client import (
+    UNIT_REFERENCE_FORMAT,
+    BitlyFacetStream,
+    BitlyMetricsStream,
+    BitlyStream,
+    ChangeCaptureSchema,
+    parse_json,
+)
+from tap_bitly.digests import ClickChangeTracker
+from tap_bitly.pagination import set_page_size
+from tap_bitly.state import CompactStateManager, StateFormat
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Generator, Iterable
+    from concurrent.futures import Executor
 
     import requests
     from singer_sdk.helpers.types import Context, Record
+
+    # The type of the SDK state managers, which compact state managers subclass
+    from singer_sdk.streams._state import StreamStateManager
     from singer_sdk.streams.rest import HTTPRequest, PageContext
 
+    from tap_bitly.digests import DigestStore
+    from tap_bitly.tap import TapBitly
+
+
+class Toggle(enum.StrEnum):
+    """Values of the API's on/off filters."""
+
+    ON = "on"
+    OFF = "off"
+    BOTH = "both"
+
+
+#: Key of the saved pagination cursor in the state of a partition.
+CHECKPOINT_KEY = "pagination_checkpoint"
+
 
 class BitlinksPaginator(BaseHATEOASPaginator):
     """Bitlinks paginator."""
 
     @override
     def get_next_url(self, response: requests.Response) -> str | None:
-        return response.json().get("pagination", {}).get("next") or None
+        return parse_json(response).get("pagination", {}).get("next") or None
 
 
 class Groups(BitlyStream[Any]):
@@ -44,59 +79,63 @@ class Groups(BitlyStream[Any]):
 
     name = "groups"
     path = "/v4/groups"
+    cache_responses = True
+    change_capture = True
     primary_keys = ("guid",)
-    records_jsonpath = "$.groups[*]"
+    records_key = "groups"
     replication_key = None
 
-    schema = th.PropertiesList(
-        th.Property(
-            "guid",
-            th.StringType,
-            description="The group's unique identifier.",
-        ),
-        th.Property(
-            "name",
-            th.StringType,
-            description="The group's name.",
-        ),
-        th.Property(
-            "references",
-            th.ObjectType(
-                th.Property("organization", th.StringType),
+    schema = ChangeCaptureSchema(
+        th.PropertiesList(
+            th.Property(
+                "guid",
+                th.StringType,
+                description="The group's unique identifier.",
             ),
-            description="Mapping of group references.",
-        ),
-        th.Property(
-            "created",
-            th.DateTimeType,
-            description="The date and time the group was created.",
-        ),
-        th.Property(
-            "modified",
-            th.DateTimeType,
-            description="The date and time the group was last modified.",
-        ),
-        th.Property(
-            "bsds",
-            th.ArrayType(th.StringType()),
-            description="The group's branded short domains.",
-        ),
-        th.Property(
-            "organization_guid",
-            th.StringType,
-            description="The group's organization's unique identifier.",
-        ),
-        th.Property(
-            "is_active",
-            th.BooleanType,
-            description="Whether the group is active.",
-        ),
-        th.Property(
-            "role",
-            th.StringType,
-            description="The group's role.",
-        ),
-    ).to_dict()
+            th.Property(
+                "name",
+                th.StringType,
+                description="The group's name.",
+            ),
+            th.Property(
+                "references",
+                th.ObjectType(
+                    th.Property("organization", th.StringType),
+                ),
+                description="Mapping of group references.",
+            ),
+            th.Property(
+                "created",
+                th.DateTimeType,
+                description="The date and time the group was created.",
+            ),
+            th.Property(
+                "modified",
+                th.DateTimeType,
+                description="The date and time the group was last modified.",
+            ),
+            th.Property(
+                "bsds",
+                th.ArrayType(th.StringType()),
+                description="The group's branded short domains.",
+            ),
+            th.Property(
+                "organization_guid",
+                th.StringType,
+                description="The group's organization's unique identifier.",
+            ),
+            th.Property(
+                "is_active",
+                th.BooleanType,
+                description="Whether the group is active.",
+            ),
+            th.Property(
+                "role",
+                th.StringType,
+                description="The group's role.",
+            ),
+        ).to_dict()
+    )
 
     @override
     def get_child_context(
@@ -115,60 +154,77 @@ class Groups(BitlyStream[Any]):
         """
         return {"group_guid": record["guid"]}
 
+    @override
+    def post_process(
+        self,
+        row: dict[str, Any],
+        context: Context | None = None,
+    ) -> dict[str, Any] | None:
+        if not self.tap.sharding.includes_group(row["guid"]):
+            return None
+        return row
 
-class Bitlinks(BitlyStream[ParseResult | None]):
-    """Bitlinks stream."""
+    @override
+    def is_full_scan(self, context: Context | None) -> bool:
+        return self.tap.sharding.selects_all_groups
+
+
+class GroupItemsStream(BitlyStream[ParseResult | None]):
+    """Base class for the paginated items of a group, like bitlinks.
+
+    Each group is a partition, incremental on the creation time of its items.
+    While a child stream is selected, e.g. clicks of bitlinks, every item is listed
+    so the metrics of old items keep being synced, but only items created since the
+    bookmark are emitted.
+
+    Walks of big groups can take hours, so every few pages the cursor of the next
+    page is saved in the partition state, and an interrupted walk resumes from it.
+    The size of each page is picked by the tap's page size controller, from the
+    responses to previous pages.
+    """
 
-    name = "bitlinks"
-    path = "/v4/groups/{group_guid}/bitlinks"
-    primary_keys = ("id",)
-    records_jsonpath = "$.links[*]"
-    replication_key = None
     parent_stream_type = Groups
+    adaptive_page_size = True
 
-    schema = th.PropertiesList(
-        th.Property(
-            "id",
-            th.StringType,
-            description="The bitlink's unique identifier.",
-        ),
-        th.Property(
-            "created_at",
-            th.DateTimeType,
-            description="The date and time the bitlink was created.",
-        ),
-        th.Property("link", th.StringType, description="The bitlink's URL."),
-        th.Property(
-            "custom_bitlinks",
-            th.ArrayType(th.StringType()),
-            description="The bitlink's custom bitlinks.",
-        ),
-        th.Property("long_url", th.StringType, description="The bitlink's URL."),
-        th.Property("title", th.StringType, description="The bitlink's title."),
-        th.Property(
-            "archived",
-            th.BooleanType,
-            description="Whether the bitlink is archived.",
-        ),
-        th.Property("created_by", th.StringType, description="The bitlink's creator."),
-        th.Property("client_id", th.StringType, description="The bitlink's client ID."),
-        th.Property(
-            "tags",
-            th.ArrayType(th.StringType()),
-            description="The bitlink's tags.",
-        ),
-        th.Property(
-            "deeplinks",
-            th.ArrayType(th.StringType()),
-            description="The bitlink's deeplinks.",
-        ),
-        th.Property(
-            "references",
-            th.ObjectType(th.Property("group", th.StringType)),
-            description="Mapping of bitlink references.",
-        ),
-        th.Property("group_guid", th.StringType, description="The bitlink's group."),
-    ).to_dict()
+    #: Config setting with the number of days to re-sync before the bookmark.
+    lookback_setting = "bitlinks_lookback_days"
+
+    #: Config setting with the filters to pass to the API. No filters if None.
+    filters_setting: str | None = None
+
+    #: Number of pages between saves of the pagination cursor.
+    checkpoint_pages = 10
+
+    #: Age after which a saved pagination cursor is assumed to have expired.
+    cursor_max_age = timedelta(hours=12)
+
+    def __init__(self, tap: TapBitly) -> None:
+        """Initialize the stream.
+
+        Args:
+            tap: The tap instance.
+        """
+        super().__init__(tap)
+        self._created_after: int | None = None
+        self._pages = 0
+        self._resuming = False
+        self._resumed = False
+
+    @property
+    def page_size(self) -> int:
+        """Number of items to request in the next page."""
+        return self.tap.page_sizes.size(self.path)
+
+    def estimate_pages(self, items: float) -> int:
+        """Estimate the number of pages of a group's items, to plan a sync.
+
+        Args:
+            items: The number of items the walk lists.
+
+        Returns:
+            The number of pages, at the current page size.
+        """
+        return max(math.ceil(items / self.page_size), 1)
 
     @override
     def get_new_paginator(self) -> BitlinksPaginator:
@@ -177,18 +233,266 @@ class Bitlinks(BitlyStream[ParseResult | None]):
     @override
     def get_http_request(self, *, page: PageContext[ParseResult]) -> HTTPRequest:
         request = super().get_http_request(page=page)
+        context = page.stream_context
         if page.next_page_token:
-            request.url = page.next_page_token.geturl()
+            self._pages += 1
+            self._resuming = False
+            if self._pages % self.checkpoint_pages == 0:
+                self.save_checkpoint(context, page.next_page_token.geturl())
+            request.url = set_page_size(page.next_page_token.geturl(), self.page_size)
+        elif checkpoint := self.get_checkpoint(context):
+            self.logger.info("Resuming the walk of %s from a saved cursor", context)
+            self._resuming = True
+            self._resumed = True
+            value = checkpoint.get("replication_key_value")
+            if self.selected and self.replication_key and value:
+                # Items synced before the interruption count towards the bookmark
+                record = {self.replication_key: value}
+                self._increment_stream_state(record, context=context)
+            request.url = set_page_size(checkpoint["next"], self.page_size)
         else:
             request.params.update({
-                "archived": "both",
-                "size": self._page_size,
+                "archived": Toggle.BOTH,
+                "size": self.page_size,
+                **self.get_filter_params(),
             })
+            # Child streams need every item, and start from their own bookmarks
+            created_after = self.get_created_after(page.stream_context)
+            if created_after and not self.has_selected_descendents:
+                request.params["created_after"] = created_after
         return request
 
+    @override
+    def fetch_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        self._created_after = self.get_created_after(context)
+        self._pages = 0
+        self._resuming = False
+        self._resumed = False
+        try:
+            yield from super().fetch_records(context)
+        except FatalAPIError:
+            if not self._resuming:
+                raise
+            # Cursors are only valid for a while, so start over from the first page
+            self.logger.warning(
+                "Saved cursor of %s was rejected, restarting from the first page",
+                context,
+            )
+            self.clear_checkpoint(context)
+            self._pages = 0
+            self._resuming = False
+            self._resumed = False
+            yield from super().fetch_records(context)
+        self.clear_checkpoint(context)
+
+    @override
+    def _write_record_message(self, record: dict[str, Any]) -> None:
+        # Items created before the window are only listed for child streams. They
+        # still sync their children and count towards the state, so they are only
+        # left out when written, which the SDK has no public hook for
+        created = record.get(str(self.replication_key))
+        if (
+            self._created_after is not None
+            and created is not None
+            and datetime.fromisoformat(created).timestamp() < self._created_after
+        ):
+            return
+        super()._write_record_message(record)
+
+    @override
+    def is_full_scan(self, context: Context | None) -> bool:
+        """Whether the walk of a group listed all of its items.
+
+        Walks filtered by creation time or the configured filters, and walks
+        resumed from a saved cursor, only list some of them.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            True if items missing from the walk were deleted.
+        """
+        # The bookmark of the partition is already finalized, so check the window
+        # the walk started with
+        return (
+            not self._resumed
+            and not self.get_filter_params()
+            and self._created_after is None
+        )
+
+    def get_filter_params(self) -> dict[str, Any]:
+        """Get the filters to push down to the API.
+
+        Returns:
+            The query parameters of the configured filters.
+        """
+        if self.filters_setting is None:
+            return {}
+        filters: dict[str, Any] = self.config.get(self.filters_setting) or {}
+        return {key: value for key, value in filters.items() if value is not None}
+
+    def get_checkpoint(self, context: Context | None) -> dict[str, Any] | None:
+        """Get the saved pagination cursor of a partition, if still usable.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            The checkpoint, or None to walk the partition from the first page.
+        """
+        checkpoint: dict[str, Any] | None = self.get_context_state(context).get(
+            CHECKPOINT_KEY
+        )
+        if checkpoint is None:
+            return None
+
+        saved_at = datetime.fromisoformat(checkpoint["saved_at"])
+        if datetime.now(tz=UTC) - saved_at > self.cursor_max_age:
+            self.logger.warning(
+                "Saved cursor of %s is older than %s, restarting from the first page",
+                context,
+                self.cursor_max_age,
+            )
+            self.clear_checkpoint(context)
+            return None
+        return checkpoint
+
+    def save_checkpoint(self, context: Context | None, next_url: str) -> None:
+        """Save the cursor of the next page of a partition and emit the state.
+
+        Child partitions of the items synced so far are synced first, so nothing
+        before the cursor is skipped when the walk is resumed.
+
+        Args:
+            context: The stream partition context.
+            next_url: The URL of the next page.
+        """
+        self._flush_child_contexts()
+        state = self.get_context_state(context)
+        # The bookmark is only promoted once the walk completes, so keep the
+        # newest replication value seen so far along with the cursor
+        progress = state.get("progress_markers", {})
+        state[CHECKPOINT_KEY] = {
+            "next": next_url,
+            "saved_at": datetime.now(tz=UTC).isoformat(),
+            "replication_key_value": progress.get("replication_key_value"),
+        }
+        self.state_manager.is_flushed = False
+        self._write_state_message()
+
+    def clear_checkpoint(self, context: Context | None) -> None:
+        """Forget the saved pagination cursor of a partition.
+
+        Args:
+            context: The stream partition context.
+        """
+        self.get_context_state(context).pop(CHECKPOINT_KEY, None)
+
+    def get_created_after(self, context: Context | None) -> int | None:
+        """Get the ``created_after`` filter for a group's items.
+
+        The filter is seeded from the partition bookmark, or ``start_date`` if
+        there is none, minus the configured lookback window so recently created
+        items are re-synced and edits to them are picked up.
+
+        With the record index, every item is listed so edits to old items are
+        picked up too, and the index tells which items to emit.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            A Unix timestamp in seconds, or None to sync all items.
+        """
+        start = self.get_starting_timestamp(context)
+        if start is None or self.digests is not None:
+            return None
+
+        lookback = timedelta(days=self.config.get(self.lookback_setting, 0))
+        return int((start - lookback).timestamp())
+
+
+class Bitlinks(GroupItemsStream):
+    """Bitlinks stream."""
+
+    name = "bitlinks"
+    path = "/v4/groups/{group_guid}/bitlinks"
+    primary_keys = ("id",)
+    records_key = "links"
+    replication_key = "created_at"
+    filters_setting = "bitlinks_filters"
+    required_properties = ("id",)
+    batch_records = True
+    change_capture = True
+    change_partition_keys = ("group_guid",)
+
+    schema = ChangeCaptureSchema(
+        th.PropertiesList(
+            th.Property(
+                "id",
+                th.StringType,
+                description="The bitlink's unique identifier.",
+            ),
+            th.Property(
+                "created_at",
+                th.DateTimeType,
+                description="The date and time the bitlink was created.",
+            ),
+            th.Property("link", th.StringType, description="The bitlink's URL."),
+            th.Property(
+                "custom_bitlinks",
+                th.ArrayType(th.StringType()),
+                description="The bitlink's custom bitlinks.",
+            ),
+            th.Property("long_url", th.StringType, description="The bitlink's URL."),
+            th.Property("title", th.StringType, description="The bitlink's title."),
+            th.Property(
+                "archived",
+                th.BooleanType,
+                description="Whether the bitlink is archived.",
+            ),
+            th.Property(
+                "created_by", th.StringType, description="The bitlink's creator."
+            ),
+            th.Property(
+                "client_id", th.StringType, description="The bitlink's client ID."
+            ),
+            th.Property(
+                "tags",
+                th.ArrayType(th.StringType()),
+                description="The bitlink's tags.",
+            ),
+            th.Property(
+                "deeplinks",
+                th.ArrayType(th.StringType()),
+                description="The bitlink's deeplinks.",
+            ),
+            th.Property(
+                "references",
+                th.ObjectType(th.Property("group", th.StringType)),
+                description="Mapping of bitlink references.",
+            ),
+            th.Property(
+                "group_guid", th.StringType, description="The bitlink's group."
+            ),
+        ).to_dict()
+    )
+
     @override
     def get_child_context(self, record: Record, context: Context | None) -> Record:
-        return {"bitlink": record["id"]}
+        return {"bitlink": record["id"], "group_guid": record["group_guid"]}
+
+    @override
+    def post_process(
+        self, row: Record, context: Context | None = None
+    ) -> Record | None:
+        if not self.tap.sharding.includes_bitlink(row["id"]):
+            return None
+        return row
+
+    @override
+    def is_full_scan(self, context: Context | None) -> bool:
+        return self.tap.sharding.selects_all_bitlinks and super().is_full_scan(context)
 
 
 class BrandedShortDomains(BitlyStream[Any]):
@@ -196,6 +500,7 @@ class BrandedShortDomains(BitlyStream[Any]):
 
     name = "bsds"
     path = "/v4/bsds"
+    cache_responses = True
     primary_keys = ("domain",)
 
     schema = th.PropertiesList(
@@ -208,9 +513,8 @@ class BrandedShortDomains(BitlyStream[Any]):
     ).to_dict()
 
     @override
-    def parse_response(self, response: requests.Response) -> Iterable[dict[str, Any]]:
-        for bsd in response.json()["bsds"]:
-            yield {"domain": bsd}
+    def extract_records(self, body: Any) -> list[dict[str, Any]]:
+        return [{"domain": bsd} for bsd in body["bsds"]]
 
 
 class Campaigns(BitlyStream[Any]):
@@ -218,54 +522,58 @@ class Campaigns(BitlyStream[Any]):
 
     name = "campaigns"
     path = "/v4/campaigns"
+    cache_responses = True
+    change_capture = True
     primary_keys = ("guid",)
-    records_jsonpath = "$.campaigns[*]"
+    records_key = "campaigns"
 
-    schema = th.PropertiesList(
-        th.Property(
-            "guid",
-            th.StringType,
-            description="The campaign's unique identifier.",
-            required=True,
-        ),
-        th.Property(
-            "group_guid",
-            th.StringType,
-            description="The campaign's group.",
-        ),
-        th.Property(
-            "name",
-            th.StringType,
-            description="The campaign's name.",
-        ),
-        th.Property(
-            "description",
-            th.StringType,
-            description="The campaign's description.",
-        ),
-        th.Property(
-            "created",
-            th.DateTimeType,
-            description="The date and time the campaign was created.",
-        ),
-        th.Property(
-            "modified",
-            th.DateTimeType,
-            description="The date and time the campaign was last modified.",
-        ),
-        th.Property(
-            "created_by",
-            th.StringType,
-            description="The campaign's creator.",
-        ),
-        th.Property(
-            "references",
-            th.ObjectType(
-                # th.Property("group", th.StringType),  # noqa: ERA001
+    schema = ChangeCaptureSchema(
+        th.PropertiesList(
+            th.Property(
+                "guid",
+                th.StringType,
+                description="The campaign's unique identifier.",
+                required=True,
             ),
-            description="Mapping of campaign references.",
-        ),
-    ).to_dict()
+            th.Property(
+                "group_guid",
+                th.StringType,
+                description="The campaign's group.",
+            ),
+            th.Property(
+                "name",
+                th.StringType,
+                description="The campaign's name.",
+            ),
+            th.Property(
+                "description",
+                th.StringType,
+                description="The campaign's description.",
+            ),
+            th.Property(
+                "created",
+                th.DateTimeType,
+                description="The date and time the campaign was created.",
+            ),
+            th.Property(
+                "modified",
+                th.DateTimeType,
+                description="The date and time the campaign was last modified.",
+            ),
+            th.Property(
+                "created_by",
+                th.StringType,
+                description="The campaign's creator.",
+            ),
+            th.Property(
+                "references",
+                th.ObjectType(
+                    # th.Property("group", th.StringType),  # noqa: ERA001
+                ),
+                description="Mapping of campaign references.",
+            ),
+        ).to_dict()
+    )
 
 
 class Channels(BitlyStream[Any]):
@@ -273,41 +581,45 @@ class Channels(BitlyStream[Any]):
 
     name = "channels"
     path = "/v4/channels"
+    cache_responses = True
+    change_capture = True
     primary_keys = ("guid",)
-    records_jsonpath = "$.channels[*]"
+    records_key = "channels"
 
-    schema = th.PropertiesList(
-        th.Property(
-            "guid",
-            th.StringType,
-            description="The channel's unique identifier.",
-        ),
-        th.Property(
-            "name",
-            th.StringType,
-            description="The channel's name.",
-        ),
-        th.Property(
-            "created",
-            th.DateTimeType,
-            description="The date and time the channel was created.",
-        ),
-        th.Property(
-            "modified",
-            th.DateTimeType,
-            description="The date and time the channel was last modified.",
-        ),
-        th.Property(
-            "group_guid",
-            th.StringType,
-            description="The channel's group.",
-        ),
-        th.Property(
-            "references",
-            th.ObjectType(),
-            description="Mapping of channel references.",
-        ),
-    ).to_dict()
+    schema = ChangeCaptureSchema(
+        th.PropertiesList(
+            th.Property(
+                "guid",
+                th.StringType,
+                description="The channel's unique identifier.",
+            ),
+            th.Property(
+                "name",
+                th.StringType,
+                description="The channel's name.",
+            ),
+            th.Property(
+                "created",
+                th.DateTimeType,
+                description="The date and time the channel was created.",
+            ),
+            th.Property(
+                "modified",
+                th.DateTimeType,
+                description="The date and time the channel was last modified.",
+            ),
+            th.Property(
+                "group_guid",
+                th.StringType,
+                description="The channel's group.",
+            ),
+            th.Property(
+                "references",
+                th.ObjectType(),
+                description="Mapping of channel references.",
+            ),
+        ).to_dict()
+    )
 
 
 class Organizations(BitlyStream[Any]):
@@ -315,8 +627,9 @@ class Organizations(BitlyStream[Any]):
 
     name = "organizations"
     path = "/v4/organizations"
+    cache_responses = True
     primary_keys = ("guid",)
-    records_jsonpath = "$.organizations[*]"
+    records_key = "organizations"
 
     schema = th.PropertiesList(
         th.Property(
@@ -389,121 +702,938 @@ class Webhooks(BitlyStream[Any]):
     name = "webhooks"
     path = "/v4/organizations/{organization_guid}/webhooks"
     primary_keys = ("guid",)
-    records_jsonpath = "$.webhooks[*]"
+    records_key = "webhooks"
     parent_stream_type = Organizations
+    change_capture = True
+    change_partition_keys = ("organization_guid",)
 
-    schema = th.PropertiesList(
-        th.Property(
-            "guid",
-            th.StringType,
-            description="The webhook's unique identifier.",
-        ),
-        th.Property(
-            "name",
-            th.StringType,
-            description="The webhook's name.",
-        ),
-        th.Property(
-            "references",
-            th.ObjectType(),
-            description="Mapping of webhook references.",
-        ),
-        th.Property(
-            "created",
-            th.DateTimeType,
-            description="The date and time the webhook was created.",
-        ),
-        th.Property(
-            "modified",
-            th.DateTimeType,
-            description="The date and time the webhook was last modified.",
-        ),
-        th.Property(
-            "modified_by",
-            th.StringType,
-            description="The webhook's modifier.",
+    schema = ChangeCaptureSchema(
+        th.PropertiesList(
+            th.Property(
+                "guid",
+                th.StringType,
+                description="The webhook's unique identifier.",
+            ),
+            th.Property(
+                "name",
+                th.StringType,
+                description="The webhook's name.",
+            ),
+            th.Property(
+                "references",
+                th.ObjectType(),
+                description="Mapping of webhook references.",
+            ),
+            th.Property(
+                "created",
+                th.DateTimeType,
+                description="The date and time the webhook was created.",
+            ),
+            th.Property(
+                "modified",
+                th.DateTimeType,
+                description="The date and time the webhook was last modified.",
+            ),
+            th.Property(
+                "modified_by",
+                th.StringType,
+                description="The webhook's modifier.",
+            ),
+            th.Property(
+                "deactivated",
+                th.DateTimeType,
+                description="The date and time the webhook was deactivated.",
+            ),
+            th.Property(
+                "is_active",
+                th.BooleanType,
+                description="Whether the webhook is active.",
+            ),
+            th.Property(
+                "organization_guid",
+                th.StringType,
+                description="The webhook's organization.",
+            ),
+            th.Property(
+                "group_guid",
+                th.StringType,
+                description="The webhook's group.",
+            ),
+            th.Property(
+                "event",
+                th.StringType,
+                description="The webhook's event.",
+            ),
+            th.Property(
+                "url",
+                th.StringType,
+                description="The webhook's URL.",
+            ),
+            th.Property(
+                "status",
+                th.StringType,
+                description="The webhook's status.",
+            ),
+            th.Property(
+                "oauth_url",
+                th.StringType,
+                description="The webhook's OAuth URL.",
+            ),
+            th.Property(
+                "client_id",
+                th.StringType,
+                description="The webhook's client ID.",
+            ),
+            th.Property(
+                "client_secret",
+                th.StringType,
+                description="The webhook's client secret.",
+            ),
+            th.Property(
+                "fetch_tags",
+                th.BooleanType,
+                description="Whether to fetch tags.",
+            ),
+        ).to_dict()
+    )
+
+
+class BitlinkMetricsStream(BitlyMetricsStream[Any]):
+    """Base class for metrics of each bitlink.
+
+    With ``skip_inactive_bitlinks`` enabled, bitlinks without clicks since their
+    window start are synced without requesting their metrics.
+    """
+
+    parent_stream_type = Bitlinks
+
+    deferrable = True
+
+    # The group is only passed down to check its activity
+    state_partitioning_keys = ("bitlink",)
+
+    #: Maximum number of bitlinks listed by the sorted bitlinks endpoint.
+    sorted_bitlinks_size = 100
+
+    #: Minimum number of seconds between STATE messages written as bitlinks are
+    #: synced. Every message holds the bookmarks of all bitlinks.
+    state_message_interval = 10.0
+
+    def __init__(self, tap: TapBitly) -> None:
+        """Initialize the stream.
+
+        Args:
+            tap: The tap instance.
+        """
+        super().__init__(tap)
+        self._active_bitlinks: dict[tuple[str, datetime], frozenset[str] | None] = {}
+        self._state_written_at: float | None = None
+
+    @override
+    @property
+    def state_manager(self) -> StreamStateManager:
+        state_format = self.tap.state_format
+        if self._state_manager is None and state_format != StateFormat.PARTITIONS:
+            manager = CompactStateManager(
+                partition_key="bitlink",
+                replication_key=str(self.replication_key),
+                compress=state_format == StateFormat.COMPRESSED,
+                tap_name=self.tap_name,
+                stream_name=self.name,
+                tap_state=self.tap_state,
+                state_partitioning_keys=self.state_partitioning_keys,
+                is_sorted=self.is_sorted,
+                check_sorted=self.check_sorted,
+            )
+            self.tap.compact_states.append(manager)
+            self._state_manager = manager
+        return super().state_manager
+
+    @override
+    def _sync_records(
+        self,
+        context: Context | None = None,
+        *,
+        write_messages: bool = True,
+    ) -> Generator[dict[str, Any], Any, Any]:
+        # The SDK finalizes the bookmark of a partition at the end of this, with no
+        # public hook after it, and compact bookmarks are packed from final ones
+        yield from super()._sync_records(context, write_messages=write_messages)
+        manager = self.state_manager
+        if context is not None and isinstance(manager, CompactStateManager):
+            manager.finalize_partition(context)
+
+    @override
+    def _write_state_message(self) -> None:
+        # The SDK writes the state after each partition, and has no public setting
+        # to write it less often
+        now = monotonic()
+        written_at = self._state_written_at
+        if written_at is not None and now - written_at < self.state_message_interval:
+            return
+
+        self._state_written_at = now
+        super()._write_state_message()
+
+    @override
+    def finalize_state_progress_markers(
+        self, state: dict[str, Any] | None = None
+    ) -> None:
+        # The final state is always written
+        self._state_written_at = None
+        super().finalize_state_progress_markers(state)
+
+    @override
+    def prefetch_records(self, context: Context | None, executor: Executor) -> None:
+        # Inactive bitlinks don't need a request, they are synced without one
+        self._write_starting_replication_value(context)
+        if context is None or not self.is_inactive(context):
+            super().prefetch_records(context, executor)
+
+    def is_inactive(self, context: Context) -> bool:
+        """Whether a bitlink provably had no clicks since its window start.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            True if ``skip_inactive_bitlinks`` is enabled and the bitlink's group
+            reported no clicks for it in the bitlink's window.
+        """
+        if not self.config.get("skip_inactive_bitlinks") or "group_guid" not in context:
+            return False
+
+        start = self.get_window_start(context)
+        if start is None:
+            return False
+
+        active = self.get_active_bitlinks(context["group_guid"], start)
+        return active is not None and context["bitlink"] not in active
+
+    def get_active_bitlinks(
+        self,
+        group_guid: str,
+        start: datetime,
+    ) -> frozenset[str] | None:
+        """Get the bitlinks of a group that were clicked since a start time.
+
+        The group's click total is checked first, and only if the group was clicked
+        are its most clicked bitlinks listed. Results are cached per group and start
+        time. Bitlinks usually share their bookmark, so a typical sync makes one or
+        two requests per group instead of one per bitlink.
+
+        Args:
+            group_guid: The group GUID.
+            start: The earliest time to check clicks for.
+
+        Returns:
+            The IDs of the clicked bitlinks, or None if there are too many to list.
+        """
+        key = (group_guid, start)
+        if key not in self._active_bitlinks:
+            self._active_bitlinks[key] = self._request_active_bitlinks(
+                group_guid,
+                start,
+            )
+        return self._active_bitlinks[key]
+
+    def _request_active_bitlinks(
+        self,
+        group_guid: str,
+        start: datetime,
+    ) -> frozenset[str] | None:
+        params = {
+            "unit": "day",
+            "units": self.count_units(start, "day"),
+            "unit_reference": self.unit_reference.strftime(UNIT_REFERENCE_FORMAT),
+        }
+        group_clicks = self.request_json(
+            "/v4/groups/{group_guid}/clicks",
+            params,
+            group_guid=group_guid,
+        )
+        if not any(item.get("count") for item in group_clicks.get("data", [])):
+            return frozenset()
+
+        sorted_links = self.request_json(
+            "/v4/groups/{group_guid}/bitlinks/clicks",
+            {**params, "size": self.sorted_bitlinks_size},
+            group_guid=group_guid,
+        ).get("sorted_links", [])
+        active = frozenset(link["id"] for link in sorted_links if link.get("clicks"))
+
+        # Unlisted bitlinks may have been clicked if every listed one was
+        if len(active) >= self.sorted_bitlinks_size:
+            return None
+        return active
+
+    def get_inactive_records(self, context: Context) -> Iterable[dict[str, Any]]:  # noqa: ARG002, PLR6301
+        """Get the records of a bitlink without clicks, without requesting them.
+
+        Args:
+            context: The stream partition context.
+
+        Returns:
+            The records the API would return for the window, none by default.
+        """
+        return []
+
+    @override
+    def request_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        if context is not None and self.is_inactive(context):
+            yield from self.get_inactive_records(context)
+            return
+
+        yield from super().request_records(context)
+
+
+class DailyBitlinkClicks(BitlinkMetricsStream):
+    """Daily bitlink clicks.
+
+    With ``click_digests_path`` set, re-fetched rows are only emitted when their
+    clicks changed since they were last loaded.
+    """
+
+    name = "daily_bitlink_clicks"
+    path = "/v4/bitlinks/{bitlink}/clicks"
+    primary_keys = ("date", "bitlink")
+    records_key = "link_clicks"
+    replication_key = "date"
+    batch_records = True
+
+    schema = th.PropertiesList(
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("bitlink", th.StringType, description="The bitlink."),
+    ).to_dict()
+
+    @property
+    def rollup_stream(self) -> MonthlyBitlinkClicks | None:
+        """The monthly stream to share fetched daily clicks with, if any.
+
+        Child streams of a bitlink are synced in discovery order, so the daily
+        clicks of a bitlink are always fetched before its monthly clicks.
+        """
+        if not self.config.get("derive_monthly_clicks"):
+            return None
+
+        stream = self.tap.streams.get(MonthlyBitlinkClicks.name)
+        if isinstance(stream, MonthlyBitlinkClicks) and stream.selected:
+            return stream
+        return None
+
+    def _write_rollup_starting_value(self, context: Context | None) -> None:
+        # The window is widened from the starting value of the monthly stream, which
+        # is written on the main thread before records are fetched, so worker threads
+        # only read the state
+        if (monthly := self.rollup_stream) is not None:
+            monthly._write_starting_replication_value(context)  # noqa: SLF001
+
+    @override
+    def prefetch_records(self, context: Context | None, executor: Executor) -> None:
+        self._write_rollup_starting_value(context)
+        super().prefetch_records(context, executor)
+
+    @override
+    def request_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        self._write_rollup_starting_value(context)
+        yield from super().request_records(context)
+
+    @override
+    def get_inactive_records(self, context: Context) -> Iterable[dict[str, Any]]:
+        """Get the records of a bitlink without clicks, without requesting them.
+
+        The records are the zero counts the API would return for the window.
+
+        Args:
+            context: The stream partition context.
+
+        Yields:
+            One record with zero clicks per unit, newest first.
+        """
+        start = self.get_window_start(context)
+        if start is None:
+            return
+
+        end = self.unit_reference
+        for offset in range(self.count_units(start, self.request_unit)):
+            if self.request_unit == "month":
+                months = end.year * 12 + end.month - 1 - offset
+                unit_start = datetime(months // 12, months % 12 + 1, 1, tzinfo=UTC)
+            else:
+                unit_start = datetime.combine(
+                    end.date() - timedelta(days=offset),
+                    time(),
+                    tzinfo=UTC,
+                )
+            yield {"date": unit_start.strftime(UNIT_REFERENCE_FORMAT), "clicks": 0}
+
+    @override
+    def get_window_start(self, context: Context | None) -> datetime | None:
+        start = super().get_window_start(context)
+        if start is None or (monthly := self.rollup_stream) is None:
+            return start
+
+        # Widen the window so the monthly stream gets whole months
+        monthly_start = monthly.get_window_start(context)
+        return None if monthly_start is None else min(start, monthly_start)
+
+    @override
+    def get_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        if context is None or (monthly := self.rollup_stream) is None:
+            yield from super().get_records(context)
+            return
+
+        start = super().get_window_start(context)
+        rows: list[tuple[str, int]] = []
+        for record in self.request_records(context):
+            rows.append((record["date"], record["clicks"]))
+            if start is None or self._parse_datetime(record["date"]) >= start:
+                yield record
+
+        monthly.stash_daily_clicks(context["bitlink"], rows)
+
+    @override
+    @property
+    def digests(self) -> DigestStore | None:
+        return self.tap.click_digests
+
+    def get_digest_cutoff(self) -> str:
+        """Get the earliest date the next sync re-fetches clicks for.
+
+        Returns:
+            The unit reference minus the lookback window, at the start of its unit.
+        """
+        lookback = timedelta(days=self.config.get(self.lookback_setting, 0))
+        start = (self.unit_reference - lookback).replace(
+            hour=0,
+            minute=0,
+            second=0,
+            microsecond=0,
+        )
+        if self.unit == "month":
+            start = start.replace(day=1)
+        return start.strftime(UNIT_REFERENCE_FORMAT)
+
+    @override
+    def _create_change_tracker(
+        self,
+        digests: DigestStore,
+        confirmed_run: str | None,
+    ) -> ClickChangeTracker:
+        return ClickChangeTracker(
+            digests,
+            self.name,
+            confirmed_run,
+            cutoff=self.get_digest_cutoff(),
+        )
+
+
+class MonthlyBitlinkClicks(DailyBitlinkClicks):
+    """Monthly bitlink clicks.
+
+    With ``derive_monthly_clicks`` enabled, monthly clicks are rolled up from daily
+    clicks instead of being requested separately.
+    """
+
+    name = "monthly_bitlink_clicks"
+    unit = "month"
+
+    def __init__(self, tap: TapBitly) -> None:
+        """Initialize the stream.
+
+        Args:
+            tap: The tap instance.
+        """
+        super().__init__(tap)
+        self._daily_clicks: dict[str, list[tuple[str, int]]] = {}
+
+    @property
+    def derived(self) -> bool:
+        """Whether monthly clicks are rolled up from daily clicks."""
+        return bool(self.config.get("derive_monthly_clicks"))
+
+    @override
+    @property
+    def rollup_stream(self) -> MonthlyBitlinkClicks | None:
+        return None
+
+    @override
+    @property
+    def request_unit(self) -> str:
+        return "day" if self.derived else self.unit
+
+    @override
+    def get_window_start(self, context: Context | None) -> datetime | None:
+        start = super().get_window_start(context)
+        if start is None:
+            return None
+
+        return start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    def stash_daily_clicks(self, bitlink: str, rows: list[tuple[str, int]]) -> None:
+        """Keep the daily clicks of a bitlink until its monthly clicks are synced.
+
+        Args:
+            bitlink: The bitlink ID.
+            rows: Pairs of daily click dates and counts.
+        """
+        self._daily_clicks[bitlink] = rows
+
+    @property
+    def reuses_daily_clicks(self) -> bool:
+        """Whether monthly clicks are rolled up from the rows of the daily stream."""
+        daily = self.tap.streams.get(DailyBitlinkClicks.name)
+        return self.derived and daily is not None and daily.selected
+
+    @override
+    @property
+    def prefetch_enabled(self) -> bool:
+        # Derived monthly clicks reuse the rows fetched by the daily stream
+        if self.reuses_daily_clicks:
+            return False
+        return super().prefetch_enabled
+
+    @override
+    def estimate_requests(self, start: datetime | None) -> int:
+        return 0 if self.reuses_daily_clicks else 1
+
+    @override
+    def get_records(self, context: Context | None) -> Iterable[dict[str, Any]]:
+        if context is None or not self.derived:
+            yield from super().get_records(context)
+            return
+
+        rows = self._daily_clicks.pop(context["bitlink"], None)
+        if rows is None:
+            rows = [(r["date"], r["clicks"]) for r in self.request_records(context)]
+
+        start = self.get_window_start(context)
+        for month, clicks in rollup_monthly_clicks(rows).items():
+            if start is None or self._parse_datetime(month) >= start:
+                yield {"date": month, "clicks": clicks}
+
+
+class BitlinkFacetStream(BitlinkMetricsStream, BitlyFacetStream[Any]):
+    """Base class for daily clicks of a bitlink, broken down by a facet.
+
+    Like every child stream of bitlinks, these streams are synced from a single
+    walk of the bitlinks list, and with ``max_workers`` the requests of all
+    selected streams for a batch of bitlinks are made concurrently.
+    """
+
+    replication_key = "date"
+    selected_by_default = False
+
+
+class BitlinkCountries(BitlinkFacetStream):
+    """Daily clicks of a bitlink by country."""
+
+    name = "bitlink_countries"
+    path = "/v4/bitlinks/{bitlink}/countries"
+    primary_keys = ("bitlink", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("bitlink", th.StringType, description="The bitlink."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The country code."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class BitlinkCities(BitlinkFacetStream):
+    """Daily clicks of a bitlink by city."""
+
+    name = "bitlink_cities"
+    path = "/v4/bitlinks/{bitlink}/cities"
+    primary_keys = ("bitlink", "date", "country", "region", "subregion", "city")
+
+    schema = th.PropertiesList(
+        th.Property("bitlink", th.StringType, description="The bitlink."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("city", th.StringType, description="The city."),
+        th.Property("subregion", th.StringType, description="The subregion."),
+        th.Property("region", th.StringType, description="The region."),
+        th.Property("country", th.StringType, description="The country."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class BitlinkDevices(BitlinkFacetStream):
+    """Daily clicks of a bitlink by device type."""
+
+    name = "bitlink_devices"
+    path = "/v4/bitlinks/{bitlink}/devices"
+    primary_keys = ("bitlink", "date", "device_type")
+
+    schema = th.PropertiesList(
+        th.Property("bitlink", th.StringType, description="The bitlink."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("device_type", th.StringType, description="The device type."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class BitlinkReferrers(BitlinkFacetStream):
+    """Daily clicks of a bitlink by referrer."""
+
+    name = "bitlink_referrers"
+    path = "/v4/bitlinks/{bitlink}/referrers"
+    primary_keys = ("bitlink", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("bitlink", th.StringType, description="The bitlink."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The referrer."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class BitlinkReferringDomains(BitlinkFacetStream):
+    """Daily clicks of a bitlink by referring domain."""
+
+    name = "bitlink_referring_domains"
+    path = "/v4/bitlinks/{bitlink}/referring_domains"
+    primary_keys = ("bitlink", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("bitlink", th.StringType, description="The bitlink."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The referring domain."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class GroupMetricsStream(BitlyMetricsStream[Any]):
+    """Base class for the metrics of whole groups."""
+
+    parent_stream_type = Groups
+    selected_by_default = False
+
+    @property
+    @override
+    def selected(self) -> bool:
+        """Whether the stream is selected, and its groups are synced by this shard.
+
+        When sharding by bitlink, every shard syncs every group, so only one syncs
+        their metrics.
+        """
+        return super().selected and self.tap.sharding.includes_group_metrics
+
+    @selected.setter
+    def selected(self, value: bool | None) -> None:
+        BitlyMetricsStream.selected.fset(self, value)  # type: ignore[attr-defined]
+
+
+class DailyGroupClicks(GroupMetricsStream):
+    """Daily clicks on all bitlinks of a group."""
+
+    name = "daily_group_clicks"
+    path = "/v4/groups/{group_guid}/clicks"
+    primary_keys = ("group_guid", "ts")
+    records_key = "data"
+    replication_key = "ts"
+
+    schema = th.PropertiesList(
+        th.Property("group_guid", th.StringType, description="The group."),
+        th.Property("ts", th.DateTimeType, description="The date."),
+        th.Property("count", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class DailyGroupShortenCounts(GroupMetricsStream):
+    """Daily number of bitlinks created in a group."""
+
+    name = "daily_group_shorten_counts"
+    path = "/v4/groups/{group_guid}/shorten_counts"
+    primary_keys = ("group_guid", "key")
+    records_key = "metrics"
+    replication_key = "key"
+
+    schema = th.PropertiesList(
+        th.Property("group_guid", th.StringType, description="The group."),
+        th.Property("key", th.DateTimeType, description="The date."),
+        th.Property(
+            "value",
+            th.IntegerType,
+            description="The number of bitlinks created.",
         ),
+    ).to_dict()
+
+
+class GroupFacetStream(GroupMetricsStream, BitlyFacetStream[Any]):
+    """Base class for daily clicks of a group, broken down by a facet."""
+
+    replication_key = "date"
+
+
+class GroupCountries(GroupFacetStream):
+    """Daily clicks of a group by country."""
+
+    name = "group_countries"
+    path = "/v4/groups/{group_guid}/countries"
+    primary_keys = ("group_guid", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("group_guid", th.StringType, description="The group."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The country code."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class GroupCities(GroupFacetStream):
+    """Daily clicks of a group by city."""
+
+    name = "group_cities"
+    path = "/v4/groups/{group_guid}/cities"
+    primary_keys = ("group_guid", "date", "country", "region", "subregion", "city")
+
+    schema = th.PropertiesList(
+        th.Property("group_guid", th.StringType, description="The group."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("city", th.StringType, description="The city."),
+        th.Property("subregion", th.StringType, description="The subregion."),
+        th.Property("region", th.StringType, description="The region."),
+        th.Property("country", th.StringType, description="The country."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class GroupDevices(GroupFacetStream):
+    """Daily clicks of a group by device type."""
+
+    name = "group_devices"
+    path = "/v4/groups/{group_guid}/devices"
+    primary_keys = ("group_guid", "date", "device_type")
+
+    schema = th.PropertiesList(
+        th.Property("group_guid", th.StringType, description="The group."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("device_type", th.StringType, description="The device type."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class GroupReferrers(GroupFacetStream):
+    """Daily clicks of a group by referrer."""
+
+    name = "group_referrers"
+    path = "/v4/groups/{group_guid}/referrers"
+    primary_keys = ("group_guid", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("group_guid", th.StringType, description="The group."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The referrer."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class GroupReferringNetworks(GroupFacetStream):
+    """Daily clicks of a group by referring network."""
+
+    name = "group_referring_networks"
+    path = "/v4/groups/{group_guid}/referring_networks"
+    primary_keys = ("group_guid", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("group_guid", th.StringType, description="The group."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The referring network."),
+        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+    ).to_dict()
+
+
+class QRCodes(GroupItemsStream):
+    """QR codes stream."""
+
+    name = "qr_codes"
+    path = "/v4/groups/{group_guid}/qr-codes"
+    primary_keys = ("qrcode_id",)
+    records_key = "qr_codes"
+    replication_key = "created"
+    selected_by_default = False
+    required_properties = ("qrcode_id",)
+
+    schema = th.PropertiesList(
         th.Property(
-            "deactivated",
-            th.DateTimeType,
-            description="The date and time the webhook was deactivated.",
+            "qrcode_id",
+            th.StringType,
+            description="The QR code's unique identifier.",
         ),
+        th.Property("group_guid", th.StringType, description="The QR code's group."),
+        th.Property("title", th.StringType, description="The QR code's title."),
         th.Property(
-            "is_active",
+            "is_customized",
             th.BooleanType,
-            description="Whether the webhook is active.",
+            description="Whether the QR code's render customizations were changed.",
         ),
         th.Property(
-            "organization_guid",
+            "serialized_content",
             th.StringType,
-            description="The webhook's organization.",
+            description="The serialized content of the QR code.",
         ),
         th.Property(
-            "group_guid",
+            "qr_code_type",
             th.StringType,
-            description="The webhook's group.",
+            description="The type of content the QR code serves.",
         ),
         th.Property(
-            "event",
-            th.StringType,
-            description="The webhook's event.",
+            "long_urls",
+            th.ArrayType(th.StringType()),
+            description="The destination URLs of the QR code.",
         ),
         th.Property(
-            "url",
+            "bitlink_id",
             th.StringType,
-            description="The webhook's URL.",
+            description="The bitlink of the QR code, if any.",
         ),
         th.Property(
-            "status",
-            th.StringType,
-            description="The webhook's status.",
+            "is_gs1",
+            th.BooleanType,
+            description="Whether the QR code has GS1 values.",
         ),
         th.Property(
-            "oauth_url",
+            "created_by",
             th.StringType,
-            description="The webhook's OAuth URL.",
+            description="The user that created the QR code.",
         ),
         th.Property(
-            "client_id",
-            th.StringType,
-            description="The webhook's client ID.",
+            "archived",
+            th.BooleanType,
+            description="Whether the QR code is archived.",
         ),
         th.Property(
-            "client_secret",
-            th.StringType,
-            description="The webhook's client secret.",
+            "created",
+            th.DateTimeType,
+            description="The date and time the QR code was created.",
         ),
         th.Property(
-            "fetch_tags",
-            th.BooleanType,
-            description="Whether to fetch tags.",
+            "modified",
+            th.DateTimeType,
+            description="The date and time the QR code was last modified.",
         ),
     ).to_dict()
 
+    @override
+    def get_child_context(self, record: Record, context: Context | None) -> Record:
+        return {"qrcode_id": record["qrcode_id"]}
 
-class DailyBitlinkClicks(BitlyStream[Any]):
-    """Daily bitlink clicks."""
+    @override
+    def post_process(
+        self, row: Record, context: Context | None = None
+    ) -> Record | None:
+        if not self.tap.sharding.includes_qr_code(row["qrcode_id"]):
+            return None
+        return row
 
-    name = "daily_bitlink_clicks"
-    path = "/v4/bitlinks/{bitlink}/clicks"
-    primary_keys = ("date", "bitlink")
-    records_jsonpath = "$.link_clicks[*]"
-    parent_stream_type = Bitlinks
+
+class DailyQRCodeScans(BitlyMetricsStream[Any]):
+    """Daily QR code scans."""
+
+    name = "daily_qr_code_scans"
+    path = "/v4/qr-codes/{qrcode_id}/scans"
+    primary_keys = ("qrcode_id", "date")
+    records_key = "scans"
+    replication_key = "date"
+    parent_stream_type = QRCodes
+    selected_by_default = False
+
+    deferrable = True
 
     schema = th.PropertiesList(
-        th.Property("clicks", th.IntegerType, description="The number of clicks."),
+        th.Property("qrcode_id", th.StringType, description="The QR code."),
         th.Property("date", th.DateTimeType, description="The date."),
-        th.Property("bitlink", th.StringType, description="The bitlink."),
+        th.Property("scans", th.IntegerType, description="The number of scans."),
     ).to_dict()
 
 
-class MonthlyBitlinkClicks(DailyBitlinkClicks):
-    """Monthly bitlink clicks."""
+class QRCodeFacetStream(BitlyFacetStream[Any]):
+    """Base class for daily scans of a QR code, broken down by a facet."""
 
-    name = "monthly_bitlink_clicks"
+    replication_key = "date"
+    parent_stream_type = QRCodes
+    selected_by_default = False
 
-    @override
-    def get_http_request(self, *, page: PageContext[ParseResult]) -> HTTPRequest:
-        request = super().get_http_request(page=page)
-        request.params["unit"] = "month"
-        return request
+
+class QRCodeScanCountries(QRCodeFacetStream):
+    """Daily scans of a QR code by country."""
+
+    name = "qr_code_scan_countries"
+    path = "/v4/qr-codes/{qrcode_id}/scans/countries"
+    primary_keys = ("qrcode_id", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("qrcode_id", th.StringType, description="The QR code."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The country code."),
+        th.Property("scans", th.IntegerType, description="The number of scans."),
+    ).to_dict()
+
+
+class QRCodeScanCities(QRCodeFacetStream):
+    """Daily scans of a QR code by city."""
+
+    name = "qr_code_scan_cities"
+    path = "/v4/qr-codes/{qrcode_id}/scans/cities"
+    primary_keys = ("qrcode_id", "date", "country", "region", "subregion", "city")
+
+    schema = th.PropertiesList(
+        th.Property("qrcode_id", th.StringType, description="The QR code."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("city", th.StringType, description="The city."),
+        th.Property("subregion", th.StringType, description="The subregion."),
+        th.Property("region", th.StringType, description="The region."),
+        th.Property("country", th.StringType, description="The country."),
+        th.Property("scans", th.IntegerType, description="The number of scans."),
+    ).to_dict()
+
+
+class QRCodeScanDeviceOS(QRCodeFacetStream):
+    """Daily scans of a QR code by device operating system."""
+
+    name = "qr_code_scan_device_os"
+    path = "/v4/qr-codes/{qrcode_id}/scans/device_os"
+    primary_keys = ("qrcode_id", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("qrcode_id", th.StringType, description="The QR code."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The operating system."),
+        th.Property("scans", th.IntegerType, description="The number of scans."),
+    ).to_dict()
+
+
+class QRCodeScanBrowsers(QRCodeFacetStream):
+    """Daily scans of a QR code by browser."""
+
+    name = "qr_code_scan_browsers"
+    path = "/v4/qr-codes/{qrcode_id}/scans/browsers"
+    primary_keys = ("qrcode_id", "date", "value")
+
+    schema = th.PropertiesList(
+        th.Property("qrcode_id", th.StringType, description="The QR code."),
+        th.Property("date", th.DateTimeType, description="The date."),
+        th.Property("value", th.StringType, description="The browser."),
+        th.Property("scans", th.IntegerType, description="The number of scans."),
+    ).to_dict()
+
+
+def rollup_monthly_clicks(rows: Iterable[tuple[str, int]]) -> dict[str, int]:
+    """Sum daily clicks into calendar months.
+
+    Months are keyed like Bitly's own monthly metrics, by the first day of the month
+    with the UTC offset of the daily dates, and sorted newest first.
+
+    Args:
+        rows: Pairs of daily click dates, e.g. ``2024-03-05T00:00:00+0000``, and
+            click counts.
+
+    Returns:
+        A mapping of month start dates to total clicks.
+    """
+    months: defaultdict[str, int] = defaultdict(int)
+    for date, clicks in rows:
+        months[f"{date[:7]}-01T00:00:00{date[19:]}"] += clicks
+    return dict(sorted(months.items(), reverse=True))
@@ -15,21 +15,56 @@
 
 from __future__ import annotations
 
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from functools import cached_property
+from pathlib import Path
 from typing import TYPE_CHECKING, Any, override
 
+import click
+import requests
+from requests.adapters import HTTPAdapter
 from singer_sdk import Tap
 from singer_sdk import typing as th
 
 from tap_bitly import streams
+from tap_bitly.batch import BatchWriter
+from tap_bitly.cache import ResponseCache
+from tap_bitly.client import DEFAULT_API_URL, BitlyStream, parse_json
+from tap_bitly.digests import DigestStore
+from tap_bitly.output import BufferedSingerWriter
+from tap_bitly.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_BYTES,
+    PageSizeController,
+)
+from tap_bitly.planner import AccountCounts, SyncPlan, SyncPlanner
+from tap_bitly.ratelimit import RateLimiter, RequestBudget, check_plan_limits
+from tap_bitly.sharding import Sharding, ShardKey
+from tap_bitly.state import CompactStateManager, StateFormat, expand_compact_state
+from tap_bitly.telemetry import Telemetry
 
 if TYPE_CHECKING:
-    from tap_bitly.client import BitlyStream
+    from singer_sdk import Stream
+    from singer_sdk.singerlib import Catalog
 
+#: Key of the click context metadata telling the tap to print the plan of the sync.
+PLAN_META_KEY = "tap_bitly.plan"
 
-class TapBitly(Tap):
+
+class TapBitly(Tap):  # noqa: PLR0904
     """Singer tap for Bitly."""
 
     name = "tap-bitly"
+    message_writer_class = BufferedSingerWriter
+
+    #: Whether the deferrable partitions that fit the request budget were planned.
+    _budget_planned = False
+
+    #: Whether the records of top-level streams were requested concurrently.
+    _streams_prefetched = False
 
     config_jsonschema = th.PropertiesList(
         th.Property(
@@ -49,22 +84,749 @@ class TapBitly(Tap):
             th.DateTimeType,
             description="Earliest datetime to get data from",
         ),
+        th.Property(
+            "bitlinks_lookback_days",
+            th.IntegerType,
+            default=0,
+            description=(
+                "Number of days before the bookmark to re-sync bitlinks and QR codes "
+                "from, to capture edits to recently created ones"
+            ),
+        ),
+        th.Property(
+            "clicks_lookback_days",
+            th.IntegerType,
+            default=0,
+            description=(
+                "Number of days before the bookmark to re-fetch clicks for, to "
+                "capture clicks that Bitly counts late. Facet streams, like "
+                "group_countries, send one request per day of this window for each "
+                "group, bitlink or QR code, and only sync it when there is neither "
+                "a bookmark nor a start_date"
+            ),
+        ),
+        th.Property(
+            "click_digests_path",
+            th.StringType,
+            description=(
+                "Path of a local SQLite database of the clicks last emitted for each "
+                "bitlink and day. When set, re-fetched bitlink clicks are only "
+                "emitted if they changed. Disabled if not set"
+            ),
+        ),
+        th.Property(
+            "record_index_path",
+            th.StringType,
+            description=(
+                "Path of a local SQLite database of the records last emitted by "
+                "groups, bitlinks, campaigns, channels and webhooks. When set, only "
+                "new and changed records of these streams are emitted. Disabled if "
+                "not set"
+            ),
+        ),
+        th.Property(
+            "emit_tombstones",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Emit a record with the primary key and _sdc_deleted_at for each "
+                "record missing from a full scan, when record_index_path is set"
+            ),
+        ),
+        th.Property(
+            "derive_monthly_clicks",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Roll up monthly bitlink clicks from daily clicks instead of "
+                "requesting them separately"
+            ),
+        ),
+        th.Property(
+            "skip_inactive_bitlinks",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Check group click totals first and sync zero clicks for bitlinks "
+                "without clicks since their bookmark, without requesting them"
+            ),
+        ),
+        th.Property(
+            "bitlinks_filters",
+            th.ObjectType(
+                th.Property(
+                    "tags",
+                    th.ArrayType(th.StringType),
+                    description="Only sync bitlinks with any of these tags",
+                ),
+                th.Property(
+                    "campaign_guid",
+                    th.StringType,
+                    description="Only sync bitlinks of this campaign",
+                ),
+                th.Property(
+                    "channel_guid",
+                    th.StringType,
+                    description=(
+                        "Only sync bitlinks of this channel. Overrides the other "
+                        "filters"
+                    ),
+                ),
+                th.Property(
+                    "has_qr_codes",
+                    th.StringType(allowed_values=list(streams.Toggle)),
+                    description="Whether to sync bitlinks with or without QR codes",
+                ),
+                th.Property(
+                    "custom_bitlink",
+                    th.StringType(allowed_values=list(streams.Toggle)),
+                    description=(
+                        "Whether to sync bitlinks with or without custom bitlinks"
+                    ),
+                ),
+                th.Property(
+                    "deeplinks",
+                    th.StringType(allowed_values=list(streams.Toggle)),
+                    description="Whether to sync bitlinks with or without deeplinks",
+                ),
+                th.Property(
+                    "archived",
+                    th.StringType(allowed_values=list(streams.Toggle)),
+                    description=(
+                        "Whether to sync archived or unarchived bitlinks. Both by "
+                        "default"
+                    ),
+                ),
+                th.Property(
+                    "query",
+                    th.StringType,
+                    description="Only sync bitlinks matching this search",
+                ),
+            ),
+            description=(
+                "Filters applied by the API to the bitlinks of each group, so only "
+                "matching bitlinks and their metrics are synced"
+            ),
+        ),
+        th.Property(
+            "group_guids",
+            th.ArrayType(th.StringType),
+            description="Groups to sync. All groups are synced if not set",
+        ),
+        th.Property(
+            "excluded_group_guids",
+            th.ArrayType(th.StringType),
+            default=[],
+            description="Groups to never sync",
+        ),
+        th.Property(
+            "shard_count",
+            th.IntegerType(minimum=1),
+            default=1,
+            description=(
+                "Number of tap processes to split the sync of groups and bitlinks "
+                "across"
+            ),
+        ),
+        th.Property(
+            "shard_index",
+            th.IntegerType(minimum=0),
+            default=0,
+            description=("Shard synced by this process, between 0 and shard_count - 1"),
+        ),
+        th.Property(
+            "shard_by",
+            th.StringType(allowed_values=list(ShardKey)),
+            default=ShardKey.BITLINK,
+            description=(
+                "Whether to hash-partition bitlinks or whole groups across shards"
+            ),
+        ),
+        th.Property(
+            "max_workers",
+            th.IntegerType,
+            default=1,
+            description=(
+                "Maximum number of bitlinks to request metrics for concurrently"
+            ),
+        ),
+        th.Property(
+            "max_parallel_streams",
+            th.IntegerType(minimum=1),
+            default=1,
+            description=(
+                "Maximum number of top-level streams, e.g. groups and campaigns, to "
+                "request records of concurrently. Records and state are still "
+                "emitted one stream at a time"
+            ),
+        ),
+        th.Property(
+            "min_page_size",
+            th.IntegerType(minimum=1),
+            default=10,
+            description=(
+                "Minimum number of items to request per page of bitlinks and QR codes"
+            ),
+        ),
+        th.Property(
+            "max_page_size",
+            th.IntegerType(minimum=1),
+            default=1000,
+            description=(
+                "Maximum number of items to request per page of bitlinks and QR "
+                "codes. Page sizes adapt between the minimum and this, from response "
+                "times, response sizes and throttled requests"
+            ),
+        ),
+        th.Property(
+            "page_target_seconds",
+            th.NumberType,
+            default=5,
+            description=(
+                "Target response time of a page. Page sizes shrink when responses "
+                "are slower"
+            ),
+        ),
+        th.Property(
+            "api_url",
+            th.URIType,
+            default=DEFAULT_API_URL,
+            description="Base URL of the Bitly API, e.g. to use a proxy or a mock",
+        ),
+        th.Property(
+            "cache_dir",
+            th.StringType,
+            description=(
+                "Directory to cache responses of reference streams in, e.g. groups "
+                "and campaigns, across runs. Disabled if not set"
+            ),
+        ),
+        th.Property(
+            "cache_ttl_seconds",
+            th.IntegerType,
+            default=3600,
+            description=(
+                "Number of seconds cached responses are used for before they are "
+                "revalidated"
+            ),
+        ),
+        th.Property(
+            "cache_max_bytes",
+            th.IntegerType,
+            default=64 * 1024 * 1024,
+            description=(
+                "Maximum size of the response cache. The least recently used "
+                "responses are evicted first"
+            ),
+        ),
+        th.Property(
+            "state_format",
+            th.StringType(allowed_values=list(StateFormat)),
+            default=StateFormat.PARTITIONS,
+            description=(
+                "Layout of the bookmarks of bitlink metric streams. 'compact' groups "
+                "bitlinks by bookmark, 'compressed' also compresses them. Existing "
+                "state is migrated to the configured layout"
+            ),
+        ),
+        th.Property(
+            "batch_max_bytes",
+            th.IntegerType,
+            default=128 * 1024 * 1024,
+            description=(
+                "Maximum size of a batch file, in bytes of uncompressed JSON records "
+                "or of Arrow data for Parquet files, when BATCH messages are enabled "
+                "with batch_config"
+            ),
+        ),
+        th.Property(
+            "batch_max_seconds",
+            th.NumberType,
+            default=300,
+            description=(
+                "Maximum number of seconds records are written to a batch file "
+                "before it is announced, when BATCH messages are enabled"
+            ),
+        ),
+        th.Property(
+            "telemetry_path",
+            th.StringType,
+            description=(
+                "Path of a JSON file to write request and parse telemetry of every "
+                "stream to at the end of the sync"
+            ),
+        ),
+        th.Property(
+            "max_requests_per_second",
+            th.NumberType,
+            default=50,
+            description=(
+                "Maximum number of requests per second to each endpoint. Lowered "
+                "automatically from the account's platform limits and when Bitly "
+                "throttles requests"
+            ),
+        ),
+        th.Property(
+            "check_plan_limits",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Warn when the monthly quotas of the plan of an organization are "
+                "almost used. Requests the organizations and their plan limits "
+                "when the sync starts"
+            ),
+        ),
+        th.Property(
+            "max_requests",
+            th.IntegerType(minimum=1),
+            description=(
+                "Maximum number of requests of a sync. Metrics of the bitlinks, "
+                "groups and QR codes synced most recently are deferred to a later "
+                "sync to stay within it. Unlimited if not set"
+            ),
+        ),
     ).to_dict()
 
+    def __init__(self, **kwargs: Any) -> None:  # noqa: ANN401
+        """Initialize the tap.
+
+        With ``--plan``, a tap built by the command line prints the plan of the sync,
+        from its config, state and catalog, and exits instead of running.
+
+        Args:
+            kwargs: Keyword arguments of the SDK's tap.
+        """
+        super().__init__(**kwargs)
+        ctx = click.get_current_context(silent=True)
+        if ctx is not None and ctx.meta.get(PLAN_META_KEY):
+            self.write_plan()
+            ctx.exit()
+
+    @classmethod
+    @override
+    def get_singer_command(cls) -> click.Command:
+        command = super().get_singer_command()
+        command.params.append(
+            click.Option(
+                ["--plan"],
+                is_flag=True,
+                help=(
+                    "Print the estimated requests, bytes and duration of syncing "
+                    "the selected streams, without syncing them."
+                ),
+                callback=cls.cb_plan,
+                expose_value=False,
+            ),
+        )
+        return command
+
+    @classmethod
+    def cb_plan(
+        cls,
+        ctx: click.Context,
+        param: click.Option,  # noqa: ARG003
+        value: bool,  # noqa: FBT001
+    ) -> None:
+        """CLI callback to print the plan of the sync instead of running it.
+
+        Args:
+            ctx: Click context.
+            param: Click option.
+            value: Whether to print the plan.
+        """
+        ctx.meta[PLAN_META_KEY] = value
+
+    @cached_property
+    def requests_session(self) -> requests.Session:
+        """HTTP session shared by all streams, pooling connections across threads."""
+        session = requests.Session()
+        workers = self.config.get("max_workers", 1)
+        pool_size = max(workers + self.config.get("max_parallel_streams", 1), 10)
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @cached_property
+    def rate_limiter(self) -> RateLimiter:
+        """Rate limiter shared by all streams, seeded from the account limits."""
+        return RateLimiter(
+            self.config.get("max_requests_per_second", 50),
+            seed=self.seed_rate_limits,
+        )
+
+    def seed_rate_limits(self, limiter: RateLimiter) -> None:
+        """Seed a rate limiter from the platform limits.
+
+        The plan limits of every organization are checked too, with
+        ``check_plan_limits``.
+
+        Args:
+            limiter: The rate limiter.
+        """
+        try:
+            limiter.seed_platform_limits(self._get_json("/v4/user/platform_limits"))
+            if not self.config.get("check_plan_limits"):
+                return
+
+            organizations = self._get_json("/v4/organizations")
+            for organization in organizations.get("organizations", []):
+                guid = organization["guid"]
+                check_plan_limits(guid, self.get_plan_limits(guid))
+        except requests.RequestException as exc:
+            self.logger.warning("Could not read Bitly rate limits: %s", exc)
+
+    @cached_property
+    def plan_limits(self) -> dict[str, list[dict[str, Any]]]:
+        """Plan limits read so far, by organization."""
+        return {}
+
+    def get_plan_limits(self, organization: str) -> list[dict[str, Any]]:
+        """Get the plan limits of an organization, requesting them only once.
+
+        Args:
+            organization: The organization GUID.
+
+        Returns:
+            The monthly quotas of the organization and their usage.
+        """
+        if organization not in self.plan_limits:
+            body = self._get_json(f"/v4/organizations/{organization}/plan_limits")
+            self.plan_limits[organization] = body.get("plan_limits") or []
+        return self.plan_limits[organization]
+
+    @cached_property
+    def page_sizes(self) -> PageSizeController:
+        """Page sizes of paginated endpoints, shared by all streams."""
+        return PageSizeController(
+            initial_size=DEFAULT_PAGE_SIZE,
+            min_size=self.config.get("min_page_size", 10),
+            max_size=self.config.get("max_page_size", 1000),
+            target_seconds=self.config.get("page_target_seconds", 5),
+            max_bytes=MAX_PAGE_BYTES,
+        )
+
+    @cached_property
+    def sharding(self) -> Sharding:
+        """The groups and bitlinks this process syncs."""
+        return Sharding.from_config(self.config)
+
+    @cached_property
+    def telemetry(self) -> Telemetry:
+        """Request and parse telemetry shared by all streams."""
+        return Telemetry()
+
+    @cached_property
+    def response_cache(self) -> ResponseCache | None:
+        """On-disk response cache shared by all streams, if enabled."""
+        if not (cache_dir := self.config.get("cache_dir")):
+            return None
+
+        return ResponseCache(
+            Path(cache_dir),
+            ttl=self.config.get("cache_ttl_seconds", 3600),
+            max_bytes=self.config.get("cache_max_bytes", 64 * 1024 * 1024),
+        )
+
+    @cached_property
+    def digest_stores(self) -> dict[Path, DigestStore]:
+        """Open stores of emitted records, by path."""
+        return {}
+
+    def get_digest_store(self, setting: str) -> DigestStore | None:
+        """Get the store of emitted records at the path of a setting.
+
+        Settings with the same path share a store.
+
+        Args:
+            setting: The name of the setting.
+
+        Returns:
+            The store, or None if the setting is not set.
+        """
+        if not (path := self.config.get(setting)):
+            return None
+
+        path = Path(path).resolve()
+        if path not in self.digest_stores:
+            self.digest_stores[path] = DigestStore(path)
+        return self.digest_stores[path]
+
+    @cached_property
+    def click_digests(self) -> DigestStore | None:
+        """Store of the bitlink clicks emitted, if only changed clicks are emitted."""
+        return self.get_digest_store("click_digests_path")
+
+    @cached_property
+    def record_index(self) -> DigestStore | None:
+        """Store of the records of full scans, if only changed records are emitted."""
+        return self.get_digest_store("record_index_path")
+
+    @cached_property
+    def stream_executor(self) -> ThreadPoolExecutor | None:
+        """Threads requesting the records of top-level streams, if enabled."""
+        max_streams = self.config.get("max_parallel_streams", 1)
+        if max_streams <= 1:
+            return None
+
+        return ThreadPoolExecutor(max_workers=max_streams, thread_name_prefix="stream")
+
+    @cached_property
+    def sync_planner(self) -> SyncPlanner:
+        """Estimates of the sync, from the account counts, state and telemetry."""
+        counts = AccountCounts.read(
+            self._get_json,
+            self.sharding,
+            datetime.now(tz=UTC),
+        )
+        telemetry = None
+        path = self.config.get("telemetry_path")
+        if path and Path(path).is_file():
+            telemetry = json.loads(Path(path).read_text(encoding="utf-8"))
+        return SyncPlanner(self, counts, telemetry)
+
+    def plan_sync(self) -> SyncPlan:
+        """Estimate the cost of syncing the selected streams.
+
+        Returns:
+            The estimates, with the partitions deferred to stay within
+            ``max_requests``.
+        """
+        self._set_compatible_replication_methods()
+        planner = self.sync_planner
+        # Requests of the planner and of the rate limits count against the budget
+        self.rate_limiter.seed()
+        if (budget := self.request_budget) is None:
+            return planner.plan()
+        return planner.plan(budget.max_requests - budget.spent)
+
+    def write_plan(self) -> None:
+        """Write the estimated cost of syncing the selected streams to stdout.
+
+        The plan limits of every organization are written alongside.
+        """
+        plan = self.plan_sync()
+        plan.plan_limits = {
+            organization: self.get_plan_limits(organization)
+            for organization in self.sync_planner.counts.organizations
+        }
+        sys.stdout.write(json.dumps(plan.to_dict(), indent=2) + "\n")
+
+    @cached_property
+    def request_budget(self) -> RequestBudget | None:
+        """Budget of the requests of the sync, if limited."""
+        if (max_requests := self.config.get("max_requests")) is None:
+            return None
+
+        return RequestBudget(max_requests)
+
+    def plan_request_budget(self, budget: RequestBudget) -> None:
+        """Admit the partitions of deferrable streams that fit the request budget.
+
+        If the sync can't be planned, partitions are only deferred once the budget
+        is spent.
+
+        Args:
+            budget: The request budget of the sync.
+        """
+        try:
+            plan = self.plan_sync()
+        except requests.RequestException as exc:
+            self.logger.warning("Could not plan the sync: %s", exc)
+            return
+
+        if plan.admitted is not None:
+            budget.admit(plan.admitted)
+        if deferred := sum(stream.deferred_partitions for stream in plan.streams):
+            self.logger.info(
+                "Deferring %d partitions to stay within %d requests",
+                deferred,
+                budget.max_requests,
+            )
+
+    def prepare_sync(self) -> None:
+        """Plan the sync and start requesting the records of top-level streams.
+
+        Called when the first top-level stream starts syncing, once the sync set
+        the replication methods and reset the progress markers. Streams are still
+        synced one after another from the records they fetched, so messages and
+        state are emitted in the same order as a sequential sync.
+        """
+        if not self._budget_planned and (budget := self.request_budget) is not None:
+            self._budget_planned = True
+            self.plan_request_budget(budget)
+        if self._streams_prefetched or (executor := self.stream_executor) is None:
+            return
+
+        self._streams_prefetched = True
+        # Shared clients are created before worker threads use them
+        _ = self.requests_session, self.rate_limiter, self.response_cache
+        _ = self.telemetry
+        for stream in self.streams.values():
+            if (
+                isinstance(stream, BitlyStream)
+                and stream.parent_stream_type is None
+                and (stream.selected or stream.has_selected_descendents)
+            ):
+                stream.prefetch_records(None, executor)
+
+    @cached_property
+    def state_format(self) -> StateFormat:
+        """Layout of the bookmarks of bitlink metric streams."""
+        return StateFormat(self.config.get("state_format", StateFormat.PARTITIONS))
+
+    @cached_property
+    def compact_states(self) -> list[CompactStateManager]:
+        """State managers of streams with compact bookmarks."""
+        return []
+
+    @cached_property
+    def batch_writer(self) -> BatchWriter | None:
+        """Writer of the batch files of every stream, if BATCH messages are enabled."""
+        if not (batch_config := self.config.get("batch_config")):
+            return None
+
+        return BatchWriter.from_config(
+            batch_config,
+            tap_name=self.name,
+            max_bytes=self.config.get("batch_max_bytes", 128 * 1024 * 1024),
+            max_seconds=self.config.get("batch_max_seconds", 300),
+        )
+
+    def flush_batches(self) -> None:
+        """Announce the open batch files, then write the state they make safe."""
+        if (batch_writer := self.batch_writer) is None or not batch_writer.pending:
+            return
+
+        for message in batch_writer.flush():
+            self.write_message(message)
+        self.pack_state()
+        self.state_writer.write_state(self.state)
+
+    def pack_state(self) -> None:
+        """Write the compact bookmarks of every stream to the tap state."""
+        for manager in self.compact_states:
+            manager.pack()
+
+    @property
+    def last_stream(self) -> Stream | None:
+        """The last top-level stream a sync runs, if any, like the SDK orders them."""
+        streams = [
+            stream
+            for stream in self.streams.values()
+            if stream.parent_stream_type is None
+            and (stream.selected or stream.has_selected_descendents)
+        ]
+        return streams[-1] if streams else None
+
+    def close(self) -> None:
+        """Stop requesting streams, write the telemetry and close the record stores.
+
+        Buffered messages are flushed too.
+
+        Called when the last top-level stream of a sync is finalized, or when a
+        stream fails. Stores are opened again if another stream syncs after.
+        """
+        if (executor := self.__dict__.get("stream_executor")) is not None:
+            executor.shutdown(cancel_futures=True)
+        path = self.config.get("telemetry_path")
+        # Taps that made no requests keep the summary of the last sync, which plans
+        # read
+        if path and self.telemetry.summary():
+            self.telemetry.write_summary(Path(path))
+        for digests in self.digest_stores.values():
+            digests.close()
+        self.digest_stores.clear()
+        for name in ("click_digests", "record_index"):
+            self.__dict__.pop(name, None)
+        if isinstance(self.message_writer, BufferedSingerWriter):
+            self.message_writer.flush()
+
+    @override
+    def load_state(self, state: dict[str, Any]) -> None:
+        super().load_state(state)
+        if self.state_format == StateFormat.PARTITIONS:
+            for stream_state in self.state.get("bookmarks", {}).values():
+                expand_compact_state(stream_state)
+
+    def _get_json(self, path: str) -> dict[str, Any]:
+        api_url: str = self.config.get("api_url", DEFAULT_API_URL)
+        response = self.requests_session.get(
+            f"{api_url.rstrip('/')}{path}",
+            headers={"Authorization": f"Bearer {self.config['token']}"},
+            timeout=60,
+        )
+        if (budget := self.request_budget) is not None:
+            budget.spend()
+        response.raise_for_status()
+        return parse_json(response)  # type: ignore[no-any-return]
+
     @override
     def discover_streams(self) -> list[BitlyStream[Any]]:
-        bitly_streams: list[BitlyStream[Any]] = [
-            streams.Groups(self),
-            streams.Bitlinks(self),
-            streams.BrandedShortDomains(self),
-            streams.Campaigns(self),
-            streams.Channels(self),
-            streams.Organizations(self),
-            streams.DailyBitlinkClicks(self),
-            streams.MonthlyBitlinkClicks(self),
+        stream_types: list[type[BitlyStream[Any]]] = [
+            streams.Groups,
+            streams.Bitlinks,
+            streams.BrandedShortDomains,
+            streams.Campaigns,
+            streams.Channels,
+            streams.Organizations,
+            streams.DailyBitlinkClicks,
+            streams.MonthlyBitlinkClicks,
+            streams.BitlinkCountries,
+            streams.BitlinkCities,
+            streams.BitlinkDevices,
+            streams.BitlinkReferrers,
+            streams.BitlinkReferringDomains,
+            streams.DailyGroupClicks,
+            streams.DailyGroupShortenCounts,
+            streams.GroupCountries,
+            streams.GroupCities,
+            streams.GroupDevices,
+            streams.GroupReferrers,
+            streams.GroupReferringNetworks,
+            streams.QRCodes,
+            streams.DailyQRCodeScans,
+            streams.QRCodeScanCountries,
+            streams.QRCodeScanCities,
+            streams.QRCodeScanDeviceOS,
+            streams.QRCodeScanBrowsers,
         ]
 
         if self.config.get("include_paid_streams"):
-            bitly_streams.append(streams.Webhooks(self))
+            stream_types.append(streams.Webhooks)
+
+        # Only initialize the streams a sync needs, when given a catalog
+        if self.input_catalog is not None:
+            stream_types = _get_required_stream_types(stream_types, self.input_catalog)
+
+        return [stream_type(self) for stream_type in stream_types]
+
+
+def _get_required_stream_types(
+    stream_types: list[type[BitlyStream[Any]]],
+    catalog: Catalog,
+) -> list[type[BitlyStream[Any]]]:
+    """Get the stream types that are selected, or are ancestors of selected ones.
+
+    Streams missing from the catalog are selected by default, like in the SDK.
+
+    Args:
+        stream_types: The available stream types.
+        catalog: The input catalog.
+
+    Returns:
+        The stream types to initialize, in the same order.
+    """
+    required: set[type[Stream]] = set()
+    for stream_type in stream_types:
+        # Every stream class sets its name in its own body
+        entry = catalog.get_stream(stream_type.__dict__["name"])
+        if entry is not None and not entry.metadata.resolve_selection().get((), True):
+            continue
+
+        ancestor: type[Stream] | None = stream_type
+        while ancestor is not None:
+            required.add(ancestor)
+            ancestor = ancestor.parent_stream_type
 
-        return bitly_streams
+    return [stream_type for stream_type in stream_types if stream_type in required]
@@ -0,0 +1,312 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Request and parse telemetry, collected per stream and endpoint."""
+
+from __future__ import annotations
+
+import bisect
+import enum
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, cast
+
+from singer_sdk import metrics
+
+if TYPE_CHECKING:
+    import logging
+    from pathlib import Path
+
+#: Latency percentiles to report.
+PERCENTILES = (50, 90, 99)
+
+#: Upper bounds of the latency histogram buckets, in seconds. Slower requests are
+#: counted in a last, unbounded bucket.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class TelemetryMetric(enum.StrEnum):
+    """Metrics reported in addition to the SDK's own."""
+
+    HTTP_ENDPOINT_SUMMARY = "http_endpoint_summary"
+    STREAM_SUMMARY = "stream_summary"
+
+
+@dataclass
+class LatencyHistogram:
+    """Request latencies, counted in the fixed buckets of ``LATENCY_BUCKETS``."""
+
+    counts: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Count a latency.
+
+        Args:
+            seconds: The latency.
+        """
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """Get a percentile of the latencies, using the nearest-rank method.
+
+        Args:
+            percent: The percentile, between 0 and 100.
+
+        Returns:
+            The upper bound of the bucket of the percentile, at most the maximum
+            latency, or 0 if there are no latencies.
+        """
+        rank = math.ceil(percent / 100 * sum(self.counts))
+        for bound, count in zip((*LATENCY_BUCKETS, math.inf), self.counts, strict=True):
+            rank -= count
+            if count and rank <= 0:
+                return min(bound, self.max)
+        return 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the latencies.
+
+        Returns:
+            The percentiles, the maximum and the counts of non-empty buckets, keyed
+            by their upper bound.
+        """
+        bounds = [f"{bound:g}" for bound in LATENCY_BUCKETS]
+        return {
+            **{f"p{p}": self.percentile(p) for p in PERCENTILES},
+            "max": self.max,
+            "buckets": {
+                bound: count
+                for bound, count in zip((*bounds, "+Inf"), self.counts, strict=True)
+                if count
+            },
+        }
+
+
+@dataclass
+class EndpointStats:
+    """Telemetry of the requests a stream made to an endpoint."""
+
+    requests: int = 0
+    retried: int = 0
+    response_bytes: int = 0
+    parse_seconds: float = 0.0
+    latencies: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the telemetry.
+
+        Returns:
+            A JSON-serializable summary.
+        """
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "response_bytes": self.response_bytes,
+            "parse_seconds": round(self.parse_seconds, 6),
+            "latency_seconds": self.latencies.to_dict(),
+        }
+
+
+@dataclass
+class StreamStats:
+    """Telemetry of a stream."""
+
+    records: int = 0
+    started_at: float | None = None
+    finished_at: float | None = None
+    endpoints: defaultdict[str, EndpointStats] = field(
+        default_factory=lambda: defaultdict(EndpointStats),
+    )
+
+    def touch(self, now: float) -> None:
+        """Extend the time the stream was active for.
+
+        Args:
+            now: A monotonic timestamp.
+        """
+        if self.started_at is None:
+            self.started_at = now
+        self.finished_at = now
+
+    @property
+    def records_per_second(self) -> float:
+        """Records parsed per second, between the first request and last parse."""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+
+        elapsed = self.finished_at - self.started_at
+        return self.records / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summarize the telemetry.
+
+        Returns:
+            A JSON-serializable summary.
+        """
+        return {
+            "records": self.records,
+            "records_per_second": round(self.records_per_second, 3),
+            "endpoints": {
+                endpoint: stats.to_dict() for endpoint, stats in self.endpoints.items()
+            },
+        }
+
+
+class Telemetry:
+    """Thread-safe collector of request and parse telemetry."""
+
+    def __init__(self, *, log_interval: float = metrics.DEFAULT_LOG_INTERVAL) -> None:
+        """Initialize the collector.
+
+        Args:
+            log_interval: Seconds between METRIC messages logged during the sync.
+        """
+        self.log_interval = log_interval
+        self._streams: defaultdict[str, StreamStats] = defaultdict(StreamStats)
+        self._lock = threading.Lock()
+        self._last_logged = time.monotonic()
+
+    def record_request(
+        self,
+        stream: str,
+        endpoint: str,
+        *,
+        seconds: float,
+        response_bytes: int,
+    ) -> None:
+        """Record a request.
+
+        Args:
+            stream: The stream name.
+            endpoint: The endpoint path template.
+            seconds: The time until the response was received.
+            response_bytes: The size of the response body.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stream_stats = self._streams[stream]
+            stream_stats.touch(now - seconds)
+            stats = stream_stats.endpoints[endpoint]
+            stats.requests += 1
+            stats.response_bytes += response_bytes
+            stats.latencies.add(seconds)
+
+    def record_retry(self, stream: str, endpoint: str) -> None:
+        """Record a request that failed with a retriable error.
+
+        Args:
+            stream: The stream name.
+            endpoint: The endpoint path template.
+        """
+        with self._lock:
+            self._streams[stream].endpoints[endpoint].retried += 1
+
+    def record_parse(
+        self,
+        stream: str,
+        endpoint: str,
+        *,
+        seconds: float,
+        records: int,
+    ) -> None:
+        """Record the parsing of a response.
+
+        Args:
+            stream: The stream name.
+            endpoint: The endpoint path template.
+            seconds: The time spent decoding and extracting records.
+            records: The number of records extracted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stream_stats = self._streams[stream]
+            stream_stats.touch(now)
+            stream_stats.records += records
+            stream_stats.endpoints[endpoint].parse_seconds += seconds
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize the telemetry of every stream.
+
+        Returns:
+            A JSON-serializable summary, keyed by stream name.
+        """
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._streams.items()}
+
+    def log_stream(self, logger: logging.Logger, stream: str) -> None:
+        """Log the telemetry of a stream as METRIC messages.
+
+        Args:
+            logger: The metrics logger.
+            stream: The stream name.
+        """
+        with self._lock:
+            if stream not in self._streams:
+                return
+            summary = self._streams[stream].to_dict()
+
+        for endpoint, endpoint_summary in summary.pop("endpoints").items():
+            _log_point(
+                logger,
+                TelemetryMetric.HTTP_ENDPOINT_SUMMARY,
+                endpoint_summary,
+                {metrics.Tag.STREAM: stream, metrics.Tag.ENDPOINT: endpoint},
+            )
+        _log_point(
+            logger,
+            TelemetryMetric.STREAM_SUMMARY,
+            summary,
+            {metrics.Tag.STREAM: stream},
+        )
+
+    def log_due(self, logger: logging.Logger) -> None:
+        """Log the telemetry of every stream, if the log interval has passed.
+
+        Args:
+            logger: The metrics logger.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_logged < self.log_interval:
+                return
+            self._last_logged = now
+            streams = list(self._streams)
+
+        for stream in streams:
+            self.log_stream(logger, stream)
+
+    def write_summary(self, path: Path) -> None:
+        """Write the telemetry of every stream to a JSON file.
+
+        Args:
+            path: The file to write.
+        """
+        content = json.dumps(self.summary(), indent=2) + "\n"
+        path.write_text(content, encoding="utf-8")
+
+
+def _log_point(
+    logger: logging.Logger,
+    metric: TelemetryMetric,
+    value: dict[str, Any],
+    tags: dict[str, Any],
+) -> None:
+    # The SDK only declares its own metrics, but formats any enum
+    point = metrics.Point("summary", cast("metrics.Metric", metric), value, tags)
+    metrics.log(logger, point)
@@ -0,0 +1,676 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local stand-in for the Bitly API, generated from the bundled OpenAPI spec.
+
+Groups, bitlinks and clicks are synthesized at a configurable scale. Every other
+endpoint in the spec answers with a document generated from its response schema.
+Successful responses have an ``ETag`` and honour ``If-None-Match``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import operator
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Self
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from types import TracebackType
+
+OPENAPI_PATH = Path(__file__).parents[1] / "tap_bitly" / "openapi" / "openapi.json"
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S+0000"
+
+#: Time the synthetic data ends at.
+REFERENCE_TIME = datetime(2024, 3, 5, tzinfo=UTC)
+
+#: Organization of every group.
+ORGANIZATION_GUID = "Bo000000000"
+
+# Nesting depth after which generated documents stop recursing into schemas.
+_MAX_DEPTH = 6
+
+type Handler = Callable[[dict[str, str], dict[str, str]], dict[str, Any]]
+
+
+@dataclass
+class MockSettings:
+    """Scale and behaviour of the mock API."""
+
+    #: Number of groups.
+    groups: int = 1
+
+    #: Number of bitlinks in each group.
+    bitlinks_per_group: int = 10
+
+    #: IDs of the archived bitlinks.
+    archived_bitlinks: tuple[str, ...] = ()
+
+    #: Number of QR codes in each group.
+    qr_codes_per_group: int = 2
+
+    #: Number of days of clicks each bitlink has.
+    days: int = 30
+
+    #: Every n-th bitlink never gets clicks. Zero to click every bitlink.
+    inactive_every: int = 3
+
+    #: Seconds to wait before answering each request.
+    latency: float = 0.0
+
+    #: Maximum number of bitlinks in a page.
+    page_size: int = 50
+
+    #: Answer every n-th request with ``429 Too Many Requests``. Zero to disable.
+    throttle_every: int = 0
+
+    #: Value of the ``Retry-After`` header of throttled responses.
+    retry_after: float = 0.0
+
+    #: Answer requests for this page of bitlinks with ``403 Forbidden``, to
+    #: interrupt a sync. Zero to disable.
+    fail_bitlinks_page: int = 0
+
+
+class MockAPIError(Exception):
+    """Error response of the mock API."""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        """Initialize the error.
+
+        Args:
+            status: The response status.
+            message: The error message.
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MockBitlyAPI:
+    """HTTP server answering Bitly API requests with synthetic data.
+
+    Use it as a context manager, and point the tap's ``api_url`` at :attr:`url`.
+    """
+
+    def __init__(self, settings: MockSettings | None = None) -> None:
+        """Initialize the mock API.
+
+        Args:
+            settings: The scale and behaviour of the mock API.
+        """
+        self.settings = settings or MockSettings()
+        self.spec = json.loads(OPENAPI_PATH.read_text(encoding="utf-8"))
+
+        #: Number of requests answered, per endpoint path template.
+        self.requests: Counter[str] = Counter()
+
+        #: Number of requests answered with ``429 Too Many Requests``.
+        self.throttled = 0
+
+        #: Number of requests answered with ``304 Not Modified``.
+        self.not_modified = 0
+
+        #: Pagination cursors of older generations are rejected as expired.
+        self.cursor_generation = 0
+
+        #: Page sizes requested from the bitlinks endpoint, in order.
+        self.page_sizes: list[int] = []
+
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._routes = self._compile_routes()
+        self._handlers: dict[str, Handler] = {
+            "/v4/groups": self._groups,
+            "/v4/groups/{group_guid}/bitlinks": self._bitlinks,
+            "/v4/groups/{group_guid}/bitlinks/{sort}": self._sorted_bitlinks,
+            "/v4/groups/{group_guid}/clicks": self._group_clicks,
+            "/v4/groups/{group_guid}/shorten_counts": self._group_shorten_counts,
+            "/v4/organizations": self._organizations,
+            "/v4/organizations/{organization_guid}/shorten_counts": (
+                self._organization_shorten_counts
+            ),
+            "/v4/bitlinks/{bitlink}/clicks": self._bitlink_clicks,
+            "/v4/groups/{group_guid}/qr-codes": self._qr_codes,
+            "/v4/qr-codes/{qrcode_id}/scans": self._qr_code_scans,
+        }
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the mock API."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def total_requests(self) -> int:
+        """Number of requests answered."""
+        return sum(self.requests.values())
+
+    def __enter__(self) -> Self:
+        """Start serving requests.
+
+        Returns:
+            The mock API.
+        """
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop serving requests."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def group_guids(self) -> list[str]:
+        """Get the GUIDs of the synthetic groups.
+
+        Returns:
+            The group GUIDs.
+        """
+        return [f"Bg{index:09d}" for index in range(self.settings.groups)]
+
+    def bitlink_ids(self, group_guid: str) -> list[str]:
+        """Get the IDs of a group's bitlinks, newest first.
+
+        Args:
+            group_guid: The group GUID.
+
+        Returns:
+            The bitlink IDs.
+        """
+        group = int(group_guid[2:])
+        return [
+            f"bit.ly/g{group}l{index}"
+            for index in range(self.settings.bitlinks_per_group)
+        ]
+
+    def daily_clicks(self, bitlink: str) -> dict[datetime, int]:
+        """Get the synthetic daily clicks of a bitlink.
+
+        Args:
+            bitlink: The bitlink ID.
+
+        Returns:
+            A mapping of days to clicks, for every day with data.
+        """
+        index = int(bitlink.rsplit("l", 1)[1])
+        every = self.settings.inactive_every
+        inactive = every > 0 and index % every == every - 1
+        return {
+            REFERENCE_TIME - timedelta(days=day): 0 if inactive else (index + day) % 7
+            for day in range(self.settings.days)
+        }
+
+    def qr_code_ids(self, group_guid: str) -> list[str]:
+        """Get the IDs of a group's QR codes, newest first.
+
+        Args:
+            group_guid: The group GUID.
+
+        Returns:
+            The QR code IDs.
+        """
+        group = int(group_guid[2:])
+        return [
+            f"q{group}c{index}" for index in range(self.settings.qr_codes_per_group)
+        ]
+
+    def daily_scans(self, qrcode_id: str) -> dict[datetime, int]:
+        """Get the synthetic daily scans of a QR code.
+
+        Args:
+            qrcode_id: The QR code ID.
+
+        Returns:
+            A mapping of days to scans, for every day with data.
+        """
+        index = int(qrcode_id.rsplit("c", 1)[1])
+        return {
+            REFERENCE_TIME - timedelta(days=day): (index + day) % 5
+            for day in range(self.settings.days)
+        }
+
+    def _compile_routes(self) -> list[tuple[re.Pattern[str], str]]:
+        base = urlparse(self.spec["servers"][0]["url"]).path
+        routes = []
+        for path, item in self.spec["paths"].items():
+            if "get" not in item:
+                continue
+            template = f"{base}{path}"
+            pattern = re.sub(r"\\{(\w+)\\}", r"(?P<\1>[^/]+)", re.escape(template))
+            routes.append((re.compile(f"{pattern}$"), template))
+
+        # Prefer literal path segments over parameters
+        return sorted(routes, key=lambda route: route[1].count("{"))
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        api = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                api._handle(self)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+                pass
+
+        return RequestHandler
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        url = urlparse(request.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = self._match_route(url.path)
+        if route is None:
+            self._send(request, HTTPStatus.NOT_FOUND, {"message": "NOT_FOUND"})
+            return
+
+        template, params = route
+
+        if self.settings.latency:
+            time.sleep(self.settings.latency)
+
+        with self._lock:
+            self.requests[template] += 1
+            every = self.settings.throttle_every
+            throttle = every > 0 and self.total_requests % every == 0
+            if throttle:
+                self.throttled += 1
+
+        if throttle:
+            headers = {"Retry-After": str(self.settings.retry_after)}
+            body = {"message": "RATE_LIMIT_EXCEEDED"}
+            self._send(request, HTTPStatus.TOO_MANY_REQUESTS, body, headers)
+            return
+
+        if handler := self._handlers.get(template):
+            try:
+                body = handler(params, query)
+            except MockAPIError as exc:
+                self._send(request, exc.status, {"message": exc.message})
+                return
+        else:
+            body = self._generate(self._response_schema(template))
+        self._send(request, HTTPStatus.OK, body)
+
+    def _match_route(self, path: str) -> tuple[str, dict[str, str]] | None:
+        for pattern, template in self._routes:
+            if match := pattern.match(path):
+                params = match.groupdict().items()
+                return template, {key: unquote(value) for key, value in params}
+        return None
+
+    def _send(
+        self,
+        request: BaseHTTPRequestHandler,
+        status: HTTPStatus,
+        body: Any,  # noqa: ANN401
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        content = json.dumps(body).encode()
+        if status == HTTPStatus.OK:
+            etag = f'"{hashlib.sha256(content).hexdigest()}"'
+            headers = {**(headers or {}), "ETag": etag}
+            if request.headers.get("If-None-Match") == etag:
+                status, content = HTTPStatus.NOT_MODIFIED, b""
+                with self._lock:
+                    self.not_modified += 1
+
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(content)
+        with self._lock:
+            self.bytes_sent += len(content)
+
+    def _resolve(self, schema: dict[str, Any]) -> dict[str, Any]:
+        while "$ref" in schema:
+            node: Any = self.spec
+            for key in schema["$ref"].removeprefix("#/").split("/"):
+                node = node[key]
+            schema = node
+        return schema
+
+    def _response_schema(self, template: str) -> dict[str, Any]:
+        base = urlparse(self.spec["servers"][0]["url"]).path
+        operation = self.spec["paths"][template.removeprefix(base)]["get"]
+        response = self._resolve(operation["responses"]["200"])
+        content = response.get("content", {}).get("application/json", {})
+        return self._resolve(content.get("schema", {}))
+
+    def _generate(self, schema: dict[str, Any], depth: int = 0) -> Any:  # noqa: ANN401
+        schema = self._resolve(schema)
+        if depth > _MAX_DEPTH:
+            return None
+        if "allOf" in schema:
+            document: dict[str, Any] = {}
+            for part in schema["allOf"]:
+                document.update(self._generate(part, depth + 1) or {})
+            return document
+        if "example" in schema or "enum" in schema:
+            return schema.get("example", schema.get("enum", [None])[0])
+
+        match schema.get("type", "object"):
+            case "object":
+                return {
+                    name: self._generate(prop, depth + 1)
+                    for name, prop in schema.get("properties", {}).items()
+                }
+            case "array":
+                return [self._generate(schema.get("items", {}), depth + 1)]
+            case schema_type:
+                return _generate_scalar(schema_type, schema.get("format"))
+
+    def _groups(self, _: dict[str, str], __: dict[str, str]) -> dict[str, Any]:
+        return {
+            "groups": [
+                {
+                    "guid": guid,
+                    "name": f"Group {guid}",
+                    "organization_guid": ORGANIZATION_GUID,
+                    "created": REFERENCE_TIME.strftime(DATE_FORMAT),
+                    "modified": REFERENCE_TIME.strftime(DATE_FORMAT),
+                    "is_active": True,
+                    "role": "org-admin",
+                    "bsds": [],
+                    "references": {"organization": ORGANIZATION_GUID},
+                }
+                for guid in self.group_guids()
+            ],
+        }
+
+    @staticmethod
+    def _organizations(_: dict[str, str], __: dict[str, str]) -> dict[str, Any]:
+        return {
+            "organizations": [
+                {
+                    "guid": ORGANIZATION_GUID,
+                    "name": f"Organization {ORGANIZATION_GUID}",
+                    "is_active": True,
+                    "tier": "enterprise",
+                    "tier_family": "enterprise",
+                    "tier_display_name": "Enterprise",
+                    "role": "org-admin",
+                    "created": REFERENCE_TIME.strftime(DATE_FORMAT),
+                    "modified": REFERENCE_TIME.strftime(DATE_FORMAT),
+                    "bsds": [],
+                    "references": {},
+                },
+            ],
+        }
+
+    def _bitlinks(
+        self, params: dict[str, str], query: dict[str, str]
+    ) -> dict[str, Any]:
+        group_guid = params["group_guid"]
+        self.page_sizes.append(int(query.get("size", 50)))
+        size = min(self.page_sizes[-1], self.settings.page_size)
+        start = 0
+        if search_after := query.get("search_after"):
+            generation, _, offset = search_after.partition(".")
+            if int(generation) != self.cursor_generation:
+                raise MockAPIError(HTTPStatus.BAD_REQUEST, "INVALID_ARG_SEARCH_AFTER")
+            start = int(offset)
+        page = start // size + 1
+        if page == self.settings.fail_bitlinks_page:
+            raise MockAPIError(HTTPStatus.FORBIDDEN, "FORBIDDEN")
+        created_after = int(query.get("created_after", 0))
+
+        links = []
+        for index, bitlink in enumerate(self.bitlink_ids(group_guid)):
+            created_at = REFERENCE_TIME - timedelta(hours=index)
+            if created_at.timestamp() < created_after:
+                break
+            tags = ["even" if index % 2 == 0 else "odd"]
+            if "tags" in query and query["tags"] not in tags:
+                continue
+            links.append({
+                "id": bitlink,
+                "link": f"https://{bitlink}",
+                "long_url": f"https://example.com/{index}",
+                "title": f"Bitlink {index}",
+                "archived": bitlink in self.settings.archived_bitlinks,
+                "created_at": created_at.strftime(DATE_FORMAT),
+                "created_by": "user",
+                "client_id": "client",
+                "custom_bitlinks": [],
+                "tags": tags,
+                "deeplinks": [],
+                "references": {"group": group_guid},
+            })
+
+        next_url = ""
+        if start + size < len(links):
+            search_after = f"{self.cursor_generation}.{start + size}"
+            next_query = urlencode({**query, "search_after": search_after})
+            next_url = f"{self.url}/v4/groups/{group_guid}/bitlinks?{next_query}"
+        return {
+            "links": links[start : start + size],
+            "pagination": {
+                "prev": "",
+                "next": next_url,
+                "size": size,
+                "page": page,
+                "total": len(links),
+            },
+        }
+
+    def _qr_codes(
+        self, params: dict[str, str], query: dict[str, str]
+    ) -> dict[str, Any]:
+        group_guid = params["group_guid"]
+        created_after = int(query.get("created_after", 0))
+        qr_codes = []
+        for index, qrcode_id in enumerate(self.qr_code_ids(group_guid)):
+            created = REFERENCE_TIME - timedelta(hours=index)
+            if created.timestamp() < created_after:
+                break
+            qr_codes.append({
+                "qrcode_id": qrcode_id,
+                "group_guid": group_guid,
+                "title": f"QR code {index}",
+                "qr_code_type": "long_url",
+                "long_urls": [f"https://example.com/qr/{index}"],
+                "archived": False,
+                "created": created.strftime(DATE_FORMAT),
+                "modified": created.strftime(DATE_FORMAT),
+            })
+        return {"qr_codes": qr_codes, "pagination": {"next": "", "size": 50}}
+
+    def _qr_code_scans(
+        self, params: dict[str, str], query: dict[str, str]
+    ) -> dict[str, Any]:
+        totals = _get_unit_totals([self.daily_scans(params["qrcode_id"])], query)
+        return {
+            "scans": [
+                {"date": day.strftime(DATE_FORMAT), "scans": scans}
+                for day, scans in totals
+            ],
+            "units": int(query.get("units", -1)),
+            "unit": query.get("unit", "day"),
+            "unit_reference": query.get("unit_reference"),
+        }
+
+    def _clicks_in_window(self, bitlink: str, query: dict[str, str]) -> int:
+        start, end = _get_window(query)
+        return sum(
+            clicks
+            for day, clicks in self.daily_clicks(bitlink).items()
+            if start <= day <= end
+        )
+
+    def _bitlink_clicks(
+        self,
+        params: dict[str, str],
+        query: dict[str, str],
+    ) -> dict[str, Any]:
+        totals = _get_unit_totals([self.daily_clicks(params["bitlink"])], query)
+        return {
+            "link_clicks": [
+                {"date": day.strftime(DATE_FORMAT), "clicks": clicks}
+                for day, clicks in totals
+            ],
+            "units": int(query.get("units", -1)),
+            "unit": query.get("unit", "day"),
+            "unit_reference": query.get("unit_reference"),
+        }
+
+    def _group_clicks(
+        self, params: dict[str, str], query: dict[str, str]
+    ) -> dict[str, Any]:
+        bitlinks = self.bitlink_ids(params["group_guid"])
+        totals = _get_unit_totals(map(self.daily_clicks, bitlinks), query)
+        return {
+            "unit": query.get("unit", "day"),
+            "units": int(query.get("units", -1)),
+            "unit_reference": query.get("unit_reference"),
+            "data": [
+                {"ts": day.strftime(DATE_FORMAT), "count": clicks}
+                for day, clicks in totals
+            ],
+        }
+
+    def _group_shorten_counts(
+        self, params: dict[str, str], query: dict[str, str]
+    ) -> dict[str, Any]:
+        start, end = _get_window(query)
+        # Bitlinks are created one per day, going back from the reference time
+        bitlinks = len(self.bitlink_ids(params["group_guid"]))
+        created = Counter(
+            REFERENCE_TIME - timedelta(days=index % self.settings.days)
+            for index in range(bitlinks)
+        )
+        return {
+            "unit": query.get("unit", "day"),
+            "units": int(query.get("units", -1)),
+            "unit_reference": query.get("unit_reference"),
+            "facet": "shorten_counts",
+            "metrics": [
+                {"key": day.strftime(DATE_FORMAT), "value": count}
+                for day, count in sorted(created.items(), reverse=True)
+                if start <= day <= end
+            ],
+        }
+
+    def _organization_shorten_counts(
+        self, _: dict[str, str], query: dict[str, str]
+    ) -> dict[str, Any]:
+        start, end = _get_window(query)
+        # Every group belongs to the same organization, and bitlinks are created
+        # an hour apart, like the bitlinks endpoint lists them
+        created: Counter[datetime] = Counter()
+        for group_guid in self.group_guids():
+            for index in range(len(self.bitlink_ids(group_guid))):
+                created_at = REFERENCE_TIME - timedelta(hours=index)
+                created[created_at.replace(hour=0)] += 1
+        return {
+            "unit": query.get("unit", "day"),
+            "units": int(query.get("units", -1)),
+            "unit_reference": query.get("unit_reference"),
+            "facet": "shorten_counts",
+            "metrics": [
+                {"key": day.strftime(DATE_FORMAT), "value": count}
+                for day, count in sorted(created.items(), reverse=True)
+                if start <= day <= end
+            ],
+        }
+
+    def _sorted_bitlinks(
+        self, params: dict[str, str], query: dict[str, str]
+    ) -> dict[str, Any]:
+        clicks = {
+            bitlink: self._clicks_in_window(bitlink, query)
+            for bitlink in self.bitlink_ids(params["group_guid"])
+        }
+        top = sorted(clicks.items(), key=operator.itemgetter(1), reverse=True)
+        top = [item for item in top if item[1] > 0][: int(query.get("size", 50))]
+        return {
+            "links": [],
+            "sorted_links": [
+                {"id": bitlink, "clicks": count} for bitlink, count in top
+            ],
+        }
+
+
+def _get_window(query: dict[str, str]) -> tuple[datetime, datetime]:
+    end = datetime.strptime(
+        query.get("unit_reference", REFERENCE_TIME.strftime(DATE_FORMAT)),
+        DATE_FORMAT,
+    ).replace(hour=0, minute=0, second=0, tzinfo=UTC)
+    units = int(query.get("units", -1))
+    if units < 0:
+        return datetime.min.replace(tzinfo=UTC), end
+    if query.get("unit") == "month":
+        months = end.year * 12 + end.month - units
+        return datetime(months // 12, months % 12 + 1, 1, tzinfo=UTC), end
+    return end - timedelta(days=units - 1), end
+
+
+def _get_unit_totals(
+    series: Iterable[dict[datetime, int]],
+    query: dict[str, str],
+) -> list[tuple[datetime, int]]:
+    start, end = _get_window(query)
+    monthly = query.get("unit") == "month"
+
+    # Like the API, every unit in a bounded window is listed, even without clicks
+    totals: Counter[datetime] = Counter()
+    if int(query.get("units", -1)) >= 0:
+        totals.update(dict.fromkeys(_iter_units(start, end, monthly=monthly), 0))
+
+    for daily in series:
+        for day, count in daily.items():
+            if start <= day <= end:
+                totals[day.replace(day=1) if monthly else day] += count
+
+    return sorted(totals.items(), reverse=True)
+
+
+def _iter_units(start: datetime, end: datetime, *, monthly: bool) -> Iterator[datetime]:
+    unit_start = start.replace(day=1) if monthly else start
+    while unit_start <= end:
+        yield unit_start
+        if monthly:
+            months = unit_start.year * 12 + unit_start.month
+            unit_start = unit_start.replace(year=months // 12, month=months % 12 + 1)
+        else:
+            unit_start += timedelta(days=1)
+
+
+def _generate_scalar(schema_type: str, schema_format: str | None) -> Any:  # noqa: ANN401
+    if schema_type in {"integer", "number"}:
+        return 0
+    if schema_type == "boolean":
+        return False
+    if schema_format == "date-time":
+        return REFERENCE_TIME.strftime(DATE_FORMAT)
+    return "string"
@@ -0,0 +1,149 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Response cache tests."""
+
+from __future__ import annotations
+
+import itertools
+import json
+from typing import TYPE_CHECKING
+
+import requests
+
+from tap_bitly.cache import ENTRY_SUFFIX, ResponseCache
+from tap_bitly.tap import TapBitly
+from tests.mock_api import MockBitlyAPI, MockSettings
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+def _response(request: requests.PreparedRequest, content: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.url = request.url or ""
+    response._content = content
+    return response
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    """Evict the least recently used entries when the cache is full."""
+    clock = itertools.count(1_700_000_000)
+    cache = ResponseCache(
+        tmp_path,
+        ttl=60,
+        max_bytes=1500,
+        clock=lambda: next(clock),
+    )
+    requests_ = [
+        requests.Request("GET", f"https://example.com/{name}").prepare()
+        for name in ("a", "b", "c")
+    ]
+
+    for request in requests_:
+        cache.update(request, _response(request, b"x" * 400), None)
+        assert cache.get(requests_[0]) is not None
+
+    assert len(list(tmp_path.glob(f"*{ENTRY_SUFFIX}"))) == len(requests_)
+
+    request = requests.Request("GET", "https://example.com/d").prepare()
+    cache.update(request, _response(request, b"y" * 400), None)
+    assert [cache.get(request) is not None for request in requests_] == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_cache_scanned_only_when_full(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Track the size of the cache, scanning it at startup and when it is full."""
+    requests_ = [
+        requests.Request("GET", f"https://example.com/{name}").prepare()
+        for name in ("a", "b", "c", "d")
+    ]
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=5000)
+    for request in requests_:
+        cache.update(request, _response(request, b"x" * 400), None)
+
+    # Entries left by earlier syncs are evicted at startup
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=1500)
+    assert len(list(tmp_path.glob(f"*{ENTRY_SUFFIX}"))) == len(requests_) - 1
+
+    scans = 0
+    evict = cache._evict
+
+    def count_scans() -> None:
+        nonlocal scans
+        scans += 1
+        evict()
+
+    monkeypatch.setattr(cache, "_evict", count_scans)
+    cache.update(requests_[1], _response(requests_[1], b"x" * 300), None)
+    assert scans == 0
+
+    cache.update(requests_[0], _response(requests_[0], b"x" * 400), None)
+    assert scans == 1
+    assert len(list(tmp_path.glob(f"*{ENTRY_SUFFIX}"))) == len(requests_) - 1
+
+
+def test_entries_keyed_on_credentials(tmp_path: Path) -> None:
+    """Share entries between text and bytes headers, but not between accounts."""
+    cache = ResponseCache(tmp_path, ttl=60, max_bytes=1500)
+    request = requests.Request(
+        "GET",
+        "https://example.com/a",
+        headers={"Authorization": "Bearer a"},
+    ).prepare()
+    cache.update(request, _response(request, b"x"), None)
+
+    request.headers["Authorization"] = b"Bearer a"
+    assert cache.get(request) is not None
+    request.headers["Authorization"] = "Bearer b"
+    assert cache.get(request) is None
+
+
+def _sync_groups(
+    capsys: pytest.CaptureFixture[str],
+    api: MockBitlyAPI,
+    **config: object,
+) -> list[dict[str, object]]:
+    tap = TapBitly(config={"token": "test", "api_url": api.url, **config})
+    for stream in tap.streams.values():
+        stream.selected = stream.name == "groups"
+
+    capsys.readouterr()
+    tap.sync_all()
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return [message["record"] for message in messages if message["type"] == "RECORD"]
+
+
+def test_cache_reference_streams(
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: Path,
+) -> None:
+    """Serve fresh responses from the cache and revalidate stale ones."""
+    with MockBitlyAPI(MockSettings(groups=3)) as api:
+        records = _sync_groups(capsys, api, cache_dir=str(tmp_path))
+        assert _sync_groups(capsys, api, cache_dir=str(tmp_path)) == records
+        assert api.requests["/v4/groups"] == 1
+
+        stale = _sync_groups(capsys, api, cache_dir=str(tmp_path), cache_ttl_seconds=0)
+        assert stale == records
+        assert api.requests["/v4/groups"] == len(["first", "revalidation"])
+        assert api.not_modified == 1
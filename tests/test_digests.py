@@ -0,0 +1,166 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Row digest store tests."""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import TYPE_CHECKING
+
+import pytest
+from singer_sdk.exceptions import FatalAPIError
+
+from tap_bitly.digests import ChangeTracker, DigestStore, get_digest
+from tap_bitly.tap import TapBitly
+from tests.mock_api import MockBitlyAPI, MockSettings
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+STREAM = "daily_bitlink_clicks"
+DAY = "2024-03-05T00:00:00+0000"
+KEYS = ("date", "bitlink")
+
+
+def _changed(store: DigestStore, clicks: int, date: str = DAY) -> bool:
+    record = {"date": date, "bitlink": "bit.ly/a", "clicks": clicks}
+    return store.changed(STREAM, "bit.ly/a", date, get_digest(record, KEYS))
+
+
+def _scan(store: DigestStore, keys: list[str]) -> list[str]:
+    for key in keys:
+        store.changed("groups", "[]", key, 0)
+    deleted = store.delete_unseen("groups", "[]")
+    store.commit()
+    store.close()
+    return deleted
+
+
+def test_digests_need_confirmed_state(tmp_path: Path) -> None:
+    """Only skip rows loaded by a sync whose state was used."""
+    path = tmp_path / "digests.db"
+
+    first = DigestStore(path)
+    first.start(STREAM, None)
+    assert _changed(first, 3)
+    first.commit()
+    first.close()
+
+    # The state of the first sync was not used, e.g. the target failed
+    second = DigestStore(path)
+    second.start(STREAM, "unknown")
+    assert _changed(second, 3)
+    second.commit()
+    second.close()
+
+    third = DigestStore(path)
+    third.start(STREAM, second.run_id)
+    assert not _changed(third, 3)
+    assert _changed(third, 4)
+    third.close()
+
+    # Reset state
+    fourth = DigestStore(path)
+    fourth.start(STREAM, second.run_id)
+    assert not _changed(fourth, 3)
+    fourth.start(STREAM, None)
+    assert _changed(fourth, 3)
+    fourth.close()
+
+
+def test_digests_of_expired_days_are_dropped(tmp_path: Path) -> None:
+    """Drop the digests of days before the next lookback window."""
+    path = tmp_path / "digests.db"
+    store = DigestStore(path)
+    store.start(STREAM, None)
+    assert _changed(store, 1, "2024-03-04T00:00:00+0000")
+    assert _changed(store, 1)
+    store.prune(STREAM, DAY)
+    store.commit()
+    store.close()
+
+    next_store = DigestStore(path)
+    next_store.start(STREAM, store.run_id)
+    assert _changed(next_store, 1, "2024-03-04T00:00:00+0000")
+    assert not _changed(next_store, 1)
+    next_store.close()
+
+
+def test_records_missing_from_scans_are_deleted(tmp_path: Path) -> None:
+    """Delete records missing from a scan once the target loaded the tombstones."""
+    path = tmp_path / "digests.db"
+    stores = [DigestStore(path) for _ in range(4)]
+    stores[0].start("groups", None)
+    assert not _scan(stores[0], ["a", "b"])
+
+    stores[1].start("groups", stores[0].run_id)
+    assert _scan(stores[1], ["a"]) == ["b"]
+
+    # The tombstone was not loaded
+    stores[2].start("groups", stores[0].run_id)
+    assert _scan(stores[2], ["a"]) == ["b"]
+
+    stores[3].start("groups", stores[2].run_id)
+    assert not _scan(stores[3], ["a"])
+
+
+def test_tracker_finds_deleted_records_of_scanned_partitions(tmp_path: Path) -> None:
+    """Only records missing from fully scanned partitions are deleted."""
+    path = tmp_path / "digests.db"
+    bitlinks = [
+        {"group_guid": group, "id": bitlink}
+        for group, bitlink in (("g1", "a"), ("g1", "b"), ("g2", "c"))
+    ]
+    runs: list[str | None] = [None]
+    for synced in (bitlinks, bitlinks[:1]):
+        store = DigestStore(path)
+        tracker = ChangeTracker(
+            store,
+            "bitlinks",
+            runs[-1],
+            primary_keys=("id",),
+            partition_keys=("group_guid",),
+        )
+        changed = [tracker.is_changed(record) for record in synced]
+        tracker.add_scan({"group_guid": "g1"})
+        deleted = tracker.finish()
+        store.commit()
+        store.close()
+        runs.append(store.run_id)
+
+    # The second sync did not scan the second group
+    assert changed == [False]
+    assert deleted == [{"group_guid": "g1", "id": "b"}]
+
+
+def test_stores_closed_when_sync_fails(tmp_path: Path) -> None:
+    """Close the stores of a sync that failed, without committing its digests."""
+    settings = MockSettings(bitlinks_per_group=4, page_size=2, fail_bitlinks_page=2)
+    with MockBitlyAPI(settings) as api:
+        tap = TapBitly(
+            config={
+                "token": "test",
+                "api_url": api.url,
+                "record_index_path": str(tmp_path / "index.db"),
+            },
+        )
+        for stream in tap.streams.values():
+            stream.selected = stream.name in {"groups", "bitlinks"}
+        record_index = tap.record_index
+        with pytest.raises(FatalAPIError):
+            tap.sync_all()
+
+    assert record_index is not None
+    with pytest.raises(sqlite3.ProgrammingError):
+        record_index.commit()
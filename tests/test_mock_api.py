@@ -0,0 +1,693 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Sync tests against the local Bitly API stand-in."""
+
+from __future__ import annotations
+
+import copy
+import gzip
+import json
+import threading
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+import pytest
+from click.testing import CliRunner
+from singer_sdk import Stream
+from singer_sdk.exceptions import FatalAPIError
+from singer_sdk.io_base import SingerWriter
+
+from tap_bitly.client import BitlyStream
+from tap_bitly.streams import Bitlinks, MonthlyBitlinkClicks
+from tap_bitly.tap import TapBitly
+from tests.mock_api import REFERENCE_TIME, MockBitlyAPI, MockSettings
+
+CLICK_STREAMS = ("groups", "bitlinks", "daily_bitlink_clicks")
+
+
+def _run(
+    capsys: pytest.CaptureFixture[str],
+    api: MockBitlyAPI,
+    streams: tuple[str, ...],
+    state: dict[str, Any] | None = None,
+    **config: object,
+) -> list[dict[str, Any]]:
+    tap = TapBitly(
+        config={"token": "test", "api_url": api.url, **config},
+        state=copy.deepcopy(state or {}),
+    )
+    for stream in tap.streams.values():
+        stream.selected = stream.name in streams
+
+    capsys.readouterr()
+    tap.sync_all()
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def _sync(
+    capsys: pytest.CaptureFixture[str],
+    api: MockBitlyAPI,
+    streams: tuple[str, ...],
+    state: dict[str, Any] | None = None,
+    **config: object,
+) -> tuple[list[tuple[str, dict[str, Any]]], dict[str, Any]]:
+    return _parse_messages(_run(capsys, api, streams, state, **config))
+
+
+def _read_messages(
+    capsys: pytest.CaptureFixture[str],
+) -> tuple[list[tuple[str, dict[str, Any]]], dict[str, Any]]:
+    lines = capsys.readouterr().out.splitlines()
+    return _parse_messages([json.loads(line) for line in lines])
+
+
+def _parse_messages(
+    messages: list[dict[str, Any]],
+) -> tuple[list[tuple[str, dict[str, Any]]], dict[str, Any]]:
+    records = [
+        (message["stream"], message["record"])
+        for message in messages
+        if message["type"] == "RECORD"
+    ]
+    states = [message["value"] for message in messages if message["type"] == "STATE"]
+    return records, states[-1]
+
+
+def test_sync_bitlinks_and_clicks(capsys: pytest.CaptureFixture[str]) -> None:
+    """Sync every page of bitlinks and the clicks of every bitlink."""
+    settings = MockSettings(groups=2, bitlinks_per_group=7, days=5, page_size=3)
+    with MockBitlyAPI(settings) as api:
+        records, _ = _sync(capsys, api, CLICK_STREAMS)
+
+    assert Counter(stream for stream, _ in records) == {
+        "groups": 2,
+        "bitlinks": 14,
+        "daily_bitlink_clicks": 70,
+    }
+    assert api.requests == Counter({
+        "/v4/groups": 1,
+        "/v4/groups/{group_guid}/bitlinks": 6,
+        "/v4/bitlinks/{bitlink}/clicks": 14,
+        "/v4/user/platform_limits": 1,
+    })
+
+
+def test_check_plan_limits(capsys: pytest.CaptureFixture[str]) -> None:
+    """Only request the plan limits of every organization when asked to."""
+    with MockBitlyAPI(MockSettings(bitlinks_per_group=2, days=1)) as api:
+        _sync(capsys, api, CLICK_STREAMS, check_plan_limits=True)
+
+    assert api.requests["/v4/user/platform_limits"] == 1
+    assert api.requests["/v4/organizations"] == 1
+    assert api.requests["/v4/organizations/{organization_guid}/plan_limits"] == 1
+
+
+def test_bitlinks_stay_incremental_with_clicks(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Emit only new bitlinks, while syncing the clicks of every bitlink."""
+    tap = TapBitly(config={"token": "test"})
+    tap._set_compatible_replication_methods()
+    bitlinks = tap.streams["bitlinks"]
+    assert tap.streams["daily_bitlink_clicks"].selected
+    assert (bitlinks.replication_method, bitlinks.replication_key) == (
+        "INCREMENTAL",
+        "created_at",
+    )
+
+    settings = MockSettings(bitlinks_per_group=4, days=2)
+    with MockBitlyAPI(settings) as api:
+        _, state = _sync(capsys, api, CLICK_STREAMS)
+        api.requests.clear()
+        records, _ = _sync(capsys, api, CLICK_STREAMS, state)
+
+    # Only the newest bitlink was created at or after the bookmark
+    assert [record["id"] for stream, record in records if stream == "bitlinks"] == [
+        "bit.ly/g0l0"
+    ]
+    assert api.requests["/v4/bitlinks/{bitlink}/clicks"] == settings.bitlinks_per_group
+
+
+def test_throttled_requests_are_retried(capsys: pytest.CaptureFixture[str]) -> None:
+    """Retry requests answered with ``429 Too Many Requests``."""
+    settings = MockSettings(bitlinks_per_group=5, days=3, throttle_every=4)
+    with MockBitlyAPI(settings) as api:
+        records, _ = _sync(capsys, api, CLICK_STREAMS, max_workers=2)
+
+    assert api.throttled > 0
+    assert len(records) == 1 + 5 + 5 * 3
+
+
+def test_derived_monthly_clicks_state_written_on_main_thread(
+    capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Write the state of the derived monthly stream from the main thread only."""
+    threads: list[str] = []
+    write = MonthlyBitlinkClicks._write_starting_replication_value
+
+    def spy(stream: MonthlyBitlinkClicks, context: dict[str, Any] | None) -> None:
+        threads.append(threading.current_thread().name)
+        write(stream, context)
+
+    monkeypatch.setattr(MonthlyBitlinkClicks, "_write_starting_replication_value", spy)
+    streams = (*CLICK_STREAMS, "monthly_bitlink_clicks")
+    start_date = datetime.now(tz=UTC) - timedelta(days=2)
+    with MockBitlyAPI(MockSettings(bitlinks_per_group=5, days=3)) as api:
+        records, _ = _sync(
+            capsys,
+            api,
+            streams,
+            start_date=start_date.isoformat(),
+            max_workers=4,
+            derive_monthly_clicks=True,
+        )
+
+    assert "monthly_bitlink_clicks" in {stream for stream, _ in records}
+    assert set(threads) == {threading.main_thread().name}
+
+
+def test_skip_inactive_bitlinks(capsys: pytest.CaptureFixture[str]) -> None:
+    """Skipping inactive bitlinks syncs the same records with fewer requests."""
+    settings = MockSettings(bitlinks_per_group=9, days=3)
+    with MockBitlyAPI(settings) as api:
+        _, state = _sync(capsys, api, CLICK_STREAMS)
+
+        before = api.total_requests
+        records, _ = _sync(capsys, api, CLICK_STREAMS, state)
+        requests = api.total_requests - before
+
+        before = api.total_requests
+        skipped, _ = _sync(
+            capsys,
+            api,
+            CLICK_STREAMS,
+            state,
+            skip_inactive_bitlinks=True,
+        )
+        skipped_requests = api.total_requests - before
+
+    assert skipped == records
+    assert skipped_requests < requests
+
+
+def test_sync_group_metrics(capsys: pytest.CaptureFixture[str]) -> None:
+    """Request group metrics once per group, and facets once per group and day."""
+    streams = (
+        "groups",
+        "daily_group_clicks",
+        "daily_group_shorten_counts",
+        "group_countries",
+        "group_devices",
+    )
+    start_date = datetime.now(tz=UTC) - timedelta(days=2)
+    settings = MockSettings(groups=2)
+    with MockBitlyAPI(settings) as api:
+        records, _ = _sync(capsys, api, streams, start_date=start_date.isoformat())
+
+    assert api.requests["/v4/groups/{group_guid}/clicks"] == settings.groups
+    assert api.requests["/v4/groups/{group_guid}/shorten_counts"] == settings.groups
+    assert api.requests["/v4/groups/{group_guid}/countries"] == settings.groups * 3
+    assert api.requests["/v4/groups/{group_guid}/devices"] == settings.groups * 3
+
+    countries = [record for stream, record in records if stream == "group_countries"]
+    assert countries
+    assert {record["group_guid"] for record in countries} == set(api.group_guids())
+    assert len({record["date"] for record in countries}) == len(["d-2", "d-1", "d"])
+
+
+def test_first_facet_sync_only_requests_lookback(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Request facets only for the lookback window without a bookmark or start date."""
+    settings = MockSettings(groups=2)
+    with MockBitlyAPI(settings) as api:
+        _sync(capsys, api, ("groups", "group_countries"))
+        assert api.requests["/v4/groups/{group_guid}/countries"] == settings.groups
+
+        api.requests.clear()
+        _sync(capsys, api, ("groups", "group_countries"), clicks_lookback_days=1)
+        assert api.requests["/v4/groups/{group_guid}/countries"] == (
+            settings.groups * len(["d-1", "d"])
+        )
+
+
+def test_bitlink_facets_share_one_walk(capsys: pytest.CaptureFixture[str]) -> None:
+    """Fan out the requests of every bitlink facet from one walk of the bitlinks."""
+    settings = MockSettings(bitlinks_per_group=6, days=2, page_size=4)
+    facets = ("bitlink_countries", "bitlink_devices", "bitlink_referrers")
+    start_date = (datetime.now(tz=UTC) - timedelta(days=1)).isoformat()
+    with MockBitlyAPI(settings) as api:
+        records, state = _sync(
+            capsys,
+            api,
+            (*CLICK_STREAMS, *facets),
+            start_date=start_date,
+            max_workers=4,
+        )
+
+    assert api.requests["/v4/groups/{group_guid}/bitlinks"] == len(["page", "page"])
+    for facet in facets:
+        endpoint = f"/v4/bitlinks/{{bitlink}}/{facet.removeprefix('bitlink_')}"
+        assert api.requests[endpoint] == settings.bitlinks_per_group * 2
+        partitions = state["bookmarks"][facet]["partitions"]
+        assert len(partitions) == settings.bitlinks_per_group
+        assert {record["bitlink"] for stream, record in records if stream == facet}
+
+
+def test_sync_qr_code_scans(capsys: pytest.CaptureFixture[str]) -> None:
+    """Sync the scans of every QR code, bookmarked per QR code."""
+    settings = MockSettings(groups=2, qr_codes_per_group=3, days=4)
+    streams = ("groups", "qr_codes", "daily_qr_code_scans")
+    start_date = REFERENCE_TIME - timedelta(days=settings.days)
+    with MockBitlyAPI(settings) as api:
+        records, state = _sync(capsys, api, streams, start_date=start_date.isoformat())
+
+    assert api.requests["/v4/groups/{group_guid}/qr-codes"] == settings.groups
+    assert api.requests["/v4/qr-codes/{qrcode_id}/scans"] == (
+        settings.groups * settings.qr_codes_per_group
+    )
+
+    scans = [record for stream, record in records if stream == "daily_qr_code_scans"]
+    assert sum(record["scans"] for record in scans) == sum(
+        sum(api.daily_scans(qrcode_id).values())
+        for group_guid in api.group_guids()
+        for qrcode_id in api.qr_code_ids(group_guid)
+    )
+    assert len(state["bookmarks"]["daily_qr_code_scans"]["partitions"]) == 2 * 3
+
+
+@pytest.mark.parametrize("expired", [False, True], ids=["valid", "expired"])
+def test_resume_interrupted_bitlinks_walk(
+    capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+    expired: bool,  # noqa: FBT001
+) -> None:
+    """Resume an interrupted walk of the bitlinks from the saved cursor."""
+    monkeypatch.setattr(Bitlinks, "checkpoint_pages", 2)
+    settings = MockSettings(bitlinks_per_group=10, page_size=2, fail_bitlinks_page=4)
+    streams = ("groups", "bitlinks")
+    with MockBitlyAPI(settings) as api:
+        with pytest.raises(FatalAPIError):
+            _sync(capsys, api, streams)
+        _, state = _read_messages(capsys)
+
+        (partition,) = state["bookmarks"]["bitlinks"]["partitions"]
+        assert "search_after=0.4" in partition["pagination_checkpoint"]["next"]
+
+        api.settings.fail_bitlinks_page = 0
+        if expired:
+            api.cursor_generation += 1
+        before = api.requests["/v4/groups/{group_guid}/bitlinks"]
+        records, state = _sync(capsys, api, streams, state)
+        requests = api.requests["/v4/groups/{group_guid}/bitlinks"] - before
+
+    bitlinks = [record for stream, record in records if stream == "bitlinks"]
+    if expired:
+        assert requests == 1 + 5
+        assert len(bitlinks) == settings.bitlinks_per_group
+    else:
+        assert requests == len(["page 3", "page 4", "page 5"])
+        assert len(bitlinks) == settings.bitlinks_per_group - 2 * settings.page_size
+
+    (partition,) = state["bookmarks"]["bitlinks"]["partitions"]
+    assert "pagination_checkpoint" not in partition
+    assert datetime.fromisoformat(partition["replication_key_value"]) == REFERENCE_TIME
+
+
+def test_failed_sync_writes_buffered_messages(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Write the records read before a sync failed, without waiting for exit."""
+    settings = MockSettings(bitlinks_per_group=4, page_size=2, fail_bitlinks_page=2)
+    with MockBitlyAPI(settings) as api, pytest.raises(FatalAPIError):
+        _sync(capsys, api, ("groups", "bitlinks"))
+
+    lines = capsys.readouterr().out.splitlines()
+    records = [
+        message
+        for message in map(json.loads, lines)
+        if message["type"] == "RECORD" and message["stream"] == "bitlinks"
+    ]
+    assert len(records) == settings.page_size
+
+
+def test_bitlinks_page_size_adapts(capsys: pytest.CaptureFixture[str]) -> None:
+    """Shrink pages of bitlinks that are slower than the target response time."""
+    settings = MockSettings(bitlinks_per_group=20)
+    with MockBitlyAPI(settings) as api:
+        records, _ = _sync(
+            capsys,
+            api,
+            ("groups", "bitlinks"),
+            min_page_size=2,
+            max_page_size=8,
+            page_target_seconds=1e-6,
+        )
+
+    assert api.page_sizes == [8, 4, 2, 2, 2, 2]
+    bitlinks = [record for stream, record in records if stream == "bitlinks"]
+    assert len(bitlinks) == settings.bitlinks_per_group
+
+
+@pytest.mark.parametrize(
+    "streams",
+    [CLICK_STREAMS, ("daily_bitlink_clicks",)],
+    ids=["with-parents", "without-parents"],
+)
+def test_emit_changed_clicks_only(
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: Path,
+    streams: tuple[str, ...],
+) -> None:
+    """Skip re-fetched clicks that were loaded before, unless the state is reset."""
+    settings = MockSettings(bitlinks_per_group=3, days=2)
+    config: dict[str, Any] = {
+        "click_digests_path": str(tmp_path / "digests.db"),
+        "clicks_lookback_days": 3,
+    }
+    with MockBitlyAPI(settings) as api:
+        _, state = _sync(capsys, api, streams, **config)
+        # The bookmarks catch up with the current day, within the lookback window
+        _, state = _sync(capsys, api, streams, state, **config)
+        before = api.requests["/v4/bitlinks/{bitlink}/clicks"]
+        records, next_state = _sync(capsys, api, streams, state, **config)
+        requests = api.requests["/v4/bitlinks/{bitlink}/clicks"] - before
+
+        del state["bookmarks"]["daily_bitlink_clicks"]["digest_run"]
+        reset_records, _ = _sync(capsys, api, streams, state, **config)
+
+    assert requests == settings.bitlinks_per_group
+    assert [stream for stream, _ in records].count("daily_bitlink_clicks") == 0
+    assert (
+        next_state["bookmarks"]["daily_bitlink_clicks"]["partitions"]
+        == (state["bookmarks"]["daily_bitlink_clicks"]["partitions"])
+    )
+    clicks = [
+        record for stream, record in reset_records if stream == "daily_bitlink_clicks"
+    ]
+    assert len(clicks) == 3 * (3 + 1)
+
+
+def test_full_scans_emit_changes_only(
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: Path,
+) -> None:
+    """Only emit new and changed records of full scans, and tombstones."""
+    settings = MockSettings(bitlinks_per_group=6, days=2)
+    config: dict[str, Any] = {
+        "record_index_path": str(tmp_path / "records.db"),
+        "emit_tombstones": True,
+    }
+    with MockBitlyAPI(settings) as api:
+        records, state = _sync(capsys, api, CLICK_STREAMS, **config)
+        # Archive a bitlink created before the bookmark, and delete the oldest one
+        api.settings.bitlinks_per_group = 5
+        api.settings.archived_bitlinks = ("bit.ly/g0l4",)
+        next_records, _ = _sync(capsys, api, CLICK_STREAMS, state, **config)
+
+    streams = Counter(stream for stream, _ in records)
+    assert (streams["groups"], streams["bitlinks"]) == (1, 6)
+    bitlinks = {
+        record["id"]: record for stream, record in records if stream == "bitlinks"
+    }
+    assert [
+        (stream, record)
+        for stream, record in next_records
+        if stream != "daily_bitlink_clicks"
+    ] == [
+        ("bitlinks", {**bitlinks["bit.ly/g0l4"], "archived": True}),
+        (
+            "bitlinks",
+            {
+                "id": "bit.ly/g0l5",
+                "group_guid": "Bg000000000",
+                "_sdc_deleted_at": next_records[-1][1]["_sdc_deleted_at"],
+            },
+        ),
+    ]
+
+
+def test_parallel_streams_match_sequential_sync(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Request top-level streams concurrently, emitting the same messages."""
+    streams = (*CLICK_STREAMS, "bsds", "campaigns", "channels", "organizations")
+    settings = MockSettings(bitlinks_per_group=4, days=2, latency=0.01)
+    with MockBitlyAPI(settings) as api:
+        records, state = _sync(capsys, api, streams)
+        sequential_requests = api.requests.copy()
+        api.requests.clear()
+
+        parallel_records, parallel_state = _sync(
+            capsys,
+            api,
+            streams,
+            max_parallel_streams=4,
+        )
+
+    assert parallel_records == records
+    assert parallel_state == state
+    assert api.requests == sequential_requests
+
+
+def test_parallel_streams_stop_when_sync_fails() -> None:
+    """Shut down the threads requesting top-level streams when a stream fails."""
+    settings = MockSettings(bitlinks_per_group=4, page_size=2, fail_bitlinks_page=2)
+    with MockBitlyAPI(settings) as api:
+        tap = TapBitly(
+            config={"token": "test", "api_url": api.url, "max_parallel_streams": 4},
+        )
+        for stream in tap.streams.values():
+            stream.selected = stream.name in {"groups", "bitlinks", "campaigns"}
+        with pytest.raises(FatalAPIError):
+            tap.sync_all()
+
+    assert tap.stream_executor is not None
+    assert tap.stream_executor._shutdown
+
+
+def test_bitlinks_filters_pushed_down(capsys: pytest.CaptureFixture[str]) -> None:
+    """Only request the clicks of bitlinks matching the configured filters."""
+    settings = MockSettings(bitlinks_per_group=6, days=2)
+    with MockBitlyAPI(settings) as api:
+        records, _ = _sync(
+            capsys,
+            api,
+            CLICK_STREAMS,
+            bitlinks_filters={"tags": ["even"]},
+        )
+
+    bitlinks = [record for stream, record in records if stream == "bitlinks"]
+    assert [record["tags"] for record in bitlinks] == [["even"]] * 3
+    assert api.requests["/v4/bitlinks/{bitlink}/clicks"] == len(bitlinks)
+
+
+def test_fast_output_matches_sdk(
+    capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Write the same messages as the SDK's record conformance and writer."""
+    settings = MockSettings(bitlinks_per_group=5, days=3)
+    with MockBitlyAPI(settings) as api:
+        records, state = _sync(capsys, api, CLICK_STREAMS)
+
+        monkeypatch.setattr(TapBitly, "message_writer_class", SingerWriter)
+        monkeypatch.setattr(
+            BitlyStream,
+            "_generate_record_messages",
+            Stream._generate_record_messages,
+        )
+        sdk_records, sdk_state = _sync(capsys, api, CLICK_STREAMS)
+
+    assert records == sdk_records
+    assert state == sdk_state
+
+
+def test_batch_click_streams(
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: Path,
+) -> None:
+    """Write bitlinks and clicks to rotating batch files, announced before state."""
+    settings = MockSettings(groups=2, bitlinks_per_group=5, days=3)
+    batch_config = {
+        "encoding": {"format": "jsonl", "compression": "gzip"},
+        "storage": {"root": tmp_path.as_uri()},
+        "batch_size": 8,
+    }
+    with MockBitlyAPI(settings) as api:
+        records, state = _sync(capsys, api, CLICK_STREAMS)
+        messages = _run(capsys, api, CLICK_STREAMS, batch_config=batch_config)
+
+    batched: list[tuple[str, dict[str, Any]]] = []
+    for message in messages:
+        if message["type"] == "RECORD":
+            batched.append((message["stream"], message["record"]))
+        elif message["type"] == "BATCH":
+            (url,) = message["manifest"]
+            with gzip.open(Path(urlparse(url).path)) as file:
+                batched.extend((message["stream"], json.loads(line)) for line in file)
+
+    # Clicks fill a file of 8 records every 2-3 bitlinks, and rotate every file
+    batches = Counter(m["stream"] for m in messages if m["type"] == "BATCH")
+    assert batches == {"bitlinks": 4, "daily_bitlink_clicks": 4}
+    assert {m["stream"] for m in messages if m["type"] == "RECORD"} == {"groups"}
+    assert sorted(batched, key=repr) == sorted(records, key=repr)
+    assert messages[-1]["type"] == "STATE"
+    assert messages[-1]["value"] == state
+
+
+def test_batch_parquet_files(
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: Path,
+) -> None:
+    """Write the records of batch files to Parquet, without encoding them as JSON."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    settings = MockSettings(bitlinks_per_group=5, days=3)
+    batch_config = {
+        "encoding": {"format": "parquet"},
+        "storage": {"root": tmp_path.as_uri()},
+        "batch_size": 8,
+    }
+    with MockBitlyAPI(settings) as api:
+        records, _ = _sync(capsys, api, CLICK_STREAMS)
+        messages = _run(capsys, api, CLICK_STREAMS, batch_config=batch_config)
+
+    batched: Counter[str] = Counter()
+    for message in messages:
+        if message["type"] == "BATCH":
+            (url,) = message["manifest"]
+            table = pq.read_table(Path(urlparse(url).path))
+            batched[message["stream"]] += table.num_rows
+
+    assert batched == Counter(stream for stream, _ in records if stream != "groups")
+
+
+def test_plan_matches_sync(capsys: pytest.CaptureFixture[str]) -> None:
+    """Estimate the requests of each stream a sync sends."""
+    settings = MockSettings(groups=2, bitlinks_per_group=7, days=5)
+    with MockBitlyAPI(settings) as api:
+        tap = TapBitly(config={"token": "test", "api_url": api.url})
+        for stream in tap.streams.values():
+            stream.selected = stream.name in CLICK_STREAMS
+        plan = tap.plan_sync()
+
+        api.requests.clear()
+        _sync(capsys, api, CLICK_STREAMS)
+
+    assert {stream.stream: stream.requests for stream in plan.streams} == {
+        "groups": 1,
+        "bitlinks": 2,
+        "daily_bitlink_clicks": 14,
+    }
+    assert api.requests["/v4/groups/{group_guid}/bitlinks"] == settings.groups
+    assert api.requests["/v4/bitlinks/{bitlink}/clicks"] == (
+        settings.groups * settings.bitlinks_per_group
+    )
+
+
+@pytest.mark.parametrize("start_date", [None, "2024-01-01T00:00:00Z"])
+def test_request_budget_defers_metrics(
+    capsys: pytest.CaptureFixture[str],
+    start_date: str | None,
+) -> None:
+    """Defer clicks of bitlinks that don't fit the budget to the next syncs."""
+    settings = MockSettings(bitlinks_per_group=6, days=3)
+    config: dict[str, Any] = {"max_requests": 8}
+    if start_date:
+        config["start_date"] = start_date
+    state: dict[str, Any] = {}
+    synced: list[set[str]] = []
+    with MockBitlyAPI(settings) as api:
+        for _ in range(3):
+            before = api.total_requests
+            records, state = _sync(capsys, api, CLICK_STREAMS, state, **config)
+            assert api.total_requests - before <= config["max_requests"]
+            synced.append(_clicked_bitlinks(records))
+
+    # Planning, rate limits, groups and bitlinks take 5 requests, leaving 3 for
+    # clicks, and the next sync syncs the clicks of the bitlinks left out first
+    first, second, third = synced
+    assert len(first) == len(second) == len(third) == config["max_requests"] - 5
+    assert first.isdisjoint(second)
+    assert len(first | second) == settings.bitlinks_per_group
+
+
+def test_request_budget_defers_facets(capsys: pytest.CaptureFixture[str]) -> None:
+    """Defer facets of groups that don't fit the budget, with a request per day."""
+    settings = MockSettings(groups=3)
+    streams = ("groups", "group_countries")
+    start_date = (datetime.now(tz=UTC) - timedelta(days=2)).isoformat()
+    max_requests = 7
+    state: dict[str, Any] = {}
+    synced: list[set[str]] = []
+    with MockBitlyAPI(settings) as api:
+        for _ in range(settings.groups):
+            before = api.total_requests
+            records, state = _sync(
+                capsys,
+                api,
+                streams,
+                state,
+                start_date=start_date,
+                max_requests=max_requests,
+            )
+            assert api.total_requests - before <= max_requests
+            synced.append({
+                record["group_guid"]
+                for stream, record in records
+                if stream == "group_countries"
+            })
+
+    # Planning, rate limits and groups take 4 requests, leaving 3 for the 3 days
+    # of one group
+    assert all(len(groups) == 1 for groups in synced)
+    assert set().union(*synced) == set(api.group_guids())
+
+
+def test_request_budget_makes_progress(capsys: pytest.CaptureFixture[str]) -> None:
+    """Sync the clicks of one bitlink even if the budget is spent by other requests."""
+    settings = MockSettings(bitlinks_per_group=3, days=3)
+    with MockBitlyAPI(settings) as api:
+        records, _ = _sync(capsys, api, CLICK_STREAMS, max_requests=1)
+
+    assert len(_clicked_bitlinks(records)) == 1
+
+
+def _clicked_bitlinks(records: list[tuple[str, dict[str, Any]]]) -> set[str]:
+    return {
+        record["bitlink"]
+        for stream, record in records
+        if stream == "daily_bitlink_clicks"
+    }
+
+
+def test_plan_cli(tmp_path: Path) -> None:
+    """Print the plan of a sync without syncing."""
+    settings = MockSettings(bitlinks_per_group=4, days=2)
+    with MockBitlyAPI(settings) as api:
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps({"token": "test", "api_url": api.url}))
+        result = CliRunner().invoke(
+            TapBitly.cli,
+            ["--plan", "--config", str(config_path)],
+        )
+
+    assert result.exit_code == 0, result.output
+    plan = json.loads(result.stdout)
+    assert plan["total"]["requests"] > 0
+    assert "/v4/bitlinks/{bitlink}/clicks" not in api.requests
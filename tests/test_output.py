@@ -0,0 +1,148 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Output fast path tests."""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+from datetime import UTC, datetime
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any
+
+from singer_sdk import typing as th
+
+# The fast path is compared with the SDK's own conformance helpers
+from singer_sdk.helpers._catalog import (  # noqa: PLC2701
+    pop_deselected_record_properties,
+)
+from singer_sdk.helpers._typing import conform_record_data_types  # noqa: PLC2701
+from singer_sdk.helpers.conform import TypeConformanceLevel
+from singer_sdk.singerlib import MetadataMapping, RecordMessage, SchemaMessage
+from singer_sdk.singerlib.json import serialize_json
+
+from tap_bitly.output import BufferedSingerWriter, RecordConformer
+
+if TYPE_CHECKING:
+    import pytest
+
+SCHEMA = th.PropertiesList(
+    th.Property("id", th.StringType),
+    th.Property("clicks", th.IntegerType),
+    th.Property("rate", th.NumberType),
+    th.Property("archived", th.BooleanType),
+    th.Property("created_at", th.DateTimeType),
+    th.Property("tags", th.ArrayType(th.StringType)),
+    th.Property(
+        "deeplinks",
+        th.ArrayType(th.ObjectType(th.Property("os", th.StringType))),
+    ),
+    th.Property(
+        "references",
+        th.ObjectType(
+            th.Property("group", th.StringType),
+            th.Property("secret", th.StringType),
+        ),
+    ),
+    th.Property("hidden", th.StringType),
+).to_dict()
+
+RECORDS: list[dict[str, Any]] = [
+    {
+        "id": "bit.ly/a",
+        "clicks": 3,
+        "rate": 0.5,
+        "archived": False,
+        "created_at": "2024-03-05T00:00:00+0000",
+        "tags": ["even"],
+        "deeplinks": [{"os": "ios"}],
+        "references": {"group": "g"},
+        "hidden": "x",
+    },
+    {
+        "id": "bit.ly/b",
+        "clicks": None,
+        "rate": float("nan"),
+        "archived": 1,
+        "created_at": datetime(2024, 3, 5, tzinfo=UTC),
+        "tags": [],
+        "deeplinks": [{"os": "android", "unknown": 1}],
+        "references": {"group": "g", "secret": "s"},
+        "unmapped": True,
+    },
+]
+
+
+def test_conformer_matches_sdk() -> None:
+    """Conform records exactly like the SDK does."""
+    metadata = MetadataMapping.get_standard_metadata(schema=SCHEMA)
+    metadata["properties", "hidden"].selected = False
+    metadata["properties", "references", "properties", "secret"].selected = False
+    mask = metadata.resolve_selection()
+    logger = logging.getLogger(__name__)
+
+    conformer = RecordConformer("bitlinks", SCHEMA, mask, logger)
+    for record in RECORDS:
+        expected = copy.deepcopy(record)
+        pop_deselected_record_properties(expected, SCHEMA, mask)
+        expected = conform_record_data_types(
+            "bitlinks",
+            expected,
+            SCHEMA,
+            TypeConformanceLevel.RECURSIVE,
+            logger,
+        )
+        assert conformer(copy.deepcopy(record)) == expected
+
+
+def test_writer_matches_sdk_encoding(capsys: pytest.CaptureFixture[str]) -> None:
+    """Write the same JSON content as the SDK, once flushed."""
+    messages = [
+        RecordMessage(
+            stream="bitlinks",
+            record={
+                "amount": Decimal("1.10"),
+                "nan": float("nan"),
+                "title": "café",
+                "at": datetime(2024, 3, 5, 1, 2, 3, 456, tzinfo=UTC),
+            },
+            time_extracted=datetime(2024, 3, 5, tzinfo=UTC),
+        ),
+        RecordMessage(stream="bitlinks", record={"big": 2**70}),
+    ]
+    writer = BufferedSingerWriter()
+    for message in messages:
+        writer.write_message(message)
+    assert not capsys.readouterr().out
+
+    writer.flush()
+    lines = capsys.readouterr().out.splitlines()
+    expected = [serialize_json(message.to_dict()) for message in messages]
+    assert [json.loads(line, parse_float=Decimal) for line in lines] == [
+        json.loads(line, parse_float=Decimal) for line in expected
+    ]
+
+
+def test_writer_only_buffers_records(capsys: pytest.CaptureFixture[str]) -> None:
+    """Flush the buffered records along with any other message."""
+    writer = BufferedSingerWriter()
+    writer.write_message(RecordMessage(stream="bitlinks", record={"id": "a"}))
+    assert not capsys.readouterr().out
+
+    writer.write_message(
+        SchemaMessage(stream="bitlinks", schema=SCHEMA, key_properties=["id"]),
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["type"] for line in lines] == ["RECORD", "SCHEMA"]
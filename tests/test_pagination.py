@@ -0,0 +1,78 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Adaptive page size tests."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from tap_bitly.pagination import PageSizeController, get_page_size, set_page_size
+
+ENDPOINT = "/v4/groups/{group_guid}/bitlinks"
+INITIAL_SIZE = 100
+MAX_SIZE = 1000
+TARGET_SECONDS = 2
+MAX_BYTES = 1_000_000
+
+
+def _controller() -> PageSizeController:
+    return PageSizeController(
+        initial_size=INITIAL_SIZE,
+        min_size=10,
+        max_size=MAX_SIZE,
+        target_seconds=TARGET_SECONDS,
+        max_bytes=MAX_BYTES,
+    )
+
+
+def test_page_size_follows_responses() -> None:
+    """Grow pages while responses are fast and small, shrink slow or big ones."""
+    controller = _controller()
+    assert controller.size(ENDPOINT) == INITIAL_SIZE
+
+    fast: dict[str, Any] = {"seconds": 0.1, "response_bytes": 1000}
+    assert controller.observe(ENDPOINT, size=INITIAL_SIZE, **fast) == 2 * INITIAL_SIZE
+    assert controller.observe(ENDPOINT, size=MAX_SIZE - 1, **fast) == MAX_SIZE
+
+    # Slow and big responses shrink in proportion, at most by half
+    slow: dict[str, Any] = {"seconds": TARGET_SECONDS * 1.25, "response_bytes": 1000}
+    size = controller.observe(ENDPOINT, size=MAX_SIZE, **slow)
+    assert size == MAX_SIZE * 4 // 5
+    big: dict[str, Any] = {"seconds": 0.1, "response_bytes": 4 * MAX_BYTES}
+    assert controller.observe(ENDPOINT, size=size, **big) == size // 2
+    assert controller.observe_timeout(ENDPOINT, size=size // 2) == size // 4
+    assert controller.size(ENDPOINT) == size // 4
+    assert controller.size("/v4/groups/{group_guid}/qr-codes") == INITIAL_SIZE
+
+
+def test_page_size_stops_growing_when_throttled() -> None:
+    """Shrink pages of throttled requests and hold them while throttling lasts."""
+    controller = _controller()
+    size = controller.observe_throttled(ENDPOINT, size=INITIAL_SIZE)
+    assert size == INITIAL_SIZE * 3 // 4
+    fast: dict[str, Any] = {"seconds": 0.1, "response_bytes": 1000}
+    assert controller.observe(ENDPOINT, size=size, **fast) == size
+
+    # The throttle rate decays with every response that is not throttled
+    sizes = [controller.observe(ENDPOINT, size=size, **fast) for _ in range(20)]
+    assert sizes[-1] == 2 * size
+
+
+def test_set_page_size() -> None:
+    """Replace the page size of a next page URL."""
+    url = f"https://api-ssl.bitly.com/v4/groups/g/bitlinks?size={INITIAL_SIZE}&search_after=x"
+    assert get_page_size(url) == INITIAL_SIZE
+    assert get_page_size(set_page_size(url, MAX_SIZE)) == MAX_SIZE
+    assert "search_after=x" in set_page_size(url, MAX_SIZE)
+    assert get_page_size("https://api-ssl.bitly.com/v4/groups") is None
@@ -0,0 +1,119 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the sync planner."""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import UTC, date, datetime
+
+import pytest
+
+from tap_bitly.planner import (
+    AccountCounts,
+    PartitionKey,
+    admit_partitions,
+    read_bookmarks,
+)
+from tap_bitly.ratelimit import RequestBudget
+from tap_bitly.state import COMPACT_KEY, encode_bookmarks
+
+
+def test_count_bitlinks_spreads_organization_counts() -> None:
+    """Bitlinks of an organization are spread evenly across its groups."""
+    counts = AccountCounts(
+        groups={"Ba": "Oa", "Bb": "Ob"},
+        organization_groups=Counter({"Oa": 2, "Ob": 1}),
+        shorten_counts={
+            "Oa": Counter({date(2024, 3, 1): 4, date(2024, 3, 4): 6}),
+            "Ob": Counter({date(2024, 3, 4): 3}),
+        },
+    )
+
+    # Organization Oa has two groups
+    assert counts.count_bitlinks("Ba") == pytest.approx((4 + 6) / 2)
+    since = datetime(2024, 3, 2, 12, tzinfo=UTC)
+    assert counts.count_bitlinks("Ba", since) == pytest.approx(6 / 2)
+    assert counts.count_bitlinks("Bb") == counts.shorten_counts["Ob"].total()
+
+
+def test_read_bookmarks_of_either_layout() -> None:
+    """Bookmarks are read from compact and SDK partitions."""
+    stream_state = {
+        COMPACT_KEY: encode_bookmarks(
+            {"bit.ly/a": "2024-03-01", "bit.ly/b": "2024-03-02"},
+            key="bitlink",
+            compress=True,
+        ),
+        "partitions": [
+            {"context": {"bitlink": "bit.ly/c"}, "replication_key_value": "2024-03-03"},
+            {"context": {"bitlink": "bit.ly/d"}},
+        ],
+    }
+
+    assert read_bookmarks(stream_state, "bitlink") == {
+        "bit.ly/a": "2024-03-01",
+        "bit.ly/b": "2024-03-02",
+        "bit.ly/c": "2024-03-03",
+    }
+
+
+def test_admit_stale_partitions_first() -> None:
+    """Partitions never synced, then those synced least recently, fit first."""
+    first, second = datetime(2024, 3, 1, tzinfo=UTC), datetime(2024, 3, 2, tzinfo=UTC)
+    costs: dict[PartitionKey, tuple[int, int]] = {
+        ("clicks", second): (2, 2),
+        ("clicks", first): (2, 4),
+        ("scans", None): (1, 1),
+    }
+
+    assert admit_partitions(costs, 7) == {
+        key: partitions for key, (partitions, _) in costs.items()
+    }
+    # A partial group fits, and the partitions after it wait
+    assert admit_partitions(costs, 4) == {("scans", None): 1, ("clicks", first): 1}
+    assert admit_partitions(costs, 3) == {("scans", None): 1, ("clicks", first): 1}
+
+
+def test_admit_at_least_one_partition() -> None:
+    """Admit one partition when none fits, so every sync makes progress."""
+    start = datetime(2024, 3, 1, tzinfo=UTC)
+    costs: dict[PartitionKey, tuple[int, int]] = {("clicks", start): (3, 6)}
+
+    assert admit_partitions(costs, -2) == {("clicks", start): 1}
+    assert not admit_partitions({}, 0)
+
+
+def test_budget_defers_partitions_not_admitted() -> None:
+    """Partitions that were not admitted are deferred, and all of them once spent."""
+    start = datetime(2024, 3, 1, tzinfo=UTC)
+    budget = RequestBudget(2)
+    budget.admit({("clicks", start): 1})
+
+    assert not budget.defers("clicks", start)
+    assert budget.defers("clicks", start)
+    assert budget.defers("clicks", None)
+
+    budget.admit({("clicks", None): 1})
+    budget.spend()
+    budget.spend()
+    assert budget.defers("clicks", None)
+
+
+def test_budget_syncs_one_partition() -> None:
+    """Sync the first partition of a sync that could not be planned."""
+    budget = RequestBudget(0)
+
+    assert not budget.defers("clicks", None)
+    assert budget.defers("clicks", None)
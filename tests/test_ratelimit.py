@@ -0,0 +1,124 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the shared rate limiter."""
+
+from __future__ import annotations
+
+import pytest
+import requests
+
+from tap_bitly.ratelimit import RateLimiter, parse_retry_after
+
+
+class FakeClock:
+    """Clock that only advances when sleeping."""
+
+    def __init__(self) -> None:
+        """Start the clock at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Get the current time.
+
+        Returns:
+            The number of seconds slept so far.
+        """
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the clock."""
+        self.now += seconds
+
+
+def _make_limiter(max_rate: float) -> tuple[RateLimiter, FakeClock]:
+    clock = FakeClock()
+    return RateLimiter(max_rate, clock=clock, sleep=clock.sleep), clock
+
+
+def _make_response(status_code: int, **headers: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+
+def test_acquire_waits_for_tokens() -> None:
+    """Requests beyond the burst size are spread at the maximum rate."""
+    limiter, clock = _make_limiter(2)
+    waits = [limiter.acquire("/v4/groups") for _ in range(4)]
+    assert waits == [0, 0, 0.5, 0.5]
+    assert clock.now == pytest.approx(1)
+
+
+def test_seed_platform_limits() -> None:
+    """GET platform limits are spread over their hourly window."""
+    limiter, _ = _make_limiter(50)
+    limiter.seed_platform_limits(
+        {
+            "platform_limits": [
+                {
+                    "endpoint": "/v4/bitlinks/{bitlink}/clicks",
+                    "methods": [
+                        {"name": "GET", "limit": 3600, "count": 0},
+                        {"name": "POST", "limit": 60, "count": 0},
+                    ],
+                },
+            ],
+        },
+    )
+    bucket = limiter.bucket("/v4/bitlinks/{bitlink}/clicks")
+    assert (bucket.max_rate, bucket.capacity) == (1, 60)
+    assert limiter.bucket("/v4/groups").max_rate == limiter.max_rate
+
+
+def test_seed_before_first_request() -> None:
+    """Account limits are only requested once, before the first request."""
+    seeded: list[RateLimiter] = []
+    limiter = RateLimiter(50, seed=seeded.append)
+    assert not seeded
+
+    limiter.acquire("/v4/groups")
+    limiter.acquire("/v4/groups")
+    assert seeded == [limiter]
+
+
+def test_throttled_response_pauses_and_slows_down() -> None:
+    """A 429 halves the rate and honours ``Retry-After``."""
+    limiter, clock = _make_limiter(8)
+    limiter.update("/v4/groups", _make_response(429, **{"Retry-After": "3"}))
+    bucket = limiter.bucket("/v4/groups")
+    assert bucket.rate == pytest.approx(bucket.max_rate / 2)
+    assert (limiter.acquire("/v4/groups"), clock.now) == (3, 3)
+
+    limiter.update("/v4/groups", _make_response(200))
+    assert bucket.max_rate / 2 < bucket.rate < bucket.max_rate
+
+
+def test_rate_limit_headers_spread_remaining_requests() -> None:
+    """Remaining requests are spread until the limit resets."""
+    limiter, _ = _make_limiter(50)
+    response = _make_response(
+        200,
+        **{"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": "100"},
+    )
+    limiter.update("/v4/groups", response)
+    assert limiter.bucket("/v4/groups").rate == pytest.approx(0.1 + 50 * 0.02)
+
+
+def test_parse_retry_after() -> None:
+    """``Retry-After`` can be a number of seconds or an HTTP date."""
+    assert parse_retry_after("2.5") == pytest.approx(2.5)
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,163 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Sharding tests."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from singer_sdk.exceptions import ConfigValidationError
+
+from tap_bitly.sharding import Sharding, merge_states
+from tap_bitly.state import COMPACT_KEY, decode_bookmarks, encode_bookmarks
+from tests.mock_api import MockBitlyAPI, MockSettings
+from tests.test_mock_api import CLICK_STREAMS, _sync
+
+
+def _records_of(records: list[tuple[str, dict[str, Any]]], stream: str) -> list[Any]:
+    return [record for name, record in records if name == stream]
+
+
+@pytest.mark.parametrize("shard_by", ["bitlink", "group"])
+def test_shards_are_disjoint(
+    capsys: pytest.CaptureFixture[str],
+    shard_by: str,
+) -> None:
+    """Every bitlink and group metric is synced by exactly one shard.
+
+    The states of the shards can be merged.
+    """
+    streams = (*CLICK_STREAMS, "daily_group_clicks", "group_countries")
+    settings = MockSettings(groups=4, bitlinks_per_group=6, days=2)
+    with MockBitlyAPI(settings) as api:
+        full, _ = _sync(capsys, api, streams)
+        shards = [
+            _sync(
+                capsys,
+                api,
+                streams,
+                shard_index=index,
+                shard_count=3,
+                shard_by=shard_by,
+            )
+            for index in range(3)
+        ]
+
+    bitlinks = [
+        {record["id"] for record in _records_of(records, "bitlinks")}
+        for records, _ in shards
+    ]
+    assert sum(map(len, bitlinks)) == len(set().union(*bitlinks))
+    assert set().union(*bitlinks) == {
+        record["id"] for record in _records_of(full, "bitlinks")
+    }
+
+    for stream in ("daily_group_clicks", "group_countries"):
+        group_metrics = [
+            str(record)
+            for records, _ in shards
+            for record in _records_of(records, stream)
+        ]
+        assert sorted(group_metrics) == sorted(map(str, _records_of(full, stream)))
+
+    merged = merge_states(state for _, state in shards)
+    partitions = merged["bookmarks"]["daily_bitlink_clicks"]["partitions"]
+    assert {partition["context"]["bitlink"] for partition in partitions} == set().union(
+        *bitlinks
+    )
+
+
+def test_group_allow_and_deny_lists(capsys: pytest.CaptureFixture[str]) -> None:
+    """Only sync allowed groups that are not excluded."""
+    settings = MockSettings(groups=3, bitlinks_per_group=2, days=1)
+    with MockBitlyAPI(settings) as api:
+        guids = api.group_guids()
+        records, _ = _sync(
+            capsys,
+            api,
+            CLICK_STREAMS,
+            group_guids=guids[:2],
+            excluded_group_guids=guids[1:],
+        )
+
+    assert [record["guid"] for record in _records_of(records, "groups")] == guids[:1]
+    assert {record["group_guid"] for record in _records_of(records, "bitlinks")} == {
+        guids[0]
+    }
+
+
+def test_merge_keeps_earliest_bookmark() -> None:
+    """Partitions found in several states keep the earliest bookmark."""
+    context = {"group_guid": "g1"}
+    states = [
+        {
+            "bookmarks": {
+                "bitlinks": {
+                    "partitions": [
+                        {
+                            "context": context,
+                            "replication_key": "created_at",
+                            "replication_key_value": value,
+                        },
+                    ],
+                },
+            },
+        }
+        for value in ("2024-02-01T00:00:00+0000", "2024-01-01T00:00:00+0000")
+    ]
+
+    partition = merge_states(states)["bookmarks"]["bitlinks"]["partitions"]
+    assert partition == states[1]["bookmarks"]["bitlinks"]["partitions"]
+
+
+def test_merge_compact_bookmarks() -> None:
+    """Compact bookmarks of bitlinks keep the earliest bookmark of each bitlink."""
+    states = [
+        {
+            "bookmarks": {
+                "daily_bitlink_clicks": {
+                    "replication_key": "date",
+                    COMPACT_KEY: encode_bookmarks(
+                        bookmarks, key="bitlink", compress=True
+                    ),
+                },
+            },
+        }
+        for bookmarks in (
+            {
+                "bit.ly/a": "2024-03-05T00:00:00+0000",
+                "bit.ly/b": "2024-03-01T00:00:00+0000",
+            },
+            {
+                "bit.ly/a": "2024-03-02T00:00:00+0000",
+                "bit.ly/c": "2024-03-05T00:00:00+0000",
+            },
+        )
+    ]
+
+    merged = merge_states(states)["bookmarks"]["daily_bitlink_clicks"]
+
+    assert merged["replication_key"] == "date"
+    assert decode_bookmarks(merged[COMPACT_KEY]) == {
+        "bit.ly/a": "2024-03-02T00:00:00+0000",
+        "bit.ly/b": "2024-03-01T00:00:00+0000",
+        "bit.ly/c": "2024-03-05T00:00:00+0000",
+    }
+
+
+def test_invalid_shard_index() -> None:
+    """Reject shard indexes outside the number of shards."""
+    with pytest.raises(ConfigValidationError):
+        Sharding(shard_index=2, shard_count=2)
@@ -0,0 +1,92 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for the compact state of bitlink metric streams."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from tap_bitly.state import COMPACT_KEY, decode_bookmarks, encode_bookmarks
+from tests.mock_api import MockBitlyAPI, MockSettings
+from tests.test_mock_api import CLICK_STREAMS, _sync
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+@pytest.mark.parametrize("compress", [False, True], ids=["plain", "compressed"])
+def test_bookmarks_round_trip(compress: bool) -> None:  # noqa: FBT001
+    """Group bitlinks by bookmark, and read them back."""
+    bookmarks = {
+        "bit.ly/a": "2024-03-05T00:00:00+0000",
+        "bit.ly/b": "2024-03-05T00:00:00+0000",
+        "bit.ly/c": "2024-03-01T00:00:00+0000",
+    }
+
+    compact = encode_bookmarks(bookmarks, key="bitlink", compress=compress)
+
+    assert decode_bookmarks(compact) == bookmarks
+    if not compress:
+        assert compact["bookmarks"] == [
+            ["2024-03-05T00:00:00+0000", ["bit.ly/a", "bit.ly/b"]],
+            ["2024-03-01T00:00:00+0000", ["bit.ly/c"]],
+        ]
+
+
+def _bookmarks(stream_state: Mapping[str, Any]) -> dict[str, Any]:
+    if COMPACT_KEY in stream_state:
+        return decode_bookmarks(stream_state[COMPACT_KEY])
+    return {
+        partition["context"]["bitlink"]: partition["replication_key_value"]
+        for partition in stream_state["partitions"]
+    }
+
+
+def test_migrate_state_layouts(capsys: pytest.CaptureFixture[str]) -> None:
+    """Migrate bookmarks to the compact layout and back, syncing the same records."""
+    settings = MockSettings(bitlinks_per_group=8, days=3)
+    with MockBitlyAPI(settings) as api:
+        _, state = _sync(capsys, api, CLICK_STREAMS)
+        records, partitions_state = _sync(capsys, api, CLICK_STREAMS, state)
+
+        before = api.total_requests
+        compact_records, compact_state = _sync(
+            capsys,
+            api,
+            CLICK_STREAMS,
+            state,
+            state_format="compressed",
+        )
+        compact_requests = api.total_requests - before
+
+        before = api.total_requests
+        _, expanded_state = _sync(capsys, api, CLICK_STREAMS, compact_state)
+        expanded_requests = api.total_requests - before
+
+    assert compact_records == records
+    assert expanded_requests == compact_requests
+
+    clicks_state = compact_state["bookmarks"]["daily_bitlink_clicks"]
+    assert "partitions" not in clicks_state
+    assert clicks_state[COMPACT_KEY]["encoding"] == "zlib"
+
+    expected = _bookmarks(partitions_state["bookmarks"]["daily_bitlink_clicks"])
+    assert len(expected) == settings.bitlinks_per_group
+    assert _bookmarks(clicks_state) == expected
+
+    expanded = expanded_state["bookmarks"]["daily_bitlink_clicks"]
+    assert COMPACT_KEY not in expanded
+    assert _bookmarks(expanded) == expected
@@ -0,0 +1,315 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Offline tests for stream request building."""
+
+from __future__ import annotations
+
+import copy
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+import requests
+
+from tap_bitly.client import BitlyMetricsStream
+from tap_bitly.streams import (
+    Bitlinks,
+    BitlinksPaginator,
+    DailyBitlinkClicks,
+    rollup_monthly_clicks,
+)
+from tap_bitly.tap import TapBitly
+
+if TYPE_CHECKING:
+    import pytest
+
+
+def _make_tap(state: dict[str, Any] | None = None, **config: object) -> TapBitly:
+    return TapBitly(config={"token": "test", **config}, state=state or {})
+
+
+def _get_bitlinks(tap: TapBitly) -> Bitlinks:
+    stream = tap.streams["bitlinks"]
+    assert isinstance(stream, Bitlinks)
+    return stream
+
+
+def test_bitlinks_page_parsed_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Share the parsed body of a page between records and pagination."""
+    tap = _make_tap()
+    stream = _get_bitlinks(tap)
+    response = requests.Response()
+    response._content = (
+        b'{"links": [{"id": "bit.ly/abc"}, {"id": "bit.ly/def"}],'
+        b' "pagination": {"next": "https://api-ssl.bitly.com/v4/next"}}'
+    )
+
+    records = list(stream.parse_response(response))
+    monkeypatch.setattr(response, "_content", b"")
+    next_url = BitlinksPaginator().get_next_url(response)
+
+    assert records == [{"id": "bit.ly/abc"}, {"id": "bit.ly/def"}]
+    assert next_url == "https://api-ssl.bitly.com/v4/next"
+
+
+def test_bitlinks_projected_at_parse_time() -> None:
+    """Drop deselected properties, and all but required ones of unselected streams."""
+    catalog = _make_tap().catalog_dict
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if metadata["breadcrumb"] == ["properties", "title"]:
+                metadata["metadata"]["selected"] = False
+    tap = TapBitly(config={"token": "test"}, catalog=catalog)
+    stream = _get_bitlinks(tap)
+    response = requests.Response()
+    response._content = (
+        b'{"links": [{"id": "bit.ly/abc", "title": "ABC", "long_url": "https://a.b",'
+        b' "created_at": "2024-03-01T12:00:00+0000", "unknown": 1}]}'
+    )
+
+    assert list(stream.parse_response(response)) == [
+        {
+            "id": "bit.ly/abc",
+            "long_url": "https://a.b",
+            "created_at": "2024-03-01T12:00:00+0000",
+        },
+    ]
+
+    stream.selected = False
+    assert list(stream.parse_response(response)) == [
+        {"id": "bit.ly/abc", "created_at": "2024-03-01T12:00:00+0000"},
+    ]
+
+
+def test_bitlinks_created_after_from_start_date() -> None:
+    """Seed ``created_after`` from ``start_date`` minus the lookback window."""
+    tap = _make_tap(start_date="2024-01-10T00:00:00Z", bitlinks_lookback_days=2)
+    stream = _get_bitlinks(tap)
+    context = {"group_guid": "Ba1bc23dE4F"}
+
+    stream._write_starting_replication_value(context)
+
+    expected = datetime(2024, 1, 8, tzinfo=UTC)
+    assert stream.get_created_after(context) == int(expected.timestamp())
+
+
+def test_bitlinks_created_after_from_bookmark() -> None:
+    """Prefer the partition bookmark over an older ``start_date``."""
+    context = {"group_guid": "Ba1bc23dE4F"}
+    state: dict[str, Any] = {
+        "bookmarks": {
+            "bitlinks": {
+                "partitions": [
+                    {
+                        "context": context,
+                        "replication_key": "created_at",
+                        "replication_key_value": "2024-03-01T12:00:00+0000",
+                    },
+                ],
+            },
+        },
+    }
+    tap = _make_tap(state, start_date="2024-01-10T00:00:00Z")
+    stream = _get_bitlinks(tap)
+
+    stream._write_starting_replication_value(context)
+
+    expected = datetime(2024, 3, 1, 12, tzinfo=UTC)
+    assert stream.get_created_after(context) == int(expected.timestamp())
+
+
+def test_bitlinks_created_after_full_sync() -> None:
+    """Omit ``created_after`` when there is no bookmark or ``start_date``."""
+    tap = _make_tap()
+    stream = _get_bitlinks(tap)
+    context = {"group_guid": "Ba1bc23dE4F"}
+
+    stream._write_starting_replication_value(context)
+
+    assert stream.get_created_after(context) is None
+
+
+def _clicks_state(stream_name: str, bitlink: str, date: str) -> dict[str, Any]:
+    return {
+        "bookmarks": {
+            stream_name: {
+                "partitions": [
+                    {
+                        "context": {"bitlink": bitlink},
+                        "replication_key": "date",
+                        "replication_key_value": date,
+                    },
+                ],
+            },
+        },
+    }
+
+
+def _get_metrics_stream(tap: TapBitly, name: str) -> BitlyMetricsStream[Any]:
+    stream = tap.streams[name]
+    assert isinstance(stream, BitlyMetricsStream)
+    stream._initialized_at = int(datetime(2024, 3, 5, 8, tzinfo=UTC).timestamp()) * 1000
+    return stream
+
+
+def test_daily_clicks_window_from_bookmark() -> None:
+    """Request the days since the bookmark, plus the lookback window."""
+    context = {"bitlink": "bit.ly/abc"}
+    state = _clicks_state(
+        "daily_bitlink_clicks", "bit.ly/abc", "2024-03-03T00:00:00+0000"
+    )
+    tap = _make_tap(state, clicks_lookback_days=1)
+    stream = _get_metrics_stream(tap, "daily_bitlink_clicks")
+
+    stream._write_starting_replication_value(context)
+
+    assert stream.get_url_params(context, None) == {
+        "unit": "day",
+        "units": 4,
+        "unit_reference": "2024-03-05T08:00:00+0000",
+    }
+
+
+def test_monthly_clicks_window_from_start_date() -> None:
+    """Count months across a year boundary, including the current month."""
+    context = {"bitlink": "bit.ly/abc"}
+    tap = _make_tap(start_date="2023-11-20T00:00:00Z")
+    stream = _get_metrics_stream(tap, "monthly_bitlink_clicks")
+
+    stream._write_starting_replication_value(context)
+
+    assert stream.get_url_params(context, None) == {
+        "unit": "month",
+        "units": 5,
+        "unit_reference": "2024-03-05T08:00:00+0000",
+    }
+
+
+def test_clicks_window_without_bookmark() -> None:
+    """Request all available units when there is nothing to start from."""
+    context = {"bitlink": "bit.ly/abc"}
+    tap = _make_tap()
+    stream = _get_metrics_stream(tap, "daily_bitlink_clicks")
+
+    stream._write_starting_replication_value(context)
+
+    assert stream.get_url_params(context, None)["units"] == -1
+
+
+def test_rollup_monthly_clicks() -> None:
+    """Sum daily clicks by calendar month, newest month first."""
+    rows = [
+        ("2024-03-02T00:00:00+0000", 4),
+        ("2024-03-01T00:00:00+0000", 1),
+        ("2024-02-29T00:00:00+0000", 7),
+        ("2024-02-01T00:00:00+0000", 0),
+        ("2023-12-31T00:00:00+0000", 2),
+    ]
+
+    assert rollup_monthly_clicks(rows) == {
+        "2024-03-01T00:00:00+0000": 5,
+        "2024-02-01T00:00:00+0000": 7,
+        "2023-12-01T00:00:00+0000": 2,
+    }
+
+
+def test_derived_monthly_clicks_window() -> None:
+    """Request whole months of daily clicks for the derived monthly stream."""
+    context = {"bitlink": "bit.ly/abc"}
+    state = _clicks_state(
+        "monthly_bitlink_clicks",
+        "bit.ly/abc",
+        "2024-02-01T00:00:00+0000",
+    )
+    state["bookmarks"].update(
+        _clicks_state(
+            "daily_bitlink_clicks",
+            "bit.ly/abc",
+            "2024-03-04T00:00:00+0000",
+        )["bookmarks"],
+    )
+    tap = _make_tap(state, derive_monthly_clicks=True, clicks_lookback_days=3)
+    monthly = _get_metrics_stream(tap, "monthly_bitlink_clicks")
+    daily = _get_metrics_stream(tap, "daily_bitlink_clicks")
+
+    monthly._write_starting_replication_value(context)
+    daily._write_starting_replication_value(context)
+
+    assert monthly.get_url_params(context, None) == {
+        "unit": "day",
+        "units": 65,
+        "unit_reference": "2024-03-05T08:00:00+0000",
+    }
+    assert daily.get_url_params(context, None)["units"] == monthly.get_units(context)
+
+
+def test_skip_inactive_bitlinks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sync zero clicks for bitlinks the group did not report as clicked."""
+    state = _clicks_state(
+        "daily_bitlink_clicks", "bit.ly/abc", "2024-03-03T00:00:00+0000"
+    )
+    state["bookmarks"]["daily_bitlink_clicks"]["partitions"].append({
+        "context": {"bitlink": "bit.ly/def"},
+        "replication_key": "date",
+        "replication_key_value": "2024-03-03T00:00:00+0000",
+    })
+    tap = _make_tap(state, skip_inactive_bitlinks=True)
+    stream = _get_metrics_stream(tap, "daily_bitlink_clicks")
+    assert isinstance(stream, DailyBitlinkClicks)
+
+    responses = {
+        "/v4/groups/{group_guid}/clicks": {"data": [{"ts": "", "count": 3}]},
+        "/v4/groups/{group_guid}/bitlinks/clicks": {
+            "sorted_links": [{"id": "bit.ly/abc", "clicks": 3}],
+        },
+    }
+    requested: list[str] = []
+
+    def request_json(endpoint: str, *_: object, **__: object) -> dict[str, Any]:
+        requested.append(endpoint)
+        return responses[endpoint]
+
+    monkeypatch.setattr(stream, "request_json", request_json)
+
+    active = {"bitlink": "bit.ly/abc", "group_guid": "Ba1bc23dE4F"}
+    inactive = {"bitlink": "bit.ly/def", "group_guid": "Ba1bc23dE4F"}
+    stream._write_starting_replication_value(active)
+    stream._write_starting_replication_value(inactive)
+
+    assert not stream.is_inactive(active)
+    assert stream.is_inactive(inactive)
+    assert list(stream.get_inactive_records(inactive)) == [
+        {"date": "2024-03-05T00:00:00+0000", "clicks": 0},
+        {"date": "2024-03-04T00:00:00+0000", "clicks": 0},
+        {"date": "2024-03-03T00:00:00+0000", "clicks": 0},
+    ]
+    assert requested == list(responses)
+
+
+def test_only_selected_streams_are_initialized() -> None:
+    """Initialize selected streams and their ancestors, when given a catalog."""
+    catalog = copy.deepcopy(_make_tap().catalog_dict)
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if not metadata["breadcrumb"]:
+                selected = entry["tap_stream_id"] in {"daily_bitlink_clicks", "bsds"}
+                metadata["metadata"]["selected"] = selected
+
+    tap = TapBitly(config={"token": "test"}, catalog=catalog)
+    assert list(tap.streams) == [
+        "bitlinks",
+        "bsds",
+        "daily_bitlink_clicks",
+        "groups",
+    ]
+    assert not tap.streams["groups"].selected
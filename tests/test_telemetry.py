@@ -0,0 +1,151 @@
+# Copyright 2025 Edgar Ramirez
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Telemetry tests."""
+
+from __future__ import annotations
+
+import json
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+from singer_sdk.exceptions import FatalAPIError
+
+from tap_bitly.tap import TapBitly
+from tap_bitly.telemetry import LatencyHistogram, Telemetry
+from tests.mock_api import MockBitlyAPI, MockSettings
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def test_latency_histogram() -> None:
+    """Percentiles are the upper bounds of buckets, using the nearest-rank method."""
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0
+
+    for seconds in (0.003, 0.04, 0.05, 0.3, 70):
+        histogram.add(seconds)
+    assert (histogram.percentile(50), histogram.percentile(99)) == (0.05, 70)
+    assert histogram.to_dict()["buckets"] == {
+        "0.005": 1,
+        "0.05": 2,
+        "0.5": 1,
+        "+Inf": 1,
+    }
+
+
+def test_summary() -> None:
+    """Requests, retries and parsing are summarized per stream and endpoint."""
+    telemetry = Telemetry()
+    telemetry.record_request("groups", "/v4/groups", seconds=0.2, response_bytes=10)
+    telemetry.record_retry("groups", "/v4/groups")
+    telemetry.record_request("groups", "/v4/groups", seconds=0.1, response_bytes=20)
+    telemetry.record_parse("groups", "/v4/groups", seconds=0.01, records=3)
+
+    assert telemetry.summary()["groups"] == {
+        "records": 3,
+        "records_per_second": mock.ANY,
+        "endpoints": {
+            "/v4/groups": {
+                "requests": 2,
+                "retried": 1,
+                "response_bytes": 30,
+                "parse_seconds": pytest.approx(0.01),
+                "latency_seconds": {
+                    "p50": 0.1,
+                    "p90": 0.2,
+                    "p99": 0.2,
+                    "max": 0.2,
+                    "buckets": {"0.1": 1, "0.25": 1},
+                },
+            },
+        },
+    }
+
+
+def test_write_summary(tmp_path: Path) -> None:
+    """Write the telemetry of every synced stream when the sync ends."""
+    path = tmp_path / "telemetry.json"
+    settings = MockSettings(bitlinks_per_group=4, days=2, page_size=2)
+    with MockBitlyAPI(settings) as api:
+        tap = TapBitly(
+            config={"token": "test", "api_url": api.url, "telemetry_path": str(path)},
+        )
+        for stream in tap.streams.values():
+            stream.selected = stream.name in {"groups", "bitlinks"}
+        assert not path.exists()
+        tap.sync_all()
+
+    summary = json.loads(path.read_text(encoding="utf-8"))
+    assert set(summary) == {"groups", "bitlinks"}
+    bitlinks = summary["bitlinks"]["endpoints"]["/v4/groups/{group_guid}/bitlinks"]
+    assert bitlinks["requests"] == api.requests["/v4/groups/{group_guid}/bitlinks"]
+    assert summary["bitlinks"]["records"] == settings.bitlinks_per_group
+
+
+def test_count_facet_records(capsys: pytest.CaptureFixture[str]) -> None:
+    """Count the records of facet streams, which request each day separately."""
+    start_date = datetime.now(tz=UTC) - timedelta(days=1)
+    with MockBitlyAPI(MockSettings()) as api:
+        tap = TapBitly(
+            config={
+                "token": "test",
+                "api_url": api.url,
+                "start_date": start_date.isoformat(),
+            },
+        )
+        for stream in tap.streams.values():
+            stream.selected = stream.name in {"groups", "group_countries"}
+        capsys.readouterr()
+        tap.sync_all()
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records = [
+        message
+        for message in messages
+        if message["type"] == "RECORD" and message["stream"] == "group_countries"
+    ]
+    assert tap.telemetry.summary()["group_countries"]["records"] == len(records) > 0
+
+
+def test_log_due() -> None:
+    """Log the telemetry of every stream once the log interval has passed."""
+    logger = mock.Mock()
+    telemetry = Telemetry(log_interval=3600)
+    telemetry.record_parse("groups", "/v4/groups", seconds=0.01, records=3)
+    telemetry.log_due(logger)
+    assert not logger.method_calls
+
+    telemetry.log_interval = 0
+    telemetry.log_due(logger)
+    assert logger.method_calls
+
+
+def test_write_summary_of_failed_sync(tmp_path: Path) -> None:
+    """Write the telemetry of a sync that failed."""
+    path = tmp_path / "telemetry.json"
+    settings = MockSettings(bitlinks_per_group=4, page_size=2, fail_bitlinks_page=2)
+    with MockBitlyAPI(settings) as api:
+        tap = TapBitly(
+            config={"token": "test", "api_url": api.url, "telemetry_path": str(path)},
+        )
+        for stream in tap.streams.values():
+            stream.selected = stream.name in {"groups", "bitlinks"}
+        with pytest.raises(FatalAPIError):
+            tap.sync_all()
+
+    summary = json.loads(path.read_text(encoding="utf-8"))
+    assert summary["bitlinks"]["records"] == settings.page_size